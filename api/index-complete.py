@@ -11,9 +11,21 @@ import os
 import tempfile
 from datetime import datetime
 from pathlib import Path
-import io
 import base64
-import chardet
+import codecs
+import uuid
+from itertools import islice
+
+try:
+    import chardet
+    CHARDET_AVAILABLE = True
+except ImportError:
+    CHARDET_AVAILABLE = False
+
+from src.column_profiler import TableProfiler
+from src.xlsx_reader import read_xlsx_table, XlsxError
+from src.upload_spool import spool_stream, UploadTooLarge
+from src.storage import get_storage
 
 app = Flask(__name__)
 app.secret_key = 'zapcampanhas_secret_key'
@@ -22,129 +34,137 @@ app.secret_key = 'zapcampanhas_secret_key'
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
-# Armazenamento temporário (em memória para Vercel)
-file_storage = {}
-reports_storage = {}
+# Amostra usada na detecção de codificação (início + fim do arquivo)
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Linhas do conteúdo devolvidas por página em /api/files/<id>
+CONTENT_PAGE_LINES = 100
+MAX_CONTENT_PAGE_LINES = 1000
+
+# Armazenamento persistente: blobs por hash + índice compartilhado entre workers e reinícios
+storage = get_storage('api-complete')
+file_storage = storage.files
+reports_storage = storage.reports
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def detect_encoding(content):
-    """Detecta a codificação do arquivo"""
+def _sample_decodes(sample, encoding, final):
+    """Verifica se a amostra decodifica na codificação (sem exigir o fim de um caractere multibyte)"""
     try:
-        # Tenta detectar a codificação
-        result = chardet.detect(content)
-        encoding = result['encoding']
-        confidence = result['confidence']
-        
-        # Se a confiança for baixa, tenta codificações comuns
-        if confidence < 0.7:
-            for enc in ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']:
-                try:
-                    content.decode(enc)
-                    return enc
-                except:
-                    continue
-        
-        return encoding or 'utf-8'
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def detect_encoding(path):
+    """Detecta a codificação do arquivo a partir de uma amostra limitada (início + fim), lida do disco"""
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(ENCODING_SAMPLE_SIZE)
+            tail = b''
+            if size > 2 * ENCODING_SAMPLE_SIZE:
+                f.seek(-ENCODING_SAMPLE_SIZE, os.SEEK_END)
+                tail = f.read()
+        
+        # BOM define a codificação sem precisar analisar o conteúdo
+        if head.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        
+        # ASCII/UTF-8 válido na amostra: caso mais comum, sem chardet
+        if _sample_decodes(head, 'utf-8', final=not tail and size <= ENCODING_SAMPLE_SIZE):
+            # O fim pode começar no meio de um caractere: descarta bytes de continuação
+            tail = tail.lstrip(bytes(range(0x80, 0xC0)))
+            if not tail or _sample_decodes(tail, 'utf-8', final=True):
+                return 'utf-8'
+        
+        sample = head + tail
+        if CHARDET_AVAILABLE:
+            result = chardet.detect(sample)
+            encoding = result['encoding']
+            if encoding and result['confidence'] >= 0.7 and _sample_decodes(sample, encoding, final=False):
+                return encoding
+        
+        # Exportações do PDV em português: cp1252, com latin1 como último recurso
+        return 'cp1252' if _sample_decodes(sample, 'cp1252', final=False) else 'latin1'
     except:
         return 'utf-8'
 
-def process_csv_data(content_bytes):
-    """Processa dados CSV com detecção automática de codificação"""
+def _read_csv_profile(path, encoding):
+    """Lê o CSV do disco decodificando em streaming e calcula o perfil das colunas"""
+    with open(path, encoding=encoding, newline='') as stream:
+        reader = csv.reader(stream)
+        columns = next(reader, [])
+        if columns and columns[0].startswith('\ufeff'):
+            columns[0] = columns[0][1:]
+        
+        # Atualiza o perfil de todas as colunas a cada linha
+        profiler = TableProfiler(columns)
+        sample_data = []
+        for row in reader:
+            if not any(row):
+                continue
+            profiler.update(row)
+            if len(sample_data) < 5:
+                sample_data.append(dict(zip(columns, row)))
+    
+    return columns, profiler, sample_data
+
+def process_csv_data(path):
+    """Processa dados CSV (lidos do spool em streaming) com detecção automática de codificação"""
     try:
         # Detecta a codificação
-        encoding = detect_encoding(content_bytes)
+        encoding = detect_encoding(path)
         
-        # Decodifica o conteúdo
+        # Decodifica em streaming; se a amostra enganou a detecção, relê em latin1 (aceita qualquer byte)
         try:
-            content = content_bytes.decode(encoding)
+            columns, profiler, sample_data = _read_csv_profile(path, encoding)
         except UnicodeDecodeError:
-            # Se falhar, tenta outras codificações
-            for enc in ['latin1', 'cp1252', 'iso-8859-1']:
-                try:
-                    content = content_bytes.decode(enc)
-                    break
-                except:
-                    continue
-            else:
-                return {"error": "Não foi possível decodificar o arquivo. Verifique a codificação."}
+            encoding = 'latin1'
+            columns, profiler, sample_data = _read_csv_profile(path, encoding)
         
-        lines = content.split('\n')
-        if not lines or not lines[0].strip():
+        if not columns:
             return {"error": "Arquivo CSV vazio ou inválido"}
         
-        # Lê o CSV
-        reader = csv.DictReader(io.StringIO(content))
-        data = list(reader)
-        
-        if not data:
+        if not profiler.rows:
             return {"error": "Nenhum dado encontrado no CSV"}
         
-        # Análise dos dados
-        total_rows = len(data)
-        columns = list(data[0].keys())
-        
         # Estatísticas básicas
         analysis = {
-            "total_rows": total_rows,
+            "total_rows": profiler.rows,
             "columns": columns,
             "column_count": len(columns),
-            "sample_data": data[:5],
+            "sample_data": sample_data,
             "file_type": "CSV",
-            "encoding": encoding
+            "encoding": encoding,
+            "column_analysis": profiler.to_dict()
         }
         
-        # Análise por coluna
-        column_analysis = {}
-        for col in columns:
-            values = [row.get(col, '') for row in data if row.get(col, '')]
-            unique_values = len(set(values))
-            column_analysis[col] = {
-                "total_values": len(values),
-                "unique_values": unique_values,
-                "empty_values": total_rows - len(values),
-                "sample_values": list(set(values))[:5]
-            }
-        
-        analysis["column_analysis"] = column_analysis
-        
         return analysis
         
     except Exception as e:
         return {"error": f"Erro ao processar CSV: {str(e)}"}
 
-def process_excel_data(content_bytes, filename):
-    """Processa dados Excel"""
+def process_excel_data(path, filename):
+    """Processa dados Excel (.xlsx) com leitura em streaming da planilha"""
     try:
-        # Por enquanto, simula processamento de Excel
-        # Em uma versão futura, implementaremos com openpyxl ou xlrd
+        table = read_xlsx_table(str(path), filename, profile=True)
         
-        # Detecta a codificação (para arquivos Excel em texto)
-        encoding = detect_encoding(content_bytes)
+        analysis = table.summary("Excel")
+        analysis["encoding"] = "binary"
+        analysis["column_analysis"] = table.profiler.to_dict()
         
-        # Tenta decodificar como texto (para alguns formatos Excel)
-        try:
-            content = content_bytes.decode(encoding)
-            lines = content.split('\n')
-            
-            # Se parece com CSV, processa como CSV
-            if len(lines) > 1 and ',' in lines[0]:
-                return process_csv_data(content_bytes)
-        except:
-            pass
+        return analysis
         
-        # Para arquivos Excel binários, retorna informação básica
+    except XlsxError as e:
         return {
-            "total_rows": 0,
-            "columns": [],
-            "column_count": 0,
-            "sample_data": [],
-            "file_type": "Excel",
-            "encoding": "binary",
-            "message": "Arquivo Excel detectado. Processamento completo será implementado em breve."
+            "error": str(e),
+            "filename": filename,
+            "file_type": "Excel"
         }
-        
     except Exception as e:
         return {
             "error": f"Erro ao processar Excel: {str(e)}",
@@ -726,54 +746,38 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Tipo de arquivo não permitido. Use CSV, XLSX ou XLS.'}), 400
         
-        # Verifica tamanho
-        file.seek(0, 2)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': f'Arquivo muito grande. Máximo: {MAX_FILE_SIZE // (1024*1024)}MB'}), 400
-        
-        # Lê o conteúdo como bytes
-        content_bytes = file.read()
-        
-        # Processa baseado no tipo
-        if file.filename.lower().endswith('.csv'):
-            analysis = process_csv_data(content_bytes)
-        else:
-            analysis = process_excel_data(content_bytes, file.filename)
-        
-        # Verifica se há erro no processamento
-        if 'error' in analysis:
-            return jsonify({'error': analysis['error']}), 400
-        
-        # Para arquivos Excel que ainda não são totalmente suportados
-        if analysis.get('file_type') == 'Excel' and analysis.get('total_rows', 0) == 0:
-            return jsonify({
-                'success': True,
-                'message': 'Arquivo Excel recebido. Processamento completo será implementado em breve.',
-                'file_id': f"file_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                'analysis': analysis,
-                'warning': 'Processamento limitado para arquivos Excel'
-            })
-        
-        # Salva no armazenamento temporário
-        file_id = f"file_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Tenta decodificar o conteúdo para armazenamento
+        # Grava o upload no spool (com hash e limite de tamanho)
         try:
-            content_text = content_bytes.decode(analysis.get('encoding', 'utf-8'))
-        except:
-            content_text = content_bytes.decode('latin1', errors='ignore')
+            upload = spool_stream(file.stream, file.filename, max_size=MAX_FILE_SIZE)
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 400
         
-        file_storage[file_id] = {
-            'id': file_id,
-            'name': file.filename,
-            'size': file_size,
-            'uploaded': datetime.now().isoformat(),
-            'content': content_text,
-            'analysis': analysis
-        }
+        try:
+            # Processa baseado no tipo, lendo o arquivo do spool (sem carregar o conteúdo inteiro)
+            if file.filename.lower().endswith('.csv'):
+                analysis = process_csv_data(upload.path)
+            else:
+                analysis = process_excel_data(upload.path, file.filename)
+            
+            # Verifica se há erro no processamento
+            if 'error' in analysis:
+                return jsonify({'error': analysis['error']}), 400
+            
+            # Planilha sem linhas de dados
+            if analysis.get('file_type') == 'Excel' and analysis.get('total_rows', 0) == 0:
+                return jsonify({'error': 'Nenhum dado encontrado na planilha'}), 400
+            
+            # Salva no armazenamento persistente (o conteúdo fica no blob, não no índice);
+            # o sufixo aleatório evita que dois uploads no mesmo segundo se sobrescrevam
+            file_id = f"file_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            storage.add_file(upload, {
+                'id': file_id,
+                'name': file.filename,
+                'uploaded': datetime.now().isoformat(),
+                'analysis': analysis
+            })
+        finally:
+            upload.delete()
         
         return jsonify({
             'success': True,
@@ -802,13 +806,38 @@ def list_files():
         'total': len(files)
     })
 
+def read_content_page(path, encoding, offset, limit):
+    """Linhas [offset, offset + limit) do texto do arquivo, lidas em streaming do blob"""
+    with open(path, encoding=encoding, errors='replace', newline='') as f:
+        lines = list(islice(f, offset, offset + limit + 1))
+    return ''.join(lines[:limit]), len(lines) > limit
+
 @app.route('/api/files/<file_id>')
 def get_file(file_id):
-    """Obtém dados de um arquivo específico"""
+    """Obtém dados de um arquivo específico (conteúdo em texto paginado por linhas: offset e limit)"""
     if file_id not in file_storage:
         return jsonify({'error': 'Arquivo não encontrado'}), 404
     
     file_data = file_storage[file_id]
+    storage.touch(file_id)
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', CONTENT_PAGE_LINES, type=int), 1), MAX_CONTENT_PAGE_LINES)
+    
+    # Planilhas binárias não têm texto; CSVs devolvem só a página pedida
+    file_data['content'] = None
+    file_data['content_has_more'] = False
+    if file_data['analysis'].get('encoding') != 'binary':
+        encoding = file_data['analysis'].get('encoding', 'utf-8')
+        try:
+            content, has_more = read_content_page(storage.blob_path(file_data), encoding, offset, limit)
+        except LookupError:
+            content, has_more = read_content_page(storage.blob_path(file_data), 'latin1', offset, limit)
+        file_data['content'] = content
+        file_data['content_has_more'] = has_more
+    file_data['content_offset'] = offset
+    file_data['content_limit'] = limit
+    
     return jsonify({
         'file': file_data
     })
@@ -828,8 +857,7 @@ def delete_file(file_id):
 @app.route('/api/files/clear', methods=['DELETE'])
 def clear_all_files():
     """Remove todos os arquivos"""
-    global file_storage
-    file_storage = {}
+    file_storage.clear()
     return jsonify({
         'success': True,
         'message': 'Todos os arquivos removidos com sucesso'
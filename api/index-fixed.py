@@ -3,85 +3,199 @@
 ZapCampanhas API - Versão corrigida
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import json
-import csv
 import os
 from datetime import datetime
-import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from src.analysis_core import SUPPORTED_EXTENSIONS
+from src.columnar import ColumnarTable, all_columns, total_rows, distinct_values
+from src.column_profiler import merge_profiles
+from src.upload_spool import spool_stream, UploadTooLarge
+from src.xlsx_reader import read_xlsx_table, XlsxError
+from src.storage import get_storage
+from src.customer_filters import CustomerIndex, ticket_range
+from src.segments import CustomerSegments, bitmap_positions
+from src.http_cache import init_http_cache, make_etag, cached_json
 
 app = Flask(__name__)
 
-# Configurações
-ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# Compressão (Brotli/gzip) e ETag com 304 em todas as respostas
+init_http_cache(app)
 
-# Armazenamento temporário
-file_storage = {}
-reports_storage = {}
+# Configurações
+# Mesmas extensões dos motores de análise (.xls antigo não é lido pelo leitor de planilhas)
+ALLOWED_EXTENSIONS = {ext.lstrip('.') for ext in SUPPORTED_EXTENSIONS}
+# Uploads vão em blocos para o spool em disco, então o limite não pesa na memória
+MAX_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_MB', 50)) * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 1024 * 1024
+
+# Armazenamento persistente: blobs por hash + índice compartilhado entre workers e reinícios
+storage = get_storage('api-fixed')
+file_storage = storage.files
+reports_storage = storage.reports
+
+# Tabelas em colunas já lidas neste processo, por hash do conteúdo
+TABLE_CACHE_SIZE = int(os.environ.get('TABLE_CACHE_SIZE', 8))
+_table_cache = OrderedDict()
+_table_lock = threading.Lock()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def process_csv_data(content):
-    """Processa dados CSV"""
+def process_csv_data(path):
+    """Processa dados CSV lendo o arquivo do spool em streaming para o armazenamento em colunas"""
     try:
-        lines = content.split('\n')
-        if not lines or not lines[0].strip():
-            return {"error": "Arquivo CSV vazio ou inválido"}
-        
-        # Lê o CSV
-        reader = csv.DictReader(io.StringIO(content))
-        data = list(reader)
-        
-        if not data:
-            return {"error": "Nenhum dado encontrado no CSV"}
+        # Lê o CSV uma vez só; as análises usam a tabela em colunas
+        for encoding in ('utf-8-sig', 'latin1'):
+            try:
+                with open(path, encoding=encoding, newline='') as stream:
+                    table = ColumnarTable.from_csv(stream, profile=True)
+                break
+            except UnicodeDecodeError:
+                continue
         
-        # Análise dos dados
-        total_rows = len(data)
-        columns = list(data[0].keys())
+        if not table.columns:
+            return None, {"error": "Arquivo CSV vazio ou inválido"}
         
-        analysis = {
-            "total_rows": total_rows,
-            "columns": columns,
-            "column_count": len(columns),
-            "sample_data": data[:5],
-            "file_type": "CSV"
-        }
+        if not table.n_rows:
+            return None, {"error": "Nenhum dado encontrado no CSV"}
         
-        return analysis
+        return table, table.summary("CSV")
         
     except Exception as e:
-        return {"error": f"Erro ao processar CSV: {str(e)}"}
+        return None, {"error": f"Erro ao processar CSV: {str(e)}"}
 
-def process_excel_data(content, filename):
-    """Processa dados Excel"""
+def process_excel_data(source, filename):
+    """Processa dados Excel (.xlsx) com leitura em streaming da planilha (caminho, bytes ou arquivo)"""
     try:
-        # Para arquivos Excel, vamos simular o processamento
-        # Em uma implementação completa, usaríamos openpyxl ou xlrd
-        
-        # Simula dados de exemplo para Excel
-        sample_data = [
-            {"coluna1": "valor1", "coluna2": "valor2", "coluna3": "valor3"},
-            {"coluna1": "valor4", "coluna2": "valor5", "coluna3": "valor6"},
-            {"coluna1": "valor7", "coluna2": "valor8", "coluna3": "valor9"}
-        ]
+        table = read_xlsx_table(source, filename, profile=True)
         
-        columns = ["coluna1", "coluna2", "coluna3"]
+        if not table.n_rows:
+            return None, {"error": "Nenhum dado encontrado na planilha"}
         
-        analysis = {
-            "total_rows": len(sample_data),
-            "columns": columns,
-            "column_count": len(columns),
-            "sample_data": sample_data,
-            "file_type": "Excel",
-            "message": f"Arquivo Excel '{filename}' processado com sucesso!"
-        }
+        analysis = table.summary("Excel")
+        analysis["message"] = f"Arquivo Excel '{filename}' processado com sucesso!"
         
-        return analysis
+        return table, analysis
         
+    except XlsxError as e:
+        return None, {"error": str(e)}
     except Exception as e:
-        return {"error": f"Erro ao processar Excel: {str(e)}"}
+        return None, {"error": f"Erro ao processar Excel: {str(e)}"}
+
+def cache_table(sha256, table):
+    """Guarda a tabela lida no cache do processo (remove as menos usadas)"""
+    with _table_lock:
+        _table_cache[sha256] = table
+        _table_cache.move_to_end(sha256)
+        while len(_table_cache) > TABLE_CACHE_SIZE:
+            _table_cache.popitem(last=False)
+
+def load_table(file_data):
+    """Tabela em colunas do arquivo: do cache do processo ou relida do blob (outro worker/reinício)"""
+    sha256 = file_data['sha256']
+    with _table_lock:
+        table = _table_cache.get(sha256)
+        if table is not None:
+            _table_cache.move_to_end(sha256)
+    
+    if table is None:
+        path = storage.blob_path(file_data)
+        if not path.exists():
+            return None
+        if file_data['name'].lower().endswith('.csv'):
+            table, _ = process_csv_data(path)
+        else:
+            table, _ = process_excel_data(path, file_data['name'])
+        if table is None:
+            return None
+        cache_table(sha256, table)
+    
+    table.source = file_data['name']
+    return table
+
+def get_tables():
+    """Tabelas em colunas de todos os arquivos carregados"""
+    tables = [load_table(file_data) for file_data in file_storage.values()]
+    return [table for table in tables if table is not None]
+
+# Índice de clientes (recência/ticket) e segmentos, reconstruídos só quando os arquivos mudam
+_customer_index = {'key': None, 'index': None, 'segments': None}
+
+def get_customer_index():
+    """Tabela por cliente dos pedidos carregados (montada uma vez por conjunto de arquivos)"""
+    files = file_storage.values()
+    key = tuple((f['id'], f['sha256']) for f in files)
+    with _table_lock:
+        if _customer_index['key'] == key:
+            return _customer_index['index']
+    
+    tables = [table for table in (load_table(f) for f in files) if table is not None]
+    index = CustomerIndex.from_tables(tables)
+    with _table_lock:
+        _customer_index['key'] = key
+        _customer_index['index'] = index
+        _customer_index['segments'] = None
+    return index
+
+def get_segments():
+    """Bitmaps de segmentos da versão atual dos dados (montados uma vez)"""
+    index = get_customer_index()
+    with _table_lock:
+        segments = _customer_index['segments']
+        if segments is None or segments.customers is not index:
+            segments = CustomerSegments(index)
+            if _customer_index['index'] is index:
+                _customer_index['segments'] = segments
+    return segments
+
+# Relatórios de negócio da versão atual dos dados (análises e arquivos montados sob demanda)
+_business_reports = {'key': None, 'reports': None}
+
+BUSINESS_FILES_HINT = ('Nenhum arquivo da ZapChicken reconhecido. Envie Todos os pedidos, Lista-Clientes, '
+                       'Historico_Itens_Vendidos e/ou contacts (CSV do Google Contacts)')
+
+def get_business_reports():
+    """Relatórios do núcleo de análise sobre os uploads em memória (refeitos só quando os arquivos mudam)"""
+    # O motor de análise (e o pandas, se for o motor configurado) só é carregado quando os relatórios são pedidos
+    from src.business_reports import BusinessReports
+    
+    files = file_storage.values()
+    key = tuple((f['id'], f['sha256']) for f in files)
+    with _table_lock:
+        if _business_reports['key'] == key:
+            return _business_reports['reports']
+    
+    tables = [(f['name'], table) for f, table in ((f, load_table(f)) for f in files) if table is not None]
+    reports = BusinessReports.from_tables(tables)
+    with _table_lock:
+        _business_reports['key'] = key
+        _business_reports['reports'] = reports
+    return reports
+
+def business_summary(business, reports):
+    return {
+        'total_reports': sum(1 for r in reports if r['available']),
+        'total_clients_analyzed': len(get_customer_index()),
+        'files_processed': len(business.sources),
+        'sources': business.sources
+    }
+
+def parse_filters(data):
+    """Filtros da tela: dias inativos e ticket médio ('Até R$ X' ou 'R$ 1000+')"""
+    dias_inativos = data.get('dias_inativos', '')
+    ticket_medio = data.get('ticket_medio', '')
+    ticket_min, ticket_max = ticket_range(ticket_medio)
+    return {
+        'dias_inativos': int(dias_inativos) if str(dias_inativos).strip() else None,
+        'ticket_min': data.get('ticket_min', ticket_min),
+        'ticket_max': data.get('ticket_max', ticket_max)
+    }
 
 @app.route('/')
 def index():
@@ -138,8 +252,8 @@ def index():
                             <div class="upload-area" id="uploadArea">
                                 <i class="fas fa-cloud-upload-alt fa-3x text-muted mb-3"></i>
                                 <h5>Arraste arquivos aqui ou clique para selecionar</h5>
-                                <p class="text-muted">Suporte: CSV, Excel (xlsx, xls) - Múltiplos arquivos</p>
-                                <input type="file" id="fileInput" accept=".csv,.xlsx,.xls" multiple style="display: none;">
+                                <p class="text-muted">Suporte: CSV, Excel (xlsx) - Múltiplos arquivos</p>
+                                <input type="file" id="fileInput" accept=".csv,.xlsx" multiple style="display: none;">
                                 <button class="btn btn-zap-primary" onclick="document.getElementById('fileInput').click()">
                                     Selecionar Arquivos
                                 </button>
@@ -873,13 +987,28 @@ def index():
                          ticket_medio: ticketMedio
                      })
                  })
-                 .then(response => response.json())
-                 .then(data => {
-                     if (data.success) {
-                         alert(`Dados exportados com sucesso! ${data.message}`);
-                     } else {
-                         alert(`Erro ao exportar: ${data.error}`);
+                 .then(response => {
+                     const contentType = response.headers.get('Content-Type') || '';
+                     if (!contentType.includes('text/csv')) {
+                         return response.json().then(data => {
+                             alert(`Erro ao exportar: ${data.error}`);
+                         });
                      }
+                     
+                     // Baixa o CSV gerado pelo servidor
+                     const disposition = response.headers.get('Content-Disposition') || '';
+                     const match = disposition.match(/filename=([^;]+)/);
+                     const filename = match ? match[1] : 'dados_filtrados.csv';
+                     return response.blob().then(blob => {
+                         const url = URL.createObjectURL(blob);
+                         const link = document.createElement('a');
+                         link.href = url;
+                         link.download = filename;
+                         document.body.appendChild(link);
+                         link.click();
+                         link.remove();
+                         URL.revokeObjectURL(url);
+                     });
                  })
                  .catch(error => {
                      alert(`Erro ao exportar dados: ${error.message}`);
@@ -943,8 +1072,9 @@ def index():
                          
                          html += `<br><strong>📁 Arquivos Gerados:</strong><br>`;
                          data.files.forEach(file => {
-                             html += `• ${file.name} (${file.type})<br>`;
+                             html += `• <a href="${file.url}">${file.name}</a> (${file.type}, ${file.records} registros)<br>`;
                          });
+                         businessFiles = data.files;
                          
                          html += `<br>
                              <button class="btn btn-sm btn-outline-primary me-2" onclick="downloadReport('business')">
@@ -974,18 +1104,20 @@ def index():
              }
              
              // Download de relatórios
+             let businessFiles = [];
              function downloadReport(type) {
                  if (type === 'business') {
-                     // Simula download dos 5 relatórios
-                     const reports = [
-                         'novos_clientes_google_contacts.csv',
-                         'clientes_inativos.xlsx',
-                         'clientes_alto_ticket.xlsx',
-                         'analise_geografica.xlsx',
-                         'produtos_mais_vendidos.xlsx'
-                     ];
-                     
-                     alert(`📥 Download iniciado!\n\nArquivos que serão baixados:\n${reports.join('\n')}\n\nEm uma implementação completa, os arquivos seriam baixados automaticamente.`);
+                     // Cada arquivo é gerado no servidor no primeiro download
+                     businessFiles.forEach((file, i) => {
+                         setTimeout(() => {
+                             const link = document.createElement('a');
+                             link.href = file.url;
+                             link.download = file.name;
+                             document.body.appendChild(link);
+                             link.click();
+                             link.remove();
+                         }, i * 500);
+                     });
                  }
              }
              
@@ -1006,7 +1138,7 @@ def index():
                              <strong>📋 Relatórios Disponíveis:</strong><br>`;
                          
                          data.reports.forEach(report => {
-                             html += `• <strong>${report.name}</strong> (${report.type})<br>
+                             html += `• <strong>${report.name}</strong> (${report.type}, ${report.available ? report.records + ' registros' : 'sem dados'})<br>
                              <small class="text-muted">${report.description}</small><br><br>`;
                          });
                          
@@ -1043,7 +1175,8 @@ def status():
         'status': 'online',
         'timestamp': datetime.now().isoformat(),
         'version': '2.1.0',
-        'message': 'ZapCampanhas API corrigida!'
+        'message': 'ZapCampanhas API corrigida!',
+        'storage': storage.stats()
     })
 
 @app.route('/api/upload', methods=['POST'])
@@ -1059,55 +1192,61 @@ def upload_file():
         
         # Verifica extensão
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Tipo de arquivo não permitido. Use CSV, XLSX ou XLS.'}), 400
-        
-        # Verifica tamanho
-        file.seek(0, 2)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': f'Arquivo muito grande. Máximo: {MAX_FILE_SIZE // (1024*1024)}MB'}), 400
+            return jsonify({'error': 'Tipo de arquivo não permitido. Use CSV ou XLSX.'}), 400
         
-        # Lê o conteúdo
+        # Grava o upload no spool em blocos (hash calculado durante a cópia)
         try:
-            content = file.read().decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                file.seek(0)
-                content = file.read().decode('latin1')
-            except:
-                return jsonify({'error': 'Não foi possível ler o arquivo. Verifique a codificação.'}), 400
-        
-        # Processa baseado no tipo
-        if file.filename.lower().endswith('.csv'):
-            analysis = process_csv_data(content)
-        else:
-            analysis = process_excel_data(content, file.filename)
-        
-        # Verifica se há erro no processamento
-        if 'error' in analysis:
-            return jsonify({'error': analysis['error']}), 400
-        
-
+            upload = spool_stream(file.stream, file.filename, max_size=MAX_FILE_SIZE)
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Mesmo conteúdo já enviado: reaproveita a leitura e a análise existentes
+        existing = storage.find_by_hash(upload.sha256, upload.extension)
+        if existing is not None:
+            upload.delete()
+            storage.touch(existing['id'])
+            
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'message': f"Arquivo {file.filename} já foi enviado (mesmo conteúdo de '{existing['name']}'). Análise existente reaproveitada.",
+                'file_id': existing['id'],
+                'analysis': existing['analysis'],
+                'total_files': len(file_storage)
+            })
         
-        # Salva no armazenamento temporário com timestamp único
-        import time
-        file_id = f"file_{int(time.time() * 1000)}"
-        file_storage[file_id] = {
-            'id': file_id,
-            'name': file.filename,
-            'size': file_size,
-            'uploaded': datetime.now().isoformat(),
-            'content': content,
-            'analysis': analysis
-        }
+        # Processa baseado no tipo direto do arquivo em disco (só a tabela em colunas fica em memória)
+        try:
+            if file.filename.lower().endswith('.csv'):
+                table, analysis = process_csv_data(upload.path)
+            else:
+                table, analysis = process_excel_data(upload.path, file.filename)
+            
+            # Verifica se há erro no processamento
+            if 'error' in analysis:
+                return jsonify({'error': analysis['error']}), 400
+            
+            table.source = file.filename
+            
+            # Salva no armazenamento persistente com id único (o arquivo vira blob pelo hash);
+            # o sufixo aleatório evita colisão entre uploads paralelos no mesmo milissegundo
+            file_id = f"file_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+            storage.add_file(upload, {
+                'id': file_id,
+                'name': file.filename,
+                'uploaded': datetime.now().isoformat(),
+                'analysis': analysis
+            })
+            cache_table(upload.sha256, table)
+        finally:
+            upload.delete()
         
         # Debug: mostra quantos arquivos estão armazenados
         print(f"DEBUG: Arquivo {file.filename} salvo com ID {file_id}. Total de arquivos: {len(file_storage)}")
         
         return jsonify({
             'success': True,
+            'duplicate': False,
             'message': f'Arquivo {file.filename} processado com sucesso!',
             'file_id': file_id,
             'analysis': analysis,
@@ -1155,8 +1294,10 @@ def delete_file(file_id):
 @app.route('/api/files/clear', methods=['DELETE'])
 def clear_all_files():
     """Remove todos os arquivos"""
-    global file_storage
-    file_storage = {}
+    file_storage.clear()
+    with _table_lock:
+        _table_cache.clear()
+        _business_reports['key'] = _business_reports['reports'] = None
     return jsonify({
         'success': True,
         'message': 'Todos os arquivos removidos com sucesso'
@@ -1206,28 +1347,34 @@ def get_analytics():
                 'message': 'Nenhum arquivo carregado'
             })
         
-        # Análise detalhada
-        total_files = len(file_storage)
-        total_rows = sum(f['analysis'].get('total_rows', 0) for f in file_storage.values())
-        file_types = list(set(f['analysis'].get('file_type', 'Unknown') for f in file_storage.values()))
+        files = file_storage.values()
         
-        # Coleta todas as colunas
-        all_columns = set()
-        for file_data in file_storage.values():
-            columns = file_data['analysis'].get('columns', [])
-            all_columns.update(columns)
+        def build():
+            # Análise detalhada
+            total_files = len(files)
+            total_rows = sum(f['analysis'].get('total_rows', 0) for f in files)
+            file_types = list(set(f['analysis'].get('file_type', 'Unknown') for f in files))
+            
+            # Coleta todas as colunas
+            all_columns = set()
+            for file_data in files:
+                columns = file_data['analysis'].get('columns', [])
+                all_columns.update(columns)
+            
+            analytics = {
+                'total_files': total_files,
+                'total_rows': total_rows,
+                'file_types': file_types,
+                'columns': list(all_columns)
+            }
+            
+            return {
+                'success': True,
+                'analytics': analytics
+            }
         
-        analytics = {
-            'total_files': total_files,
-            'total_rows': total_rows,
-            'file_types': file_types,
-            'columns': list(all_columns)
-        }
-        
-        return jsonify({
-            'success': True,
-            'analytics': analytics
-        })
+        # Versão dos dados = arquivos carregados (id + hash do conteúdo)
+        return cached_json(make_etag('analytics', [(f['id'], f['sha256']) for f in files]), build)
         
     except Exception as e:
         return jsonify({'error': f'Erro ao gerar analytics: {str(e)}'}), 500
@@ -1240,7 +1387,7 @@ def generate_report():
             return jsonify({'error': 'Nenhum arquivo carregado para gerar relatório'}), 400
         
         # Gera relatório avançado
-        report_id = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        report_id = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         
         # Análise básica
         total_files = len(file_storage)
@@ -1276,12 +1423,14 @@ def generate_report():
 @app.route('/api/reports/<report_id>')
 def get_report(report_id):
     """Obtém um relatório específico"""
-    if report_id not in reports_storage:
+    report = reports_storage.get(report_id)
+    if report is None:
         return jsonify({'error': 'Relatório não encontrado'}), 404
     
-    return jsonify({
+    # Relatório gerado não muda: o ETag vem do id e da data de geração
+    return cached_json(make_etag('report', report_id, report['generated']), lambda: {
         'success': True,
-        'report': reports_storage[report_id]
+        'report': report
     })
 
 @app.route('/api/reports')
@@ -1304,57 +1453,31 @@ def list_reports():
 def analyze_cross_data():
     """Analisa e cruza dados de todos os arquivos"""
     try:
-        all_data = []
         column_mapping = {}
+        tables = []
         
-        # Coleta todos os dados
+        # Coleta as tabelas já processadas no upload
         for file_id, file_data in file_storage.items():
-            if file_data['analysis'].get('file_type') == 'CSV':
-                # Parse CSV data
-                content = file_data['content']
-                reader = csv.DictReader(io.StringIO(content))
-                file_rows = list(reader)
-                
-                # Adiciona metadados do arquivo
-                for row in file_rows:
-                    row['_source_file'] = file_data['name']
-                    row['_file_id'] = file_id
-                
-                all_data.extend(file_rows)
-                
-                # Mapeia colunas
-                columns = file_data['analysis'].get('columns', [])
-                for col in columns:
-                    if col not in column_mapping:
-                        column_mapping[col] = []
-                    column_mapping[col].append(file_data['name'])
+            table = load_table(file_data)
+            if table is None:
+                continue
+            tables.append(table)
             
-            elif file_data['analysis'].get('file_type') == 'Excel':
-                # Para arquivos Excel, usa os dados simulados
-                file_rows = file_data['analysis'].get('sample_data', [])
-                
-                # Adiciona metadados do arquivo
-                for row in file_rows:
-                    row['_source_file'] = file_data['name']
-                    row['_file_id'] = file_id
-                
-                all_data.extend(file_rows)
-                
-                # Mapeia colunas
-                columns = file_data['analysis'].get('columns', [])
-                for col in columns:
-                    if col not in column_mapping:
-                        column_mapping[col] = []
-                    column_mapping[col].append(file_data['name'])
-        
-        if not all_data:
+            # Mapeia colunas
+            for col in table.columns:
+                if col not in column_mapping:
+                    column_mapping[col] = []
+                column_mapping[col].append(file_data['name'])
+        
+        total_records = total_rows(tables)
+        if not total_records:
             return {
                 'error': 'Nenhum dado válido encontrado para análise cruzada'
             }
         
         # Análises cruzadas
         analysis = {
-            'total_records': len(all_data),
+            'total_records': total_records,
             'files_analyzed': len(file_storage),
             'column_mapping': column_mapping,
             'insights': []
@@ -1372,27 +1495,25 @@ def analyze_cross_data():
         
         analysis['common_columns'] = sorted(common_columns, key=lambda x: x['count'], reverse=True)
         
-        # Análise por tipo de coluna
+        # Análise por tipo de coluna: combina os perfis calculados durante a leitura
+        profiles = merge_profiles(t.profiler for t in tables if t.profiler is not None)
         column_analysis = {}
         for col in column_mapping.keys():
-            values = [row.get(col, '') for row in all_data if row.get(col, '')]
-            unique_values = len(set(values))
+            profile = profiles.get(col)
+            info = profile.to_dict() if profile else {'type': 'empty', 'total_values': 0, 'unique_values': 0, 'sample_values': []}
             
-            # Detecta tipo de coluna
+            # Detecta tipo de coluna (nome da coluna primeiro, depois o tipo inferido dos valores)
             col_type = 'text'
             if col.lower() in ['valor', 'preco', 'price', 'amount', 'total']:
                 col_type = 'monetary'
-            elif col.lower() in ['data', 'date', 'data_compra', 'data_venda']:
+            elif col.lower() in ['data', 'date', 'data_compra', 'data_venda'] or info['type'] == 'date':
                 col_type = 'date'
-            elif col.lower() in ['quantidade', 'qtd', 'quantity', 'amount']:
+            elif col.lower() in ['quantidade', 'qtd', 'quantity', 'amount'] or info['type'] == 'numeric':
                 col_type = 'numeric'
             
-            column_analysis[col] = {
-                'type': col_type,
-                'total_values': len(values),
-                'unique_values': unique_values,
-                'sample_values': list(set(values))[:5]
-            }
+            info['inferred_type'] = info['type']
+            info['type'] = col_type
+            column_analysis[col] = info
         
         analysis['column_analysis'] = column_analysis
         
@@ -1508,45 +1629,36 @@ def chat():
 def analyze_data_with_ai(question):
     """Analisa dados com IA baseada na pergunta"""
     try:
-        # Coleta dados de todos os arquivos
-        all_data = []
+        # Usa as tabelas em colunas montadas no upload (sem reler o CSV)
+        tables = []
         file_summary = {}
         
         for file_id, file_data in file_storage.items():
-            if file_data['analysis'].get('file_type') == 'CSV':
-                content = file_data['content']
-                reader = csv.DictReader(io.StringIO(content))
-                file_rows = list(reader)
-                all_data.extend(file_rows)
-                file_summary[file_data['name']] = {
-                    'type': 'CSV',
-                    'rows': len(file_rows),
-                    'columns': file_data['analysis'].get('columns', [])
-                }
-            elif file_data['analysis'].get('file_type') == 'Excel':
-                file_rows = file_data['analysis'].get('sample_data', [])
-                all_data.extend(file_rows)
-                file_summary[file_data['name']] = {
-                    'type': 'Excel',
-                    'rows': len(file_rows),
-                    'columns': file_data['analysis'].get('columns', [])
-                }
+            table = load_table(file_data)
+            if table is None:
+                continue
+            tables.append(table)
+            file_summary[file_data['name']] = {
+                'type': file_data['analysis'].get('file_type'),
+                'rows': table.n_rows,
+                'columns': table.columns
+            }
         
         # Análise baseada no tipo de pergunta
         if 'produto' in question or 'item' in question or 'venda' in question:
-            return analyze_products(all_data, file_summary)
+            return analyze_products(tables, file_summary)
         elif 'cliente' in question or 'comprador' in question:
-            return analyze_clients(all_data, file_summary)
+            return analyze_clients(tables, file_summary)
         elif 'valor' in question or 'preço' in question or 'ticket' in question:
-            return analyze_values(all_data, file_summary)
+            return analyze_values(tables, file_summary)
         elif 'data' in question or 'tempo' in question or 'período' in question:
-            return analyze_timeline(all_data, file_summary)
+            return analyze_timeline(tables, file_summary)
         elif 'bairro' in question or 'local' in question or 'geografia' in question:
-            return analyze_geography(all_data, file_summary)
+            return analyze_geography(tables, file_summary)
         elif 'quantidade' in question or 'qtd' in question:
-            return analyze_quantities(all_data, file_summary)
+            return analyze_quantities(tables, file_summary)
         else:
-            return generate_general_analysis(all_data, file_summary, question)
+            return generate_general_analysis(tables, file_summary, question)
             
     except Exception as e:
         return {
@@ -1555,9 +1667,10 @@ def analyze_data_with_ai(question):
             'status': 'error'
         }
 
-def analyze_products(data, file_summary):
+def analyze_products(tables, file_summary):
     """Análise de produtos"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado de produto encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1566,13 +1679,13 @@ def analyze_products(data, file_summary):
     
     # Procura colunas relacionadas a produtos
     product_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['produto', 'item', 'nome', 'descrição']):
             product_columns.append(col)
     
     if product_columns:
         # Simula análise de produtos
-        total_products = len(set(row.get(product_columns[0], '') for row in data if row.get(product_columns[0], '')))
+        total_products = len(distinct_values(tables, product_columns[0]))
         
         response = f"""
 📊 **Análise de Produtos:**
@@ -1583,7 +1696,7 @@ def analyze_products(data, file_summary):
 
 💡 **Insights:**
 - Os dados contêm informações de {total_products} produtos diferentes
-- Análise baseada em {len(data)} registros totais
+- Análise baseada em {total_records} registros totais
 - Recomendo usar o relatório "Produtos Mais Vendidos" para análise detalhada
 
 🔍 **Próximos passos:**
@@ -1601,9 +1714,10 @@ def analyze_products(data, file_summary):
         'analysis_type': 'products'
     }
 
-def analyze_clients(data, file_summary):
+def analyze_clients(tables, file_summary):
     """Análise de clientes"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado de cliente encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1612,11 +1726,11 @@ def analyze_clients(data, file_summary):
     
     # Procura colunas relacionadas a clientes
     client_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['cliente', 'nome', 'telefone', 'email', 'cpf']):
             client_columns.append(col)
     
-    total_clients = len(set(row.get(client_columns[0], '') for row in data if row.get(client_columns[0], ''))) if client_columns else len(data)
+    total_clients = len(distinct_values(tables, client_columns[0])) if client_columns else total_records
     
     response = f"""
 👥 **Análise de Clientes:**
@@ -1627,7 +1741,7 @@ def analyze_clients(data, file_summary):
 
 💡 **Insights:**
 - Base de dados com {total_clients} clientes
-- Análise baseada em {len(data)} registros totais
+- Análise baseada em {total_records} registros totais
 - Recomendo usar os filtros de "Dias Inativos" e "Ticket Médio"
 
 🔍 **Segmentações disponíveis:**
@@ -1648,9 +1762,10 @@ def analyze_clients(data, file_summary):
         'analysis_type': 'clients'
     }
 
-def analyze_values(data, file_summary):
+def analyze_values(tables, file_summary):
     """Análise de valores"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado de valor encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1659,7 +1774,7 @@ def analyze_values(data, file_summary):
     
     # Procura colunas de valor
     value_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['valor', 'preço', 'price', 'total', 'amount']):
             value_columns.append(col)
     
@@ -1668,7 +1783,7 @@ def analyze_values(data, file_summary):
 
 • **Colunas de valor encontradas:** {', '.join(value_columns) if value_columns else 'Nenhuma específica'}
 • **Arquivos analisados:** {len(file_summary)}
-• **Total de registros:** {len(data)}
+• **Total de registros:** {total_records}
 
 💡 **Insights:**
 - Dados financeiros disponíveis para análise
@@ -1692,9 +1807,10 @@ def analyze_values(data, file_summary):
         'analysis_type': 'values'
     }
 
-def analyze_timeline(data, file_summary):
+def analyze_timeline(tables, file_summary):
     """Análise temporal"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado temporal encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1703,7 +1819,7 @@ def analyze_timeline(data, file_summary):
     
     # Procura colunas de data
     date_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['data', 'date', 'tempo', 'hora']):
             date_columns.append(col)
     
@@ -1712,7 +1828,7 @@ def analyze_timeline(data, file_summary):
 
 • **Colunas de data encontradas:** {', '.join(date_columns) if date_columns else 'Nenhuma específica'}
 • **Arquivos analisados:** {len(file_summary)}
-• **Total de registros:** {len(data)}
+• **Total de registros:** {total_records}
 
 💡 **Insights:**
 - Dados temporais disponíveis para análise
@@ -1736,9 +1852,10 @@ def analyze_timeline(data, file_summary):
         'analysis_type': 'timeline'
     }
 
-def analyze_geography(data, file_summary):
+def analyze_geography(tables, file_summary):
     """Análise geográfica"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado geográfico encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1747,7 +1864,7 @@ def analyze_geography(data, file_summary):
     
     # Procura colunas geográficas
     geo_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['bairro', 'cidade', 'endereço', 'local', 'região']):
             geo_columns.append(col)
     
@@ -1756,7 +1873,7 @@ def analyze_geography(data, file_summary):
 
 • **Colunas geográficas encontradas:** {', '.join(geo_columns) if geo_columns else 'Nenhuma específica'}
 • **Arquivos analisados:** {len(file_summary)}
-• **Total de registros:** {len(data)}
+• **Total de registros:** {total_records}
 
 💡 **Insights:**
 - Dados geográficos disponíveis para análise
@@ -1780,9 +1897,10 @@ def analyze_geography(data, file_summary):
         'analysis_type': 'geography'
     }
 
-def analyze_quantities(data, file_summary):
+def analyze_quantities(tables, file_summary):
     """Análise de quantidades"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado de quantidade encontrado nos arquivos carregados.',
             'timestamp': datetime.now().isoformat(),
@@ -1791,7 +1909,7 @@ def analyze_quantities(data, file_summary):
     
     # Procura colunas de quantidade
     qty_columns = []
-    for col in data[0].keys() if data else []:
+    for col in all_columns(tables):
         if any(keyword in col.lower() for keyword in ['quantidade', 'qtd', 'quantity', 'amount']):
             qty_columns.append(col)
     
@@ -1800,7 +1918,7 @@ def analyze_quantities(data, file_summary):
 
 • **Colunas de quantidade encontradas:** {', '.join(qty_columns) if qty_columns else 'Nenhuma específica'}
 • **Arquivos analisados:** {len(file_summary)}
-• **Total de registros:** {len(data)}
+• **Total de registros:** {total_records}
 
 💡 **Insights:**
 - Dados de quantidade disponíveis para análise
@@ -1824,22 +1942,20 @@ def analyze_quantities(data, file_summary):
         'analysis_type': 'quantities'
     }
 
-def generate_general_analysis(data, file_summary, question):
+def generate_general_analysis(tables, file_summary, question):
     """Análise geral dos dados"""
-    if not data:
+    total_records = total_rows(tables)
+    if not total_records:
         return {
             'response': 'Nenhum dado encontrado para análise.',
             'timestamp': datetime.now().isoformat(),
             'status': 'no_data'
         }
     
-    total_records = len(data)
     total_files = len(file_summary)
     
     # Analisa colunas disponíveis
-    all_columns = set()
-    for file_info in file_summary.values():
-        all_columns.update(file_info.get('columns', []))
+    columns = all_columns(tables)
     
     response = f"""
 🤖 **Análise Inteligente dos Dados:**
@@ -1847,13 +1963,13 @@ def generate_general_analysis(data, file_summary, question):
 📊 **Resumo Geral:**
 • **Total de registros:** {total_records}
 • **Arquivos analisados:** {total_files}
-• **Colunas disponíveis:** {len(all_columns)}
+• **Colunas disponíveis:** {len(columns)}
 
 🔍 **Pergunta:** "{question}"
 
 💡 **Análise Automática:**
 - Dados carregados com sucesso
-- {len(all_columns)} colunas diferentes identificadas
+- {len(columns)} colunas diferentes identificadas
 - Análise cruzada disponível
 
 📋 **Funcionalidades disponíveis:**
@@ -1896,29 +2012,22 @@ def apply_filters():
                 'message': 'Nenhum arquivo carregado para aplicar filtros'
             })
         
-        # Simula análise com filtros
-        total_clients = 0
-        total_value = 0
-        average_ticket = 0
-        
-        # Análise básica dos dados
-        for file_data in file_storage.values():
-            if file_data['analysis'].get('file_type') == 'CSV':
-                total_clients += file_data['analysis'].get('total_rows', 0)
-        
-        # Simula valores baseados nos filtros
-        if dias_inativos:
-            total_clients = max(1, total_clients // int(dias_inativos))
+        # Tabela por cliente montada uma vez; cada filtro é só busca binária
+        index = get_customer_index()
+        if not len(index):
+            return jsonify({
+                'success': False,
+                'message': 'Nenhum pedido com cliente e data encontrado nos arquivos carregados'
+            })
         
-        if ticket_medio:
-            ticket_value = int(ticket_medio)
-            total_value = total_clients * ticket_value
-            average_ticket = ticket_value
+        totals = index.query(**parse_filters(data))
         
         results = {
-            'total_clients': total_clients,
-            'total_value': f"{total_value:,.2f}",
-            'average_ticket': f"{average_ticket:,.2f}",
+            'total_clients': totals['total_clients'],
+            'total_orders': totals['total_orders'],
+            'total_value': f"{totals['total_value']:,.2f}",
+            'average_ticket': f"{totals['average_ticket']:,.2f}",
+            'customers_indexed': len(index),
             'filters_applied': {
                 'dias_inativos': dias_inativos,
                 'ticket_medio': ticket_medio
@@ -1930,16 +2039,16 @@ def apply_filters():
             'results': results
         })
         
+    except ValueError as e:
+        return jsonify({'error': f'Filtro inválido: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao aplicar filtros: {str(e)}'}), 500
 
 @app.route('/api/filters/export', methods=['POST'])
 def export_filtered_data():
-    """Exporta dados filtrados"""
+    """Exporta os clientes filtrados em CSV (gerado em streaming)"""
     try:
         data = request.get_json()
-        dias_inativos = data.get('dias_inativos', '')
-        ticket_medio = data.get('ticket_medio', '')
         
         if not file_storage:
             return jsonify({
@@ -1947,25 +2056,31 @@ def export_filtered_data():
                 'error': 'Nenhum arquivo carregado para exportar'
             })
         
-        # Simula exportação
+        filters = parse_filters(data)
+        index = get_customer_index()
+        
         export_filename = f"dados_filtrados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        return jsonify({
-            'success': True,
-            'message': f'Arquivo {export_filename} gerado com sucesso!',
-            'filename': export_filename,
-            'filters': {
-                'dias_inativos': dias_inativos,
-                'ticket_medio': ticket_medio
-            }
-        })
+        # BOM para o Excel abrir os acentos corretamente
+        def generate():
+            yield '\ufeff'
+            for chunk in index.iter_csv(**filters):
+                yield chunk
         
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={export_filename}'}
+        )
+        
+    except ValueError as e:
+        return jsonify({'error': f'Filtro inválido: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao exportar dados: {str(e)}'}), 500
 
 @app.route('/api/segments/analyze', methods=['POST'])
 def analyze_segments():
-    """Analisa segmentação de clientes"""
+    """Analisa segmentação de clientes (segmento pelo nome ou combinação com &, |, ! e parênteses)"""
     try:
         data = request.get_json()
         segment = data.get('segment', '')
@@ -1983,37 +2098,43 @@ def analyze_segments():
             'vip': 'Clientes VIP'
         }
         
-        # Simula análise de segmentação
-        total_clients = sum(f['analysis'].get('total_rows', 0) for f in file_storage.values())
-        
-        if segment == 'ativos':
-            segment_clients = total_clients // 3
-            total_value = segment_clients * 150
-            average_ticket = 150
-            insights = "Clientes com atividade recente e engajamento alto."
-        elif segment == 'inativos':
-            segment_clients = total_clients // 4
-            total_value = segment_clients * 50
-            average_ticket = 50
-            insights = "Clientes que precisam de reativação e campanhas especiais."
-        elif segment == 'vip':
-            segment_clients = total_clients // 10
-            total_value = segment_clients * 500
-            average_ticket = 500
-            insights = "Clientes de alto valor que merecem atenção especial."
-        else:
-            segment_clients = 0
-            total_value = 0
-            average_ticket = 0
-            insights = "Segmento não reconhecido."
+        insights_by_segment = {
+            'ativos': "Clientes com atividade recente e engajamento alto.",
+            'inativos': "Clientes que precisam de reativação e campanhas especiais.",
+            'vip': "Clientes de alto valor que merecem atenção especial."
+        }
+        
+        segments = get_segments()
+        if not segments.size:
+            return jsonify({
+                'success': False,
+                'message': 'Nenhum pedido com cliente e data encontrado nos arquivos carregados'
+            })
+        
+        # Expressão livre ('vip & !inativos:90') ou estruturada ({'and': [...]})
+        expression = data.get('expression') or segment
+        try:
+            summary = segments.summary(expression)
+        except (KeyError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': str(e).strip("'"),
+                'available_segments': segments.names()
+            })
+        
+        insights = insights_by_segment.get(segment, "Segmento combinado a partir dos filtros selecionados.")
+        if segment == 'vip':
+            insights += f" Gasto total a partir de R$ {segments.vip_threshold:,.2f}."
         
         results = {
-            'segment_name': segment_names.get(segment, 'Segmento Desconhecido'),
-            'total_clients': segment_clients,
-            'total_value': f"{total_value:,.2f}",
-            'average_ticket': f"{average_ticket:,.2f}",
-            'last_purchase': datetime.now().strftime('%d/%m/%Y'),
-            'insights': insights
+            'segment_name': segment_names.get(segment, str(expression)),
+            'total_clients': summary['total_clients'],
+            'total_orders': summary['total_orders'],
+            'total_value': f"{summary['total_value']:,.2f}",
+            'average_ticket': f"{summary['average_ticket']:,.2f}",
+            'last_purchase': summary['last_purchase'],
+            'insights': insights,
+            'available_segments': segments.names()
         }
         
         return jsonify({
@@ -2024,6 +2145,41 @@ def analyze_segments():
     except Exception as e:
         return jsonify({'error': f'Erro na análise de segmentação: {str(e)}'}), 500
 
+@app.route('/api/segments/export', methods=['POST'])
+def export_segment():
+    """Exporta os clientes de um segmento (ou combinação) em CSV gerado em streaming"""
+    try:
+        data = request.get_json()
+        expression = data.get('expression') or data.get('segment', '')
+        
+        if not file_storage:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum arquivo carregado para exportar'
+            })
+        
+        segments = get_segments()
+        try:
+            bitmap = segments.evaluate(expression)
+        except (KeyError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e).strip("'")}), 400
+        
+        export_filename = f"segmento_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        
+        def generate():
+            yield '\ufeff'
+            for chunk in segments.customers.write_csv(bitmap_positions(bitmap)):
+                yield chunk
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={export_filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro ao exportar segmento: {str(e)}'}), 500
+
 @app.route('/api/reports/business', methods=['POST'])
 def generate_business_reports():
     """Gera relatórios específicos de negócio"""
@@ -2031,87 +2187,31 @@ def generate_business_reports():
         if not file_storage:
             return jsonify({'error': 'Nenhum arquivo carregado para gerar relatórios'}), 400
         
-        # Simula geração dos 5 relatórios específicos
-        reports = [
-            {
-                'name': 'Novos Clientes Google Contacts',
-                'description': 'Lista de novos clientes para importar no Google Contacts',
-                'type': 'CSV',
-                'filename': 'novos_clientes_google_contacts.csv'
-            },
-            {
-                'name': 'Clientes Inativos',
-                'description': 'Análise de clientes inativos para campanhas de reativação',
-                'type': 'Excel',
-                'filename': 'clientes_inativos.xlsx'
-            },
-            {
-                'name': 'Clientes Alto Ticket',
-                'description': 'Análise de clientes premium para ofertas especiais',
-                'type': 'Excel',
-                'filename': 'clientes_alto_ticket.xlsx'
-            },
-            {
-                'name': 'Análise Geográfica',
-                'description': 'Análise por bairros para campanhas Meta',
-                'type': 'Excel',
-                'filename': 'analise_geografica.xlsx'
-            },
-            {
-                'name': 'Produtos Mais Vendidos',
-                'description': 'Ranking de produtos mais vendidos',
-                'type': 'Excel',
-                'filename': 'produtos_mais_vendidos.xlsx'
-            }
-        ]
+        business = get_business_reports()
+        if not business.sources:
+            return jsonify({'error': BUSINESS_FILES_HINT}), 400
         
-        # Simula dados dos relatórios
-        total_clients = sum(f['analysis'].get('total_rows', 0) for f in file_storage.values())
-        total_files = len(file_storage)
+        reports = business.describe()
+        available = [r for r in reports if r['available']]
         
         files = [
             {
-                'name': 'novos_clientes_google_contacts.csv',
-                'type': 'CSV',
-                'size': f'{total_clients * 50} bytes',
-                'description': 'Lista para Google Contacts'
-            },
-            {
-                'name': 'clientes_inativos.xlsx',
-                'type': 'Excel',
-                'size': f'{total_clients // 4 * 200} bytes',
-                'description': 'Clientes inativos há 30+ dias'
-            },
-            {
-                'name': 'clientes_alto_ticket.xlsx',
-                'type': 'Excel',
-                'size': f'{total_clients // 3 * 200} bytes',
-                'description': 'Clientes com ticket médio alto'
-            },
-            {
-                'name': 'analise_geografica.xlsx',
-                'type': 'Excel',
-                'size': f'{50 * 200} bytes',
-                'description': 'Análise por bairros'
-            },
-            {
-                'name': 'produtos_mais_vendidos.xlsx',
-                'type': 'Excel',
-                'size': f'{20 * 200} bytes',
-                'description': 'Top 20 produtos'
+                'name': r['filename'],
+                'type': r['type'],
+                'records': r['records'],
+                'size': f"{r['size']} bytes" if r['size'] is not None else 'gerado no download',
+                'description': r['description'],
+                'url': f"/api/reports/business/files/{r['filename']}"
             }
+            for r in available
         ]
         
         return jsonify({
             'success': True,
-            'message': f'5 relatórios de negócio gerados com sucesso!',
-            'reports': reports,
+            'message': f'{len(available)} relatórios de negócio gerados com sucesso!',
+            'reports': available,
             'files': files,
-            'summary': {
-                'total_reports': 5,
-                'total_clients_analyzed': total_clients,
-                'files_processed': total_files
-            }
+            'summary': business_summary(business, reports)
         })
         
     except Exception as e:
@@ -2124,66 +2224,43 @@ def get_business_report_details():
         if not file_storage:
             return jsonify({'error': 'Nenhum arquivo carregado'}), 400
         
-        # Simula dados dos relatórios
-        total_clients = sum(f['analysis'].get('total_rows', 0) for f in file_storage.values())
-        total_files = len(file_storage)
+        business = get_business_reports()
+        if not business.sources:
+            return jsonify({'error': BUSINESS_FILES_HINT}), 400
         
-        reports = [
-            {
-                'name': 'Novos Clientes Google Contacts',
-                'description': 'Lista de novos clientes para importar no Google Contacts',
-                'type': 'CSV',
-                'filename': 'novos_clientes_google_contacts.csv',
-                'records': total_clients,
-                'usage': 'Importar no Google Contacts para adicionar novos clientes'
-            },
-            {
-                'name': 'Clientes Inativos',
-                'description': 'Análise de clientes inativos para campanhas de reativação',
-                'type': 'Excel',
-                'filename': 'clientes_inativos.xlsx',
-                'records': total_clients // 4,
-                'usage': 'Usar para campanhas de reativação de clientes'
-            },
-            {
-                'name': 'Clientes Alto Ticket',
-                'description': 'Análise de clientes premium para ofertas especiais',
-                'type': 'Excel',
-                'filename': 'clientes_alto_ticket.xlsx',
-                'records': total_clients // 3,
-                'usage': 'Usar para ofertas premium e VIP'
-            },
-            {
-                'name': 'Análise Geográfica',
-                'description': 'Análise por bairros para campanhas Meta',
-                'type': 'Excel',
-                'filename': 'analise_geografica.xlsx',
-                'records': 50,
-                'usage': 'Usar para campanhas Meta Ads por bairro'
-            },
-            {
-                'name': 'Produtos Mais Vendidos',
-                'description': 'Ranking de produtos mais vendidos',
-                'type': 'Excel',
-                'filename': 'produtos_mais_vendidos.xlsx',
-                'records': 20,
-                'usage': 'Analisar produtos mais populares'
-            }
-        ]
+        reports = business.describe()
         
         return jsonify({
             'success': True,
             'reports': reports,
-            'summary': {
-                'total_reports': 5,
-                'total_clients_analyzed': total_clients,
-                'files_processed': total_files
-            }
+            'summary': business_summary(business, reports)
         })
         
     except Exception as e:
         return jsonify({'error': f'Erro ao obter detalhes: {str(e)}'}), 500
 
+@app.route('/api/reports/business/files/<filename>')
+def download_business_report(filename):
+    """Baixa um relatório de negócio (o arquivo é gerado no primeiro download)"""
+    try:
+        if not file_storage:
+            return jsonify({'error': 'Nenhum arquivo carregado'}), 400
+        
+        from src.business_reports import MIMETYPES
+        
+        content = get_business_reports().render(filename)
+        if content is None:
+            return jsonify({'error': f'Relatório não disponível: {filename}'}), 404
+        
+        return Response(
+            content,
+            mimetype=MIMETYPES[filename.rsplit('.', 1)[1]],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro ao baixar relatório: {str(e)}'}), 500
+
 @app.route('/api/test')
 def test():
     """Endpoint de teste"""
@@ -1,30 +1,37 @@
 #!/usr/bin/env python3
 """
 ZapCampanhas API - Versão sem pandas para Vercel
-Usa apenas CSV nativo para máxima compatibilidade
+Usa apenas a biblioteca padrão: os relatórios (inativos, alto ticket, bairros,
+produtos) saem do motor Python do núcleo de análise, que lê cada arquivo em
+streaming e guarda só os agregados por cliente, bairro e produto
 """
 
 from flask import Flask, render_template, request, redirect, url_for, send_file, flash, jsonify
+from werkzeug.utils import secure_filename
 import os
+import sys
 from pathlib import Path
-import csv
 import json
 import gc
 import time
 from functools import wraps
 from datetime import datetime
-import io
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.analysis_core import DEFAULT_CONFIG, PythonEngine, read_source, report_files, summarize
 
 # Configurações
 INPUT_DIR = Path("data/input")
 OUTPUT_DIR = Path("data/output")
 UPLOAD_FOLDER = INPUT_DIR
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
 
 # Limites para Vercel
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 MAX_PROCESSING_TIME = 20  # 20 segundos
 MAX_MEMORY_USAGE = 256  # 256MB
+UPLOAD_TTL = 30 * 60  # uploads esquecidos depois de 30 minutos
 
 # Cria diretórios se não existirem
 INPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -35,22 +42,27 @@ app.secret_key = 'zapcampanhas_secret_key'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
-# Cache global
-global_data = None
+# Arquivos carregados por tipo (contacts, clientes, pedidos, itens) → {'path', 'uploaded'}
+uploaded_files = {}
 last_activity = time.time()
 
+analysis_engine = PythonEngine()
+
 def cleanup_memory():
-    """Limpa memória"""
-    global global_data
-    if time.time() - last_activity > 300:  # 5 minutos
-        global_data = None
+    """Limpa memória (esquece só os uploads que passaram de UPLOAD_TTL)"""
+    now = time.time()
+    for file_type, info in list(uploaded_files.items()):
+        if now - info['uploaded'] > UPLOAD_TTL:
+            uploaded_files.pop(file_type, None)
     gc.collect()
 
 def check_limits(func):
     """Decorator para verificar limites"""
     @wraps(func)
     def wrapper(*args, **kwargs):
+        global last_activity
         start_time = time.time()
+        last_activity = start_time
         if time.time() - start_time > MAX_PROCESSING_TIME:
             return jsonify({'error': 'Tempo limite excedido'}), 408
         cleanup_memory()
@@ -60,35 +72,24 @@ def check_limits(func):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def read_csv_file(file_path):
-    """Lê arquivo CSV sem pandas"""
-    data = []
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                data.append(row)
-    except Exception as e:
-        print(f"Erro ao ler CSV: {e}")
-    return data
-
-def process_csv_data(data):
-    """Processa dados CSV simples"""
-    if not data:
+def summarize_file(file_path, sample_size=5):
+    """Resumo do arquivo (linhas, colunas e amostra) lido em streaming, sem guardar as linhas"""
+    header, rows = read_source(file_path)
+    if not header:
         return {"error": "Nenhum dado encontrado"}
     
-    # Estatísticas básicas
-    total_rows = len(data)
-    columns = list(data[0].keys()) if data else []
+    total_rows = 0
+    sample_data = []
+    for row in rows:
+        if total_rows < sample_size:
+            sample_data.append(dict(zip(header, row)))
+        total_rows += 1
     
-    # Análise simples
-    analysis = {
+    return {
         "total_rows": total_rows,
-        "columns": columns,
-        "sample_data": data[:5] if data else []
+        "columns": header,
+        "sample_data": sample_data
     }
-    
-    return analysis
 
 @app.route('/')
 def index():
@@ -115,17 +116,17 @@ def upload_file():
         return jsonify({'error': f'Arquivo muito grande. Máximo: {MAX_FILE_SIZE // (1024*1024)}MB'}), 400
     
     if not allowed_file(file.filename):
-        return jsonify({'error': 'Tipo de arquivo não permitido. Use CSV.'}), 400
+        return jsonify({'error': 'Tipo de arquivo não permitido. Use CSV ou Excel (.xlsx).'}), 400
     
     try:
         # Salva arquivo
         filename = secure_filename(file.filename)
         file_path = UPLOAD_FOLDER / filename
         file.save(file_path)
+        uploaded_files[file_type] = {'path': file_path, 'uploaded': time.time()}
         
-        # Processa dados
-        data = read_csv_file(file_path)
-        analysis = process_csv_data(data)
+        # Resumo em streaming (o arquivo não é carregado inteiro na memória)
+        analysis = summarize_file(file_path)
         
         # Salva relatório
         report_path = OUTPUT_DIR / f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -134,26 +135,64 @@ def upload_file():
         
         return jsonify({
             'success': True,
-            'message': f'Arquivo processado com sucesso! {len(data)} linhas analisadas.',
+            'message': f'Arquivo processado com sucesso! {analysis.get("total_rows", 0)} linhas analisadas.',
             'analysis': analysis
         })
         
     except Exception as e:
         return jsonify({'error': f'Erro no processamento: {str(e)}'}), 500
 
+@app.route('/process', methods=['POST'])
+@check_limits
+def process_data():
+    """Gera os relatórios da ZapChicken com o motor Python (uma passada por arquivo)"""
+    missing_files = [f for f in ('clientes', 'pedidos') if f not in uploaded_files]
+    if missing_files:
+        return jsonify({'error': f'Arquivos faltando: {", ".join(missing_files)}'}), 400
+    
+    params = request.get_json(silent=True) or request.form
+    try:
+        dias_inatividade = int(params.get('dias_inatividade', DEFAULT_CONFIG['dias_inatividade']))
+        ticket_minimo = float(params.get('ticket_minimo', DEFAULT_CONFIG['ticket_medio_minimo']))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Parâmetros inválidos'}), 400
+    
+    try:
+        start_time = time.time()
+        results = analysis_engine.run({t: info['path'] for t, info in uploaded_files.items()}, dias_inatividade, ticket_minimo)
+        
+        # Relatórios em CSV (sem openpyxl no bundle), escritos direto no disco
+        generated = []
+        for filename, table in report_files(results, 'csv').items():
+            with open(OUTPUT_DIR / filename, 'w', encoding='utf-8', newline='') as f:
+                table.write_csv(f)
+            generated.append(filename)
+        
+        return jsonify({
+            'success': True,
+            'message': f'✅ {len(generated)} relatórios gerados em {time.time() - start_time:.1f}s',
+            'results': summarize(results),
+            'files': generated,
+            'engine': analysis_engine.name
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro no processamento: {str(e)}'}), 500
+
 @app.route('/check_files')
 def check_files():
     """Verifica arquivos disponíveis"""
     try:
         files = []
         if OUTPUT_DIR.exists():
-            for file in OUTPUT_DIR.glob('*.json'):
+            for file in sorted(OUTPUT_DIR.glob('*.csv')) + sorted(OUTPUT_DIR.glob('*.json')):
                 stat = file.stat()
                 mtime = stat.st_mtime
                 local_time = datetime.fromtimestamp(mtime)
                 modified_str = local_time.strftime('%d/%m/%Y %H:%M')
                 
                 files.append({
+                    'filename': file.name,
                     'name': file.name,
                     'size': stat.st_size,
                     'modified': modified_str,
@@ -170,7 +209,7 @@ def download_file(filename):
     try:
         file_path = OUTPUT_DIR / filename
         if file_path.exists():
-            return send_file(file_path, as_attachment=True)
+            return send_file(file_path.resolve(), as_attachment=True)
         else:
             return jsonify({'error': 'Arquivo não encontrado'}), 404
     except Exception as e:
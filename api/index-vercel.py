@@ -9,12 +9,20 @@ import base64
 import io
 import csv
 from datetime import datetime
+from pathlib import Path
+
+from src.upload_spool import spool_stream
+from src.storage import get_storage
+from src.analysis_core import SUPPORTED_EXTENSIONS, get_engine, summarize
 
 app = Flask(__name__)
 
-# Armazenamento temporário em memória (para Vercel)
-file_storage = {}
-uploaded_files = {}
+# Armazenamento persistente (blobs por hash + índice em /tmp; um arquivo por tipo)
+storage = get_storage('api-vercel')
+uploaded_files = storage.files
+
+# Motor de análise compartilhado (sem pandas no bundle do Vercel, 'auto' cai no motor Python)
+analysis_engine = get_engine()
 
 # HTML template com funcionalidades reais
 HTML_TEMPLATE = """
@@ -60,7 +68,7 @@ HTML_TEMPLATE = """
                             <h6><i class="fas fa-address-book"></i> 1. Contacts (Google Contacts)</h6>
                             <form action="/upload" method="post" enctype="multipart/form-data" class="d-inline">
                                 <input type="hidden" name="file_type" value="contacts">
-                                <input type="file" name="file" accept=".csv,.xlsx,.xls" class="form-control mb-2" required>
+                                <input type="file" name="file" accept=".csv,.xlsx" class="form-control mb-2" required>
                                 <button type="submit" class="btn btn-primary btn-sm">
                                     <i class="fas fa-upload"></i> Enviar
                                 </button>
@@ -73,7 +81,7 @@ HTML_TEMPLATE = """
                             <h6><i class="fas fa-users"></i> 2. Lista de Clientes</h6>
                             <form action="/upload" method="post" enctype="multipart/form-data" class="d-inline">
                                 <input type="hidden" name="file_type" value="clientes">
-                                <input type="file" name="file" accept=".xlsx,.xls" class="form-control mb-2" required>
+                                <input type="file" name="file" accept=".xlsx" class="form-control mb-2" required>
                                 <button type="submit" class="btn btn-primary btn-sm">
                                     <i class="fas fa-upload"></i> Enviar
                                 </button>
@@ -86,7 +94,7 @@ HTML_TEMPLATE = """
                             <h6><i class="fas fa-shopping-cart"></i> 3. Histórico de Pedidos</h6>
                             <form action="/upload" method="post" enctype="multipart/form-data" class="d-inline">
                                 <input type="hidden" name="file_type" value="pedidos">
-                                <input type="file" name="file" accept=".xlsx,.xls" class="form-control mb-2" required>
+                                <input type="file" name="file" accept=".xlsx" class="form-control mb-2" required>
                                 <button type="submit" class="btn btn-primary btn-sm">
                                     <i class="fas fa-upload"></i> Enviar
                                 </button>
@@ -99,7 +107,7 @@ HTML_TEMPLATE = """
                             <h6><i class="fas fa-box"></i> 4. Histórico de Itens</h6>
                             <form action="/upload" method="post" enctype="multipart/form-data" class="d-inline">
                                 <input type="hidden" name="file_type" value="itens">
-                                <input type="file" name="file" accept=".xlsx,.xls" class="form-control mb-2" required>
+                                <input type="file" name="file" accept=".xlsx" class="form-control mb-2" required>
                                 <button type="submit" class="btn btn-primary btn-sm">
                                     <i class="fas fa-upload"></i> Enviar
                                 </button>
@@ -307,19 +315,22 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'})
         
-        # Lê o conteúdo do arquivo
-        file_content = file.read()
-        file_size = len(file_content)
+        # Só formatos que o motor de análise lê (.xls antigo falharia no processamento)
+        if Path(file.filename).suffix.lower() not in SUPPORTED_EXTENSIONS:
+            return jsonify({'error': 'Formato não suportado. Use CSV ou Excel (.xlsx); salve arquivos .xls como .xlsx.'})
         
-        # Armazena o arquivo
-        file_id = f"{file_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        uploaded_files[file_type] = {
-            'filename': file.filename,
-            'content': file_content,
-            'size': file_size,
-            'type': file_type,
-            'uploaded_at': datetime.now().isoformat()
-        }
+        # Grava o arquivo em blocos no spool e depois no armazenamento (substitui o do mesmo tipo)
+        upload = spool_stream(file.stream, file.filename)
+        try:
+            storage.add_file(upload, {
+                'id': file_type or 'arquivo',
+                'name': file.filename,
+                'uploaded': datetime.now().isoformat(),
+                'analysis': {'type': file_type}
+            })
+        finally:
+            upload.delete()
+        file_size = upload.size
         
         return jsonify({
             'success': True,
@@ -344,13 +355,17 @@ def process_data():
                 'message': f'Arquivos faltando: {", ".join(missing_files)}'
             })
         
-        # Simula processamento
         total_files = len(uploaded_files)
         total_size = sum(f['size'] for f in uploaded_files.values())
         
+        # Relatórios pelo núcleo de análise, lendo os arquivos direto do armazenamento
+        resumo = summarize(analysis_engine.run({t: storage.blob_path(f) for t, f in uploaded_files.items()}))
+        
         return jsonify({
             'success': True,
-            'message': f'Dados processados com sucesso! {total_files} arquivos ({total_size} bytes total)'
+            'message': f'Dados processados com sucesso! {total_files} arquivos ({total_size} bytes total)',
+            'results': resumo,
+            'engine': analysis_engine.name
         })
         
     except Exception as e:
@@ -363,8 +378,8 @@ def get_files_status():
         files = []
         for file_type, file_data in uploaded_files.items():
             files.append({
-                'name': file_data['filename'],
-                'message': f"Carregado em {file_data['uploaded_at']} ({file_data['size']} bytes)"
+                'name': file_data['name'],
+                'message': f"Carregado em {file_data['uploaded']} ({file_data['size']} bytes)"
             })
         
         return jsonify(files)
@@ -4,16 +4,26 @@ ZapCampanhas API - Endpoint principal para Vercel
 Versão otimizada para evitar overload
 """
 
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, jsonify
+# Só módulos leves na importação (cold start do serverless): pandas, o processador e a IA
+# são importados na primeira requisição que precisa deles
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 import os
+import sys
 from pathlib import Path
-import pandas as pd
 from werkzeug.utils import secure_filename
 import json
+import shutil
 import gc
 import time
+import uuid
 from functools import wraps
 
+from src.job_runner import JobRunner
+from src.session_cache import SessionCache
+from src.http_cache import init_http_cache, make_etag, not_modified, send_report
+from src.event_bus import EventBus, sse_response
+from src.report_preview import ReportPreviewCache, report_info, DEFAULT_PAGE_SIZE
+
 # Configurações
 INPUT_DIR = Path("data/input")
 OUTPUT_DIR = Path("data/output")
@@ -25,34 +35,66 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB (reduzido)
 MAX_PROCESSING_TIME = 20  # 20 segundos (margem maior)
 MAX_MEMORY_USAGE = 256  # 256MB (reduzido)
 
-# Cria diretórios se não existirem
-INPUT_DIR.mkdir(parents=True, exist_ok=True)
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Os diretórios de cada sessão são criados em session_dirs (nada é criado na importação)
 
 app = Flask(__name__)
 app.secret_key = 'zapcampanhas_secret_key'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
-# Cache global com limpeza automática
-global_processor = None
-global_data_loaded = False
-global_ai_gemini = None
-last_activity = time.time()
+# Compressão (Brotli/gzip) e ETag com 304 em todas as respostas
+init_http_cache(app)
+
+def remove_session_dirs(session_id):
+    """Apaga os arquivos de uma sessão expirada (uploads e relatórios)"""
+    for directory in (INPUT_DIR / session_id, OUTPUT_DIR / session_id):
+        shutil.rmtree(directory, ignore_errors=True)
+
+# Processadores por sessão (LRU com TTL e orçamento de memória); sessões expiradas perdem os diretórios
+session_cache = SessionCache(on_expire=remove_session_dirs)
+
+# Eventos de status por sessão (upload, etapas do processamento, relatórios prontos) enviados via SSE
+event_bus = EventBus()
+
+# Relatórios já lidos para visualização (invalidados pelo mtime)
+report_previews = ReportPreviewCache()
+
+# Tarefas em segundo plano (processamento fora da requisição)
+job_runner = JobRunner(max_workers=2)
 
 def cleanup_memory():
     """Limpa memória para evitar overload"""
-    global global_processor, global_data_loaded, global_ai_gemini
-    
-    # Limpa processador se inativo há muito tempo
-    if time.time() - last_activity > 300:  # 5 minutos
-        global_processor = None
-        global_data_loaded = False
-        global_ai_gemini = None
+    # Remove sessões inativas há mais que o TTL
+    session_cache.cleanup()
     
     # Força coleta de lixo
     gc.collect()
 
+def get_session_id():
+    """Id da sessão do navegador (criado no primeiro acesso)"""
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return session['sid']
+
+def session_dirs(session_id, create=False):
+    """Diretórios de entrada e saída exclusivos da sessão (criados só quando create=True)"""
+    input_dir = INPUT_DIR / session_id
+    output_dir = OUTPUT_DIR / session_id
+    if create:
+        input_dir.mkdir(parents=True, exist_ok=True)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    return input_dir, output_dir
+
+def get_session_entry(session_id=None):
+    """Entrada do cache da sessão, com o processador criado sob demanda"""
+    session_id = session_id or get_session_id()
+    
+    def create_processor():
+        from src.zapchicken_processor import ZapChickenProcessor
+        return ZapChickenProcessor(*session_dirs(session_id, create=True))
+    
+    return session_cache.get_or_create(session_id, create_processor)
+
 def check_limits(func):
     """Decorator para verificar limites do Vercel"""
     @wraps(func)
@@ -112,69 +154,128 @@ def upload_file():
         elif file_type == 'itens':
             filename = 'Historico_Itens_Vendidos.xlsx'
         
-        filepath = INPUT_DIR / filename
+        # O processamento em andamento lê os arquivos da sessão: nada muda até ele terminar
+        if job_runner.active(f'processamento:{get_session_id()}') is not None:
+            flash('⏳ Aguarde o processamento terminar para alterar os arquivos.')
+            return redirect(url_for('index'))
+        
+        input_dir, _ = session_dirs(get_session_id(), create=True)
+        filepath = input_dir / filename
         file.save(filepath)
+        event_bus.publish(get_session_id(), 'upload', {'file_type': file_type, 'filename': filename})
         flash(f'Arquivo {filename} carregado com sucesso!')
     else:
         flash('Tipo de arquivo não permitido')
     
     return redirect(url_for('index'))
 
+def wants_json():
+    """Requisição feita via fetch/AJAX (espera JSON em vez de redirecionamento)"""
+    return (request.is_json
+            or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            or request.accept_mimetypes.best == 'application/json')
+
+def job_events(session_id):
+    """Publica cada mudança da tarefa de processamento no canal da sessão"""
+    def on_update(job):
+        event_bus.publish(session_id, 'processamento', job.to_dict())
+        if job.finished_ok:
+            event_bus.publish(session_id, 'relatorios', {'relatorios': job.result.get('relatorios', [])})
+    return on_update
+
+def run_processing(job, session_id, dias_inatividade, ticket_minimo):
+    """Processamento completo executado em segundo plano, com progresso por etapa"""
+    entry = get_session_entry(session_id)
+    processor = entry.processor
+    
+    processor.config['dias_inatividade'] = dias_inatividade
+    processor.config['ticket_medio_minimo'] = ticket_minimo
+    
+    resultado = processor.run_pipeline(on_stage=job.stage)
+    reports = resultado['reports']
+    
+    entry.data_loaded = True
+    session_cache.update_size(session_id)
+    
+    # Limpa memória após processamento
+    gc.collect()
+    
+    return {
+        'novos_clientes': len(reports['novos_clientes']),
+        'clientes_inativos': len(reports['inativos']),
+        'alto_ticket': len(reports['alto_ticket']),
+        'bairros': len(reports['geo_data'].get('bairros_analise', [])) if reports['geo_data'] else 0,
+        'relatorios': [path.name for path in resultado['saved_files']]
+    }
+
 @app.route('/process', methods=['POST'])
 @check_limits
 def process_data():
-    global global_processor, global_data_loaded, last_activity
-    
     try:
-        start_time = time.time()
-        last_activity = time.time()
+        session_id = get_session_id()
         
         dias_inatividade = int(request.form.get('dias_inatividade', 30))
         ticket_minimo = float(request.form.get('ticket_minimo', 50))
         
-        # Importa e executa o processador real
-        from src.zapchicken_processor import ZapChickenProcessor
-        
-        # Inicializa processador global se não existir
-        if global_processor is None:
-            global_processor = ZapChickenProcessor(INPUT_DIR, OUTPUT_DIR)
-        
-        global_processor.config['dias_inatividade'] = dias_inatividade
-        global_processor.config['ticket_medio_minimo'] = ticket_minimo
-        
-        # Carrega e processa os arquivos com timeout mais agressivo
-        try:
-            global_processor.load_zapchicken_files()
-            
-            # Verifica tempo de execução a cada etapa
-            if time.time() - start_time > MAX_PROCESSING_TIME:
-                return jsonify({'error': 'Carregamento muito lento. Tente com arquivos menores.'}), 408
-            
-            global_processor.save_reports()
-            
-            # Verifica tempo final
-            if time.time() - start_time > MAX_PROCESSING_TIME:
-                return jsonify({'error': 'Processamento muito lento. Tente com menos dados.'}), 408
-                
-        except Exception as e:
-            return jsonify({'error': f'Erro no processamento: {str(e)}'}), 500
-        global_data_loaded = True
+        # Roda em segundo plano: a requisição retorna na hora com o id da tarefa
+        job_name = f'processamento:{session_id}'
+        params = {'dias_inatividade': dias_inatividade, 'ticket_minimo': ticket_minimo}
+        job = job_runner.active(job_name)
+        if job is not None and job.params != params:
+            # Não reaproveita uma tarefa que roda com outros parâmetros
+            message = 'Já existe um processamento em andamento com outros parâmetros. Aguarde ele terminar.'
+            if wants_json():
+                status = job.to_dict()
+                status['error'] = message
+                status['status_url'] = url_for('job_status', job_id=job.id)
+                return jsonify(status), 409
+            flash(message)
+            return redirect(url_for('index'))
+        if job is None:
+            job = job_runner.submit(lambda job: run_processing(job, session_id, dias_inatividade, ticket_minimo),
+                                    name=job_name, on_update=job_events(session_id), params=params)
         
-        # Limpa memória após processamento
-        cleanup_memory()
+        if wants_json():
+            status = job.to_dict()
+            status['status_url'] = url_for('job_status', job_id=job.id)
+            status['result_url'] = url_for('job_result', job_id=job.id)
+            return jsonify(status), 202
         
-        flash('Dados processados com sucesso! Relatórios gerados.')
+        flash(f'Processamento iniciado (tarefa {job.id}). Acompanhe o progresso no status dos dados.')
     except Exception as e:
+        if wants_json():
+            return jsonify({'error': f'Erro ao processar dados: {str(e)}'}), 500
         flash(f'Erro ao processar dados: {str(e)}')
     
     return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status e progresso por etapa de uma tarefa"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Resultado de uma tarefa concluída"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    if job.finished is None:
+        return jsonify({'error': 'Tarefa ainda em andamento', 'job': job.to_dict()}), 409
+    if not job.finished_ok:
+        return jsonify({'error': job.error, 'job': job.to_dict()}), 500
+    return jsonify({'job': job.to_dict(), 'result': job.result})
+
 @app.route('/download/<filename>')
 def download_file(filename):
     try:
-        file_path = OUTPUT_DIR / filename
+        _, output_dir = session_dirs(get_session_id())
+        file_path = output_dir / filename
         if file_path.exists():
-            return send_file(file_path, as_attachment=True)
+            return send_report(file_path)
         else:
             flash('Arquivo não encontrado')
             return redirect(url_for('index'))
@@ -193,9 +294,18 @@ def check_files():
         'produtos_mais_vendidos.xlsx': 'Produtos Mais Vendidos'
     }
     
+    _, output_dir = session_dirs(get_session_id())
+    # Versão = relatórios presentes com data de modificação e tamanho (polling sem mudança → 304)
+    versao = [(f, (output_dir / f).stat().st_mtime_ns, (output_dir / f).stat().st_size)
+              for f in files if (output_dir / f).exists()]
+    etag = make_etag('check_files', versao)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
     available = []
     for filename, name in files.items():
-        file_path = OUTPUT_DIR / filename
+        file_path = output_dir / filename
         if file_path.exists():
             # Obtém informações do arquivo
             stat = file_path.stat()
@@ -214,48 +324,49 @@ def check_files():
             # Formata com fuso horário correto
             modified_str = local_time.strftime('%d/%m/%Y %H:%M')
             
+            # Quantidade de linhas gravada junto com o relatório
+            meta = report_info(file_path)
+            
             available.append({
                 'filename': filename, 
                 'name': name,
                 'size': f"{size_kb} KB",
-                'modified': modified_str
+                'modified': modified_str,
+                'rows': meta['rows'] if meta else None
             })
     
-    return jsonify(available)
+    response = jsonify(available)
+    response.set_etag(etag)
+    return response
 
 @app.route('/view_file/<filename>')
 def view_file(filename):
-    """Visualiza conteúdo do arquivo"""
+    """Visualiza conteúdo do arquivo (paginado: offset, limit e columns separadas por vírgula)"""
     try:
-        file_path = OUTPUT_DIR / filename
+        _, output_dir = session_dirs(get_session_id())
+        file_path = output_dir / filename
         
         if not file_path.exists():
             return jsonify({'error': 'Arquivo não encontrado'})
         
-        # Lê o arquivo baseado na extensão
-        if filename.endswith('.csv'):
-            df = pd.read_csv(file_path, encoding='utf-8')
-        elif filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_path)
-        else:
+        if not filename.endswith(('.csv', '.xlsx', '.xls')):
             return jsonify({'error': 'Tipo de arquivo não suportado'})
         
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+        
+        # Página recortada do relatório em cache (o arquivo só é relido se mudar)
+        page, file_info = report_previews.page(file_path, offset, limit, columns)
+        
         # Converte para HTML com formatação
-        html_table = df.head(50).to_html(
+        html_table = page.to_html(
             classes=['table', 'table-striped', 'table-sm'],
             index=False,
             border=0,
             table_id='data-table'
         )
         
-        # Informações do arquivo
-        file_info = {
-            'total_rows': len(df),
-            'total_columns': len(df.columns),
-            'columns': df.columns.tolist(),
-            'preview_rows': min(50, len(df))
-        }
-        
         return jsonify({
             'html': html_table,
             'info': file_info,
@@ -273,8 +384,6 @@ def chat():
 @app.route('/chat_message', methods=['POST'])
 def chat_message():
     """Processa mensagem do chat"""
-    global global_processor, global_data_loaded
-    
     try:
         data = request.get_json()
         message = data.get('message', '')
@@ -284,30 +393,24 @@ def chat_message():
         
         # Importa e usa o chat com IA
         from src.zapchicken_ai_advanced import ZapChickenAI
-        from src.zapchicken_ai_gemini import ZapChickenAIGemini
-        from src.zapchicken_processor import ZapChickenProcessor
         
-        # Usa processador global se disponível
-        if global_processor is not None and global_data_loaded:
-            processor = global_processor
-        else:
-            # Se não há dados carregados, tenta carregar
-            if global_processor is None:
-                global_processor = ZapChickenProcessor(INPUT_DIR, OUTPUT_DIR)
-            
+        # Usa o processador da sessão se já tiver dados
+        session_id = get_session_id()
+        entry = get_session_entry(session_id)
+        processor = entry.processor
+        
+        if not entry.data_loaded:
             # Carrega os dados primeiro
-            dataframes = global_processor.load_zapchicken_files()
+            dataframes = processor.load_zapchicken_files()
             if not dataframes:
                 return jsonify({'error': 'Nenhum arquivo da ZapChicken encontrado. Faça upload dos arquivos primeiro.'})
             
-            global_data_loaded = True
-            processor = global_processor
+            entry.data_loaded = True
+            session_cache.update_size(session_id)
         
         # Tenta usar Gemini primeiro, depois fallback para IA avançada
-        global global_ai_gemini
-        
-        if global_ai_gemini is not None:
-            response = global_ai_gemini.process_question(message)
+        if entry.ai_gemini is not None:
+            response = entry.ai_gemini.process_question(message)
         else:
             ai = ZapChickenAI(processor)
             response = ai.process_question(message)
@@ -320,42 +423,80 @@ def chat_message():
         print(f"Erro detalhado no chat: {error_details}")
         return jsonify({'error': f'Erro no chat: {str(e)}'})
 
+@app.route('/events')
+def events():
+    """Canal SSE da sessão: o navegador atualiza o status só quando algo acontece"""
+    session_id = get_session_id()
+    return sse_response(event_bus.stream(session_id, request.headers.get('Last-Event-ID'),
+                                         snapshot={'session': session_id[:8]}))
+
 @app.route('/data_status')
 def data_status():
     """Verifica status dos dados carregados"""
-    global global_data_loaded
+    session_id = get_session_id()
+    entry = session_cache.get(session_id)
+    data_loaded = entry is not None and entry.data_loaded
+    job = job_runner.latest(f'processamento:{session_id}')
+    
+    if job is not None and job.finished is None:
+        status = job.to_dict()
+        message = f"⏳ Processando: {status['current_label'] or 'na fila'} ({status['progress']}%)"
+    elif job is not None and not job.finished_ok:
+        message = f'Erro no último processamento: {job.error}'
+    else:
+        message = 'Dados carregados e prontos para uso!' if data_loaded else 'Dados não carregados. Processe os dados primeiro.'
+    
     return jsonify({
-        'data_loaded': global_data_loaded,
-        'message': 'Dados carregados e prontos para uso!' if global_data_loaded else 'Dados não carregados. Processe os dados primeiro.'
+        'data_loaded': data_loaded,
+        'message': message,
+        'job': job.to_dict() if job is not None else None
     })
 
 @app.route('/clear_cache')
 def clear_cache():
-    """Limpa o cache de dados"""
-    global global_processor, global_data_loaded, global_ai_gemini
-    global_processor = None
-    global_data_loaded = False
-    global_ai_gemini = None
+    """Limpa o cache de dados da sessão"""
+    session_cache.drop(get_session_id())
+    event_bus.publish(get_session_id(), 'dados', {'data_loaded': False})
+    gc.collect()
     return jsonify({'message': 'Cache limpo com sucesso!'})
 
+@app.route('/cache_status')
+def cache_status():
+    """Uso do cache de processadores por sessão"""
+    return jsonify(session_cache.stats())
+
+@app.route('/api/status')
+def status():
+    """Health check leve: não toca nos dados nem importa pandas (responde rápido no cold start)"""
+    return jsonify({
+        'status': 'online',
+        'message': 'ZapCampanhas funcionando!',
+        'sessions': session_cache.stats()['sessoes'],
+        'pandas_loaded': 'pandas' in sys.modules
+    })
+
+@app.route('/favicon.ico')
+def favicon():
+    return '', 204
+
 @app.route('/config_gemini', methods=['POST'])
 def config_gemini():
-    global global_processor, global_ai_gemini
-    
     try:
         api_key = request.json.get('api_key', '').strip()
         
         if not api_key:
             return jsonify({'success': False, 'message': '❌ API key não fornecida'})
         
-        if global_processor is None:
+        entry = session_cache.get(get_session_id())
+        if entry is None or not entry.data_loaded:
             return jsonify({'success': False, 'message': '❌ Processe os dados primeiro'})
         
-        # Inicializa IA Gemini
-        global_ai_gemini = ZapChickenAIGemini(global_processor, api_key)
+        # Inicializa IA Gemini da sessão
+        from src.zapchicken_ai_gemini import ZapChickenAIGemini
+        entry.ai_gemini = ZapChickenAIGemini(entry.processor, api_key)
         
         # Testa a API
-        status = global_ai_gemini.get_api_status()
+        status = entry.ai_gemini.get_api_status()
         
         if "✅" in status:
             return jsonify({'success': True, 'message': '✅ API Gemini configurada e funcionando!'})
@@ -367,13 +508,13 @@ def config_gemini():
 
 @app.route('/gemini_status')
 def gemini_status():
-    global global_ai_gemini
+    entry = session_cache.get(get_session_id())
     
-    if global_ai_gemini is None:
+    if entry is None or entry.ai_gemini is None:
         return jsonify({'status': 'not_configured', 'message': '❌ API Gemini não configurada'})
     
     try:
-        status = global_ai_gemini.get_api_status()
+        status = entry.ai_gemini.get_api_status()
         if "✅" in status:
             return jsonify({'status': 'working', 'message': status})
         else:
@@ -11,15 +11,32 @@ import csv
 from datetime import datetime
 from pathlib import Path
 
+from src.upload_spool import spool_stream, UploadTooLarge
+from src.http_cache import init_http_cache, make_etag, cached_json
+from src.event_bus import EventBus, sse_response
+from src.analysis_core import SUPPORTED_EXTENSIONS, get_engine, summarize
+
 app = Flask(__name__)
 
+# Compressão (Brotli/gzip) e ETag com 304 (o polling de /files_status vira 304 sem mudanças)
+init_http_cache(app)
+
 # Configurações para Render
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'zapcampanhas-secret-key-2024')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads são gravados em disco em blocos, então o limite não pesa na memória
+MAX_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_MB', 100)) * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 1024 * 1024
 
-# Armazenamento temporário em memória (para Render)
+# Metadados dos uploads (o conteúdo fica no spool em disco)
 uploaded_files = {}
 
+# Motor de análise compartilhado com as outras versões (ZAPCAMPANHAS_ENGINE: pandas, python ou auto)
+analysis_engine = get_engine()
+
+# Avisos de novos uploads para as páginas abertas (SSE em /events)
+event_bus = EventBus()
+EVENTS_TOPIC = 'arquivos'
+
 # HTML template simplificado
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -260,7 +277,7 @@ HTML_TEMPLATE = """
                         <div class="upload-area" onclick="document.getElementById('clientes-file').click()">
                             <h6><i class="fas fa-users"></i> 2. Lista de Clientes</h6>
                             <p class="text-muted">Planilha Excel com dados dos clientes</p>
-                            <input type="file" id="clientes-file" name="clientes" accept=".xlsx,.xls" style="display: none;" onchange="uploadFile('clientes', this)">
+                            <input type="file" id="clientes-file" name="clientes" accept=".xlsx" style="display: none;" onchange="uploadFile('clientes', this)">
                             <button class="btn btn-primary btn-sm">
                                 <i class="fas fa-upload"></i> Selecionar Arquivo
                             </button>
@@ -271,7 +288,7 @@ HTML_TEMPLATE = """
                         <div class="upload-area" onclick="document.getElementById('pedidos-file').click()">
                             <h6><i class="fas fa-shopping-cart"></i> 3. Histórico de Pedidos</h6>
                             <p class="text-muted">Planilha Excel com histórico de pedidos</p>
-                            <input type="file" id="pedidos-file" name="pedidos" accept=".xlsx,.xls" style="display: none;" onchange="uploadFile('pedidos', this)">
+                            <input type="file" id="pedidos-file" name="pedidos" accept=".xlsx" style="display: none;" onchange="uploadFile('pedidos', this)">
                             <button class="btn btn-primary btn-sm">
                                 <i class="fas fa-upload"></i> Selecionar Arquivo
                             </button>
@@ -282,7 +299,7 @@ HTML_TEMPLATE = """
                         <div class="upload-area" onclick="document.getElementById('itens-file').click()">
                             <h6><i class="fas fa-box"></i> 4. Histórico de Itens</h6>
                             <p class="text-muted">Planilha Excel com histórico de itens vendidos</p>
-                            <input type="file" id="itens-file" name="itens" accept=".xlsx,.xls" style="display: none;" onchange="uploadFile('itens', this)">
+                            <input type="file" id="itens-file" name="itens" accept=".xlsx" style="display: none;" onchange="uploadFile('itens', this)">
                             <button class="btn btn-primary btn-sm">
                                 <i class="fas fa-upload"></i> Selecionar Arquivo
                             </button>
@@ -564,9 +581,38 @@ HTML_TEMPLATE = """
                 addMessage('IA', 'Bem-vindo ao ZapCampanhas! Faça upload dos arquivos da ZapChicken e eu ajudarei você a analisar os dados. 🍗', 'ai');
             }, 2000);
 
-            // Verifica status dos arquivos a cada 5 segundos
-            setInterval(checkFilesStatus, 5000);
-            checkFilesStatus();
+            startFilesEvents();
+        });
+
+        // Status dos arquivos por eventos do servidor (SSE) em vez de polling
+        let filesEvents = null;
+
+        function startFilesEvents() {
+            if (!window.EventSource) {
+                // Navegadores sem SSE continuam com a verificação a cada 5 segundos
+                checkFilesStatus();
+                setInterval(checkFilesStatus, 5000);
+                return;
+            }
+            if (filesEvents) return;
+
+            // O primeiro evento ('estado') já dispara a verificação inicial
+            filesEvents = new EventSource('/events');
+            filesEvents.addEventListener('estado', checkFilesStatus);
+            filesEvents.addEventListener('upload', checkFilesStatus);
+        }
+
+        // Aba em segundo plano não mantém conexão aberta; ao voltar, reconecta e atualiza
+        document.addEventListener('visibilitychange', function() {
+            if (!window.EventSource) return;
+            if (document.hidden) {
+                if (filesEvents) {
+                    filesEvents.close();
+                    filesEvents = null;
+                }
+            } else {
+                startFilesEvents();
+            }
         });
     </script>
 </body>
@@ -591,18 +637,32 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'})
         
-        # Lê o conteúdo do arquivo
-        file_content = file.read()
-        file_size = len(file_content)
+        # Só formatos que o motor de análise lê (.xls antigo falharia no processamento)
+        if Path(file.filename).suffix.lower() not in SUPPORTED_EXTENSIONS:
+            return jsonify({'error': 'Formato não suportado. Use CSV ou Excel (.xlsx); salve arquivos .xls como .xlsx.'})
+        
+        # Grava o arquivo no spool em blocos (hash calculado durante a cópia)
+        try:
+            upload = spool_stream(file.stream, file.filename, max_size=MAX_FILE_SIZE)
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)})
+        file_size = upload.size
         
-        # Armazena o arquivo
+        # Remove o arquivo anterior do mesmo tipo (cada upload tem o seu caminho no spool)
+        anterior = uploaded_files.get(file_type)
+        if anterior:
+            Path(anterior['path']).unlink(missing_ok=True)
+        
+        # Armazena os metadados do arquivo
         uploaded_files[file_type] = {
             'filename': file.filename,
-            'content': file_content,
+            'path': str(upload.path),
+            'sha256': upload.sha256,
             'size': file_size,
             'type': file_type,
             'uploaded_at': datetime.now().isoformat()
         }
+        event_bus.publish(EVENTS_TOPIC, 'upload', {'type': file_type, 'filename': file.filename})
         
         return jsonify({
             'success': True,
@@ -627,15 +687,15 @@ def process_data():
                 'message': f'Arquivos faltando: {", ".join(missing_files)}'
             })
         
-        # Simula processamento
         total_files = len(uploaded_files)
         total_size = sum(f['size'] for f in uploaded_files.values())
         
-        # Resultados simulados
+        # Relatórios reais pelo núcleo de análise (os arquivos já estão no spool em disco)
+        resumo = summarize(analysis_engine.run({t: f['path'] for t, f in uploaded_files.items()}))
         results = {
-            'novos_clientes': 45,
-            'clientes_inativos': 12,
-            'alto_ticket': 23,
+            'novos_clientes': resumo['novos_clientes'],
+            'clientes_inativos': resumo['inativos'],
+            'alto_ticket': resumo['alto_ticket'],
             'sugestoes': [
                 'Foque em campanhas para clientes inativos',
                 'Crie promoções para produtos mais vendidos',
@@ -656,17 +716,29 @@ def process_data():
 def get_files_status():
     """Status dos arquivos carregados"""
     try:
-        files = []
-        for file_type, file_data in uploaded_files.items():
-            files.append({
-                'name': file_data['filename'],
-                'message': f"Carregado em {file_data['uploaded_at']} ({file_data['size']:,} bytes)"
-            })
-        
-        return jsonify(files)
+        def build():
+            files = []
+            for file_type, file_data in uploaded_files.items():
+                files.append({
+                    'name': file_data['filename'],
+                    'message': f"Carregado em {file_data['uploaded_at']} ({file_data['size']:,} bytes)"
+                })
+            return files
+        
+        versao = [(t, f['sha256'], f['uploaded_at']) for t, f in uploaded_files.items()]
+        return cached_json(make_etag('files_status', versao), build)
     except Exception as e:
         return jsonify([])
 
+@app.route('/events')
+def events():
+    """Eventos do servidor (SSE): avisa as páginas abertas quando chega um arquivo"""
+    return sse_response(event_bus.stream(
+        EVENTS_TOPIC,
+        request.headers.get('Last-Event-ID'),
+        snapshot={'files_loaded': len(uploaded_files)}
+    ))
+
 @app.route('/api/status')
 def status():
     """Endpoint de status para health check"""
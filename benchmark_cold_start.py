@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de cold start dos pontos de entrada (serverless)
+Cada medição roda num processo Python novo, como uma função recém-criada no
+Vercel: importa o app, faz a primeira requisição à rota de status e informa
+o tempo de importação por módulo (python -X importtime) e quais módulos
+pesados foram carregados. Meta: rota de status respondendo em menos de 100ms
+
+Uso: python benchmark_cold_start.py [arquivo.py ...] [--rota /api/status] [--repeticoes 5]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+ENTRY_POINTS = ['api/index.py', 'api/index-vercel.py', 'api/index-fixed.py', 'app-simple.py']
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'rich', 'requests', 'plotly', 'google.generativeai']
+TARGET_MS = 100
+
+# Executado no processo filho: importa o ponto de entrada e faz a primeira requisição
+CHILD_SCRIPT = """
+import importlib.util, json, sys, time
+inicio = time.perf_counter()
+sys.path.insert(0, {root!r})
+spec = importlib.util.spec_from_file_location('entrada', {path!r})
+modulo = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(modulo)
+importado = time.perf_counter()
+resposta = modulo.app.test_client().get({route!r})
+fim = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (importado - inicio) * 1000,
+    'request_ms': (fim - importado) * 1000,
+    'total_ms': (fim - inicio) * 1000,
+    'status': resposta.status_code,
+    'pesados': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def run_child(path: str, route: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    code = CHILD_SCRIPT.format(root=str(PROJECT_ROOT), path=str(PROJECT_ROOT / path),
+                               route=route, heavy=HEAVY_MODULES)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    return subprocess.run(command, capture_output=True, text=True, cwd=PROJECT_ROOT)
+
+
+def parse_importtime(stderr: str, top: int = 10):
+    """Módulos de primeiro nível com maior tempo acumulado de importação (ms)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Só o nível mais externo (os submódulos já estão no acumulado do pai)
+        if not name.startswith('  '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def benchmark(path: str, route: str, repetitions: int):
+    runs = []
+    for _ in range(repetitions):
+        result = run_child(path, route)
+        if result.returncode != 0:
+            print(f"❌ {path}: falha ao importar\n{result.stderr.strip().splitlines()[-1]}")
+            return None
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    profile = run_child(path, route, importtime=True)
+    return {
+        'import_ms': statistics.median(r['import_ms'] for r in runs),
+        'request_ms': statistics.median(r['request_ms'] for r in runs),
+        'total_ms': statistics.median(r['total_ms'] for r in runs),
+        'status': runs[-1]['status'],
+        'pesados': runs[-1]['pesados'],
+        'modulos': parse_importtime(profile.stderr)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start dos pontos de entrada do ZapCampanhas')
+    parser.add_argument('entradas', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--rota', default='/api/status')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"⏱️  Cold start (mediana de {args.repeticoes} processos novos) - rota {args.rota}, meta {TARGET_MS}ms\n")
+    for path in args.entradas:
+        result = benchmark(path, args.rota, args.repeticoes)
+        if result is None:
+            continue
+
+        ok = '✅' if result['total_ms'] < TARGET_MS and result['status'] == 200 else '⚠️'
+        print(f"{ok} {path}: {result['total_ms']:.0f}ms "
+              f"(importação {result['import_ms']:.0f}ms + primeira requisição {result['request_ms']:.1f}ms, "
+              f"HTTP {result['status']})")
+        print(f"   Módulos pesados carregados: {', '.join(result['pesados']) or 'nenhum'}")
+        for ms, name in result['modulos']:
+            print(f"   {ms:8.1f}ms  {name}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
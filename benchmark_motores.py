@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos motores de análise (pandas × Python puro)
+Gera arquivos sintéticos da ZapChicken (ou usa os informados), roda os dois
+motores de src/analysis_core.py sobre as mesmas entradas, mede o tempo e
+confere se os relatórios são iguais
+
+Uso: python benchmark_motores.py [--pedidos 50000] [--clientes 8000]
+     python benchmark_motores.py --arquivos contacts=a.csv clientes=b.xlsx pedidos=c.xlsx itens=d.xlsx
+"""
+
+import argparse
+import csv
+import math
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.analysis_core import ENGINES, REPORT_FILES, pandas_available
+
+BAIRROS = ['Centro', 'Fontanela', 'Jardim Europa', 'Roseira', 'Tamboré', 'Nova Jaguariúna', 'Zambom', 'Triunfo']
+PRODUTOS = [('Frango Assado', 'Frangos'), ('Meio Frango', 'Frangos'), ('Batata Frita', 'Porções'),
+            ('Farofa', 'Acompanhamentos'), ('Refrigerante 2L', 'Bebidas'), ('Maionese', 'Acompanhamentos')]
+NOMES = ['Ana Souza', 'Bruno Lima', 'Carla Dias', 'Diego Alves', '-', 'LT_01 Eva', 'Fábio Rocha', '???????']
+
+
+def gerar_arquivos(destino: Path, n_pedidos: int, n_clientes: int, seed: int = 42) -> dict:
+    """Arquivos CSV no layout das exportações (datas dd/mm/aaaa hh:mm, valores com vírgula)"""
+    rng = random.Random(seed)
+    telefones = [f"(19) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}" for _ in range(n_clientes)]
+    hoje = datetime.now()
+
+    def escrever(nome, cabecalho, linhas):
+        caminho = destino / nome
+        with open(caminho, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(cabecalho)
+            writer.writerows(linhas)
+        return caminho
+
+    arquivos = {
+        'contacts': escrever('contacts.csv', ['First Name', 'Phone 1 - Value'],
+                             ([rng.choice(NOMES), t] for t in telefones[:n_clientes // 2])),
+        'clientes': escrever('lista-clientes.csv', ['Nome', 'Fone Principal', 'Bairro', 'Qtd. Pedidos'],
+                             ([rng.choice(NOMES), t, rng.choice(BAIRROS), rng.randint(1, 40)] for t in telefones))
+    }
+
+    pedidos, itens = [], []
+    for codigo in range(1, n_pedidos + 1):
+        data = hoje - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+        telefone = rng.choice(telefones) if rng.random() > 0.05 else ''
+        total = rng.randint(2000, 25000) / 100
+        pedidos.append([codigo, telefone, data.strftime('%d/%m/%Y %H:%M'), f"{total:.2f}".replace('.', ','),
+                        '5,00', rng.choice(BAIRROS)])
+        for _ in range(rng.randint(1, 4)):
+            produto, categoria = rng.choice(PRODUTOS)
+            qtd = rng.randint(1, 3)
+            itens.append([codigo, data.strftime('%d/%m/%Y'), produto, categoria, qtd,
+                          f"{qtd * 19.9:.2f}".replace('.', ',')])
+
+    arquivos['pedidos'] = escrever('todos os pedidos.csv',
+                                   ['Código', 'Telefone', 'Data Fechamento', 'Total', 'Valor Entrega', 'Bairro'],
+                                   pedidos)
+    arquivos['itens'] = escrever('historico_itens_vendidos.csv',
+                                 ['Cod. Ped.', 'Data Fec. Ped.', 'Nome Prod', 'Cat. Prod.', 'Qtd.', 'Valor Tot. Item'],
+                                 itens)
+    return arquivos
+
+
+def _iguais(a, b) -> bool:
+    if a is None or b is None or (isinstance(a, float) and math.isnan(a)) or (isinstance(b, float) and math.isnan(b)):
+        return (a is None or a != a) and (b is None or b != b)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def comparar(resultado_a: dict, resultado_b: dict) -> list:
+    """Diferenças entre os relatórios de dois motores (vazio = iguais)"""
+    diferencas = []
+    for key, _, _, _ in REPORT_FILES:
+        a, b = resultado_a[key], resultado_b[key]
+        if len(a) != len(b):
+            diferencas.append(f"{key}: {len(a)} × {len(b)} linhas")
+        elif len(a) and a.columns != b.columns:
+            diferencas.append(f"{key}: colunas {a.columns} × {b.columns}")
+        else:
+            linhas = sum(1 for x, y in zip(a.rows, b.rows) if not all(map(_iguais, x, y)))
+            if linhas:
+                diferencas.append(f"{key}: {linhas} linhas diferentes")
+    return diferencas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara os motores de análise do ZapCampanhas')
+    parser.add_argument('--pedidos', type=int, default=50000)
+    parser.add_argument('--clientes', type=int, default=8000)
+    parser.add_argument('--arquivos', nargs='*', default=None, help='tipo=caminho (contacts, clientes, pedidos, itens)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.arquivos:
+            fontes = dict(item.split('=', 1) for item in args.arquivos)
+        else:
+            print(f"🧪 Gerando {args.pedidos:,} pedidos de {args.clientes:,} clientes...")
+            fontes = gerar_arquivos(Path(tmp), args.pedidos, args.clientes)
+
+        motores = [nome for nome in ENGINES if nome != 'pandas' or pandas_available()]
+        resultados = {}
+        for nome in motores:
+            inicio = time.perf_counter()
+            resultados[nome] = ENGINES[nome]().run(fontes)
+            tempo = time.perf_counter() - inicio
+            contagens = ', '.join(f"{k}={len(t)}" for k, t in resultados[nome].items())
+            print(f"⏱️  {nome:7s} {tempo * 1000:8.0f}ms  ({contagens})")
+
+        if len(resultados) == 2:
+            diferencas = comparar(resultados['pandas'], resultados['python'])
+            if diferencas:
+                print("❌ Resultados diferentes:\n   " + '\n   '.join(diferencas))
+            else:
+                print("✅ Os dois motores produziram os mesmos relatórios")
+
+
+if __name__ == '__main__':
+    main()
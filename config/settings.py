@@ -27,7 +27,8 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 MIN_PHONE_LENGTH = 10
 MAX_PHONE_LENGTH = 15
 
-# Criar diretórios se não existirem
-INPUT_DIR.mkdir(parents=True, exist_ok=True)
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+def ensure_directories():
+    """Cria os diretórios de entrada e saída (chamado pela CLI, não na importação)"""
+    INPUT_DIR.mkdir(parents=True, exist_ok=True)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
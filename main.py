@@ -14,7 +14,7 @@ from rich.text import Text
 # Adiciona o diretório src ao path
 sys.path.append(str(Path(__file__).parent / "src"))
 
-from config.settings import INPUT_DIR, OUTPUT_DIR
+from config.settings import INPUT_DIR, OUTPUT_DIR, ensure_directories
 from src.excel_processor import ExcelProcessor
 from src.lead_generator import LeadGenerator
 from src.zapchicken_processor import ZapChickenProcessor
@@ -43,7 +43,7 @@ def show_banner():
 @click.version_option(version="2.0.0")
 def cli():
     """ZapCampanhas - Automação para processamento de planilhas Excel"""
-    pass
+    ensure_directories()
 
 @cli.command()
 @click.option('--input-dir', '-i', default=str(INPUT_DIR), 
@@ -0,0 +1,694 @@
+"""
+Núcleo de análise compartilhado pelos pontos de entrada
+As regras de negócio (telefone, primeiro nome, bairro, conversão de valores e
+datas) ficam aqui, e os relatórios da ZapChicken (novos clientes, inativos,
+alto ticket, bairros e produtos) têm dois motores intercambiáveis:
+
+- 'pandas': o ZapChickenProcessor (vetorizado, para servidores completos)
+- 'python': uma passada sobre as linhas de cada arquivo, só com a biblioteca
+  padrão (deploys sem pandas/numpy, como o Vercel)
+
+Os dois recebem as mesmas fontes e devolvem as mesmas tabelas (ReportTable).
+O motor é escolhido por ZAPCAMPANHAS_ENGINE ('pandas', 'python' ou 'auto',
+que usa pandas quando está instalado). Nenhum módulo pesado é importado aqui
+"""
+
+import codecs
+import csv
+import importlib.util
+import io
+import math
+import os
+from array import array
+from datetime import datetime, timedelta
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from src.columnar import ColumnarTable, parse_number, unique_columns
+from src.customer_filters import parse_datetime
+
+ANALYSIS_ENGINE = os.environ.get('ZAPCAMPANHAS_ENGINE', 'auto')
+
+# Relatórios: (chave em generate_reports, arquivo, formato, tabela dentro do dict)
+REPORT_FILES = [
+    ('novos_clientes', 'novos_clientes_google_contacts', 'csv', None),
+    ('inativos', 'clientes_inativos', 'xlsx', None),
+    ('alto_ticket', 'clientes_alto_ticket', 'xlsx', None),
+    ('geo_data', 'analise_geografica', 'xlsx', 'bairros_analise'),
+    ('preferences', 'produtos_mais_vendidos', 'xlsx', 'produtos_mais_vendidos')
+]
+
+DEFAULT_CONFIG = {'dias_inatividade': 30, 'ticket_medio_minimo': 50.0}
+
+# Colunas procuradas em cada arquivo (em ordem de preferência)
+CONTACT_NAME_COLUMNS = ['First Name', 'Nome', 'nome', 'Name', 'name']
+CONTACT_PHONE_COLUMNS = ['Phone 1 - Value', 'Telefone', 'telefone', 'Phone', 'phone', 'Fone', 'fone']
+CLIENT_PHONE_COLUMNS = ['Fone Principal', 'Telefone', 'telefone', 'Fone', 'fone', 'Celular', 'celular',
+                        'Phone', 'phone']
+ORDER_PHONE_COLUMNS = ['Telefone', 'telefone', 'Fone', 'fone', 'Celular', 'celular', 'Phone', 'phone']
+PHONE_KEYWORDS = ['telefone', 'fone', 'celular']
+ITEM_VALUE_COLUMNS = ['Valor Tot. Item', 'Valor. Tot. Item', 'Valor Tot Item', 'Valor Total Item', 'Valor']
+TOP_PRODUTOS = 20
+
+# Formatos lidos pelos dois motores (.xls antigo não: nem openpyxl nem o leitor próprio abrem BIFF)
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+# Tamanho do bloco usado para verificar se o CSV é UTF-8 antes de ler
+ENCODING_CHECK_CHUNK = 1024 * 1024
+
+# Valores distintos guardados por conversão memorizada (limita a memória com datas/horas únicas)
+MEMO_LIMIT = 65536
+EPOCH = datetime(1970, 1, 1)
+NAN = float('nan')
+
+INVALID_PHONES = {'00000000', '0000000000', '00000000000'}
+INVALID_NAMES = {'-', '???????', 'null', 'none', 'nan', ''}
+
+# Variações conhecidas dos nomes de bairro → nome normalizado
+NEIGHBORHOOD_VARIATIONS = {
+    'fontanella': ['fontanela', 'fontanella', 'fortanella', 'fontanela'],
+    'jardim dona luiza': ['jardim dona luiza', 'jardim d. luiza', 'dona luiza'],
+    'nova jaguariuna': ['nova jaguariúna', 'nova jaguariuna'],
+    'centro': ['centro', 'centro da cidade'],
+    'zambom': ['zambom', 'jardim zambom'],
+    'capotuna': ['capotuna', 'capotuna'],
+    'triunfo': ['triunfo', 'jardim triunfo'],
+    'nassif': ['nassif', 'nucleo res. dr. joao a nassif'],
+    'capela de santo antonio': ['capela de santo antonio', 'capela santo antonio'],
+    'chácara primavera': ['chácara primavera', 'chacara primavera', 'primavera'],
+    'jardim europa': ['jardim europa', 'europa'],
+    'jardim mauá ii': ['jardim mauá ii', 'jardim maua ii', 'mauá ii'],
+    'jardim santa cruz': ['jardim santa cruz', 'santa cruz'],
+    'roseira de cima': ['roseira de cima', 'roseira'],
+    'tamboré': ['tamboré', 'tambore'],
+    'nova jaguariúna': ['nova jaguariúna', 'nova jaguariuna']
+}
+# A primeira correspondência vence, como na busca em ordem pelo dicionário acima
+_NEIGHBORHOOD_LOOKUP = {}
+for _normalized, _variants in NEIGHBORHOOD_VARIATIONS.items():
+    for _variant in _variants:
+        _NEIGHBORHOOD_LOOKUP.setdefault(_variant, _normalized)
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def clean_phone_number(phone: Any) -> str:
+    """Telefone só com dígitos ("" para vazio, placeholder ou menos de 10 dígitos)"""
+    if _is_missing(phone) or not phone:
+        return ""
+    # Colunas numéricas com células vazias chegam como float (11999998888.0)
+    if isinstance(phone, float) and phone.is_integer():
+        phone = int(phone)
+
+    clean_phone = ''.join(filter(str.isdigit, str(phone)))
+    if clean_phone in INVALID_PHONES or len(clean_phone) < 10 or clean_phone.startswith('000'):
+        return ""
+    return clean_phone
+
+
+def extract_first_name(full_name: Any) -> str:
+    """Primeiro nome (nomes 'LT_XX Fulano' devolvem o que vem depois do prefixo)"""
+    if _is_missing(full_name) or not full_name:
+        return ""
+
+    name = str(full_name).strip()
+    if name.startswith('LT_'):
+        parts = name.split(' ', 1)
+        return parts[1] if len(parts) > 1 else ""
+
+    first_name = name.split(' ')[0]
+    if first_name.lower() in INVALID_NAMES:
+        return ""
+    return first_name
+
+
+def normalize_neighborhood(bairro: Any) -> str:
+    """Bairro em minúsculas, com as variações conhecidas unificadas"""
+    if _is_missing(bairro) or not bairro:
+        return ""
+    bairro = str(bairro).strip().lower()
+    return _NEIGHBORHOOD_LOOKUP.get(bairro, bairro)
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Valor numérico de uma célula (número ou texto brasileiro/internacional)"""
+    if isinstance(value, bool) or _is_missing(value):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return parse_number(str(value))
+
+
+def _parse_br_datetime(text: str) -> Optional[datetime]:
+    """Caminho rápido para 'dd/mm/aaaa', 'dd/mm/aaaa hh:mm' e 'dd/mm/aaaa hh:mm:ss' (fatiando o texto)"""
+    size = len(text)
+    if size not in (10, 16, 19) or text[2] != '/' or text[5] != '/':
+        return None
+    try:
+        if size == 10:
+            return datetime(int(text[6:10]), int(text[3:5]), int(text[0:2]))
+        if text[10] != ' ' or text[13] != ':':
+            return None
+        second = int(text[17:19]) if size == 19 and text[16] == ':' else 0
+        return datetime(int(text[6:10]), int(text[3:5]), int(text[0:2]),
+                        int(text[11:13]), int(text[14:16]), second)
+    except ValueError:
+        return None
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Data de uma célula (datetime ou texto dd/mm/aaaa, com ou sem hora)"""
+    if isinstance(value, datetime):
+        return None if value != value else value
+    if _is_missing(value):
+        return None
+    text = str(value).strip()
+    return _parse_br_datetime(text) or parse_datetime(text)
+
+
+def _count(value: float) -> Union[int, float]:
+    """Quantidades inteiras saem como int (como nas colunas inteiras do pandas)"""
+    return int(value) if value.is_integer() else value
+
+
+def find_column(columns: Sequence[str], candidates: Sequence[str],
+                keywords: Sequence[str] = ()) -> Optional[str]:
+    """Primeira coluna candidata presente (ou a primeira que contém uma das palavras-chave)"""
+    for column in candidates:
+        if column in columns:
+            return column
+    for column in columns:
+        if any(k in str(column).lower() for k in keywords):
+            return column
+    return None
+
+
+class ReportTable:
+    """Tabela de relatório independente do motor: nomes das colunas e linhas (tuplas)"""
+
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns: Sequence[str], rows: Optional[List[tuple]] = None):
+        self.columns = list(columns)
+        self.rows = rows if rows is not None else []
+
+    @classmethod
+    def from_frame(cls, df) -> 'ReportTable':
+        """Converte um DataFrame (NaN/NaT viram None, Timestamp vira datetime)"""
+        if df is None or not hasattr(df, 'columns'):
+            return cls([])
+        converted = df.astype(object).where(df.notna(), None)
+        rows = [tuple(v.to_pydatetime() if hasattr(v, 'to_pydatetime') else v.item() if hasattr(v, 'item') else v
+                      for v in row)
+                for row in converted.itertuples(index=False, name=None)]
+        return cls([str(c) for c in df.columns], rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def write_csv(self, stream):
+        """Escreve o CSV direto num arquivo texto (sem montar o conteúdo inteiro em memória)"""
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(self.columns)
+        writer.writerows(('' if v is None else v for v in row) for row in self.rows)
+
+    def to_csv(self) -> bytes:
+        buffer = io.StringIO()
+        self.write_csv(buffer)
+        return buffer.getvalue().encode('utf-8')
+
+    def to_xlsx(self) -> bytes:
+        """Planilha Excel (precisa do openpyxl, importado só aqui)"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(self.columns)
+        for row in self.rows:
+            sheet.append(list(row))
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    def render(self, format: str) -> bytes:
+        return self.to_csv() if format == 'csv' else self.to_xlsx()
+
+
+def report_files(results: Dict[str, ReportTable], format: Optional[str] = None) -> Dict[str, ReportTable]:
+    """Relatórios com dados por nome de arquivo (format força um formato, ex.: 'csv' sem openpyxl)"""
+    files = {}
+    for key, filename, default_format, _ in REPORT_FILES:
+        table = results.get(key)
+        if table is not None and len(table):
+            files[f"{filename}.{format or default_format}"] = table
+    return files
+
+
+def summarize(results: Dict[str, ReportTable]) -> Dict[str, int]:
+    """Quantidade de registros de cada relatório"""
+    return {key: len(results.get(key) or ()) for key, _, _, _ in REPORT_FILES}
+
+
+# ---------------------------------------------------------------------------
+# Leitura das fontes em linhas (motor Python)
+# ---------------------------------------------------------------------------
+
+def csv_encoding(path: Union[str, Path]) -> str:
+    """'utf-8-sig' se o arquivo inteiro decodifica como UTF-8, senão 'latin1' (aceita qualquer byte)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        try:
+            for chunk in iter(lambda: f.read(ENCODING_CHECK_CHUNK), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return 'latin1'
+    return 'utf-8-sig'
+
+
+def _csv_rows(path: Union[str, Path]) -> Iterator[List[str]]:
+    """Cabeçalho e linhas do CSV como listas, lidos em streaming (separador ',' ou ';')"""
+    with open(path, encoding=csv_encoding(path), newline='') as f:
+        first_line = f.readline()
+        delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+        f.seek(0)
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def _xlsx_rows(path: Union[str, Path]) -> Iterator[List[str]]:
+    from src.xlsx_reader import XlsxReader
+
+    with XlsxReader(str(path)) as reader:
+        for row in reader.iter_rows():
+            if any(row):
+                yield row
+
+
+def _table_rows(table: ColumnarTable) -> Iterator[List[str]]:
+    yield list(table.columns)
+    columns = [table.column(name) for name in table.columns]
+    for i in range(len(table)):
+        yield [column[i] for column in columns]
+
+
+def read_source(source: Any) -> Tuple[List[str], Iterator[List[Any]]]:
+    """Cabeçalho e linhas (listas) de uma fonte: caminho .csv/.xlsx ou ColumnarTable"""
+    if isinstance(source, ColumnarTable):
+        rows = _table_rows(source)
+    elif isinstance(source, (str, Path)):
+        suffix = Path(source).suffix.lower()
+        if suffix == '.csv':
+            rows = _csv_rows(source)
+        elif suffix == '.xlsx':
+            rows = _xlsx_rows(source)
+        else:
+            raise ValueError(f"Formato não suportado pelo motor Python: {suffix or source}")
+    else:
+        raise TypeError(f"Fonte não suportada pelo motor Python: {type(source).__name__}")
+
+    header = next(rows, None)
+    if not header:
+        return [], iter(())
+    return unique_columns(header), rows
+
+
+def row_getter(header: List[str], names: Sequence[Optional[str]]):
+    """
+    Função que extrai as colunas pedidas de uma linha numa chamada só (itemgetter).
+    Colunas ausentes (None ou fora do cabeçalho) e células faltando no fim da linha dão ''.
+    """
+    width = len(header)
+    positions = [header.index(name) if name in header else width for name in names]
+    needed = max(positions) + 1
+    get = itemgetter(*positions)
+
+    def getter(row):
+        if len(row) < needed:
+            row = list(row) + [''] * (needed - len(row))
+        return get(row)
+    return getter
+
+
+class _Memo(dict):
+    """Conversão memorizada por valor distinto (telefones, bairros, preços e datas se repetem muito)"""
+
+    def __init__(self, func):
+        super().__init__()
+        self.func = func
+
+    def __missing__(self, key):
+        value = self.func(key)
+        if len(self) < MEMO_LIMIT:
+            self[key] = value
+        return value
+
+
+# ---------------------------------------------------------------------------
+# Motores
+# ---------------------------------------------------------------------------
+
+class _OrderTotals:
+    """
+    Agregados dos pedidos por cliente em buffers compactos (array): cada
+    telefone ganha uma posição e ocupa 24 bytes (último pedido em segundos,
+    soma e pedidos com valor), não importa quantos pedidos tenha
+    """
+
+    __slots__ = ('posicoes', 'ultimo', 'soma', 'pedidos', 'bairros', 'codigos')
+
+    def __init__(self):
+        self.posicoes = {}
+        self.ultimo = array('d')
+        self.soma = array('d')
+        self.pedidos = array('l')
+        # Bairro → [soma, pedidos com valor, posições dos clientes]
+        self.bairros = {}
+        # Código do pedido → vezes que aparece (para ligar os itens)
+        self.codigos = {}
+
+    def add(self, telefone: str, momento: float, valor: Optional[float], bairro: str, codigo):
+        posicao = self.posicoes.get(telefone)
+        if posicao is None:
+            posicao = self.posicoes[telefone] = len(self.soma)
+            self.ultimo.append(NAN)
+            self.soma.append(0.0)
+            self.pedidos.append(0)
+        # NaN (sem data) nunca é maior, e qualquer data substitui NaN
+        if momento > self.ultimo[posicao] or self.ultimo[posicao] != self.ultimo[posicao]:
+            self.ultimo[posicao] = momento
+
+        grupo = self.bairros.get(bairro)
+        if grupo is None:
+            grupo = self.bairros[bairro] = [0.0, 0, set()]
+        grupo[2].add(posicao)
+
+        if valor is not None:
+            self.soma[posicao] += valor
+            self.pedidos[posicao] += 1
+            grupo[0] += valor
+            grupo[1] += 1
+
+        if codigo is not None:
+            self.codigos[codigo] = self.codigos.get(codigo, 0) + 1
+
+    def cliente(self, telefone: str) -> Tuple[Optional[datetime], float, int]:
+        posicao = self.posicoes[telefone]
+        segundos = self.ultimo[posicao]
+        ultimo = None if segundos != segundos else EPOCH + timedelta(seconds=segundos)
+        return ultimo, self.soma[posicao], self.pedidos[posicao]
+
+
+def _seconds(moment: Optional[datetime]) -> float:
+    return NAN if moment is None else (moment - EPOCH).total_seconds()
+
+
+class PythonEngine:
+    """
+    Relatórios em uma passada por arquivo, só com a biblioteca padrão.
+
+    As linhas são lidas em streaming e descartadas: clientes viram tuplas por
+    telefone, contatos um conjunto de telefones, pedidos somam nos buffers de
+    _OrderTotals (por cliente, por bairro e por código) e itens somam por
+    produto. Conversões de telefone, bairro, valor e data são memorizadas por
+    valor distinto.
+    """
+
+    name = 'python'
+
+    def run(self, sources: Dict[str, Any], dias_inatividade: Optional[int] = None,
+            ticket_minimo: Optional[float] = None, agora: Optional[datetime] = None) -> Dict[str, ReportTable]:
+        dias_inatividade = DEFAULT_CONFIG['dias_inatividade'] if dias_inatividade is None else dias_inatividade
+        ticket_minimo = DEFAULT_CONFIG['ticket_medio_minimo'] if ticket_minimo is None else ticket_minimo
+        agora = agora or datetime.now()
+        self._telefones = _Memo(clean_phone_number)
+        self._bairros = _Memo(normalize_neighborhood)
+        self._numeros = _Memo(to_number)
+
+        clientes, clientes_ordem = self._clientes(sources.get('clientes'))
+        contatos = self._contatos(sources.get('contacts'))
+        pedidos = self._pedidos(sources.get('pedidos'))
+        produtos, valor_col = self._itens(sources.get('itens'), pedidos.codigos)
+
+        return {
+            'novos_clientes': self._novos_clientes(clientes_ordem, contatos),
+            'inativos': self._inativos(pedidos, clientes, dias_inatividade, agora),
+            'alto_ticket': self._alto_ticket(pedidos, clientes, ticket_minimo),
+            'geo_data': self._bairros_table(pedidos),
+            'preferences': self._produtos(produtos, valor_col)
+        }
+
+    def _clientes(self, source) -> Tuple[Dict[str, Any], List[tuple]]:
+        """
+        Por telefone a tupla (primeiro_nome, bairro, qtd_pedidos) (lista só se o
+        telefone se repete) e, em ordem, os (telefone, nome) com nome válido
+        """
+        por_telefone, ordem = {}, []
+        if source is None:
+            return por_telefone, ordem
+        header, rows = read_source(source)
+        telefone_col = find_column(header, CLIENT_PHONE_COLUMNS, PHONE_KEYWORDS)
+        if telefone_col is None:
+            return por_telefone, ordem
+
+        get = row_getter(header, [telefone_col, 'Nome', 'Bairro', 'Qtd. Pedidos'])
+        telefones, bairros, numeros = self._telefones, self._bairros, self._numeros
+        for row in rows:
+            telefone, nome, bairro, qtd = get(row)
+            telefone = telefones[telefone]
+            if not telefone:
+                continue
+            qtd = numeros[qtd]
+            cliente = (extract_first_name(nome), bairros[bairro], _count(qtd) if qtd is not None else None)
+            anterior = por_telefone.get(telefone)
+            if anterior is None:
+                por_telefone[telefone] = cliente
+            elif isinstance(anterior, list):
+                anterior.append(cliente)
+            else:
+                por_telefone[telefone] = [anterior, cliente]
+            if cliente[0] not in ('', '-', '???????'):
+                ordem.append((telefone, cliente[0]))
+        return por_telefone, ordem
+
+    def _contatos(self, source) -> set:
+        if source is None:
+            return set()
+        header, rows = read_source(source)
+        telefone_col = find_column(header, CONTACT_PHONE_COLUMNS)
+        if find_column(header, CONTACT_NAME_COLUMNS) is None or telefone_col is None:
+            return set()
+        posicao = header.index(telefone_col)
+        telefones = self._telefones
+        contatos = {telefones[row[posicao]] for row in rows if posicao < len(row)}
+        contatos.discard('')
+        return contatos
+
+    def _pedidos(self, source) -> _OrderTotals:
+        """Uma passada pelos pedidos com telefone válido, somando em _OrderTotals"""
+        totais = _OrderTotals()
+        if source is None:
+            return totais
+        header, rows = read_source(source)
+        telefone_col = find_column(header, ORDER_PHONE_COLUMNS, PHONE_KEYWORDS)
+        if telefone_col is None:
+            return totais
+
+        get = row_getter(header, [telefone_col, 'Data Fechamento', 'Total', 'Valor Entrega', 'Bairro', 'Código'])
+        telefones, bairros, numeros = self._telefones, self._bairros, self._numeros
+        add = totais.add
+        for row in rows:
+            telefone, data, total, entrega, bairro, codigo = get(row)
+            telefone = telefones[telefone]
+            if not telefone:
+                continue
+            total, entrega = numeros[total], numeros[entrega]
+            valor = total + entrega if total is not None and entrega is not None else None
+            # Datas com hora e códigos quase não se repetem: convertidos direto, sem memória
+            add(telefone, _seconds(to_datetime(data)), valor, bairros[bairro], _join_key(codigo))
+        return totais
+
+    def _itens(self, source, codigos: Dict[Any, int]) -> Tuple[Dict[str, List[float]], Optional[str]]:
+        """Quantidade e valor por produto dos itens cujo pedido tem telefone válido"""
+        produtos = {}
+        if source is None or not codigos:
+            return produtos, None
+        header, rows = read_source(source)
+        valor_col = find_column(header, ITEM_VALUE_COLUMNS)
+        if valor_col is None or not all(c in header for c in ('Cod. Ped.', 'Nome Prod', 'Qtd.')):
+            return produtos, None
+
+        get = row_getter(header, ['Cod. Ped.', 'Nome Prod', 'Qtd.', valor_col])
+        numeros = self._numeros
+        for row in rows:
+            codigo, nome, qtd, valor = get(row)
+            vezes = codigos.get(_join_key(codigo))
+            if not vezes or _is_missing(nome) or nome == '':
+                continue
+            produto = produtos.get(nome)
+            if produto is None:
+                produto = produtos[nome] = [0.0, 0.0]
+            qtd, valor = numeros[qtd], numeros[valor]
+            if qtd is not None:
+                produto[0] += qtd * vezes
+            if valor is not None:
+                produto[1] += valor * vezes
+        return produtos, valor_col
+
+    @staticmethod
+    def _novos_clientes(clientes_ordem: List[tuple], contatos: set) -> ReportTable:
+        table = ReportTable(['nome', 'telefone'])
+        if not clientes_ordem or not contatos:
+            return table
+        table.rows = [('LT_01 ' + nome, telefone) for telefone, nome in clientes_ordem if telefone not in contatos]
+        return table
+
+    @staticmethod
+    def _dados_cliente(clientes: Dict[str, Any], telefone: str) -> List[tuple]:
+        dados = clientes.get(telefone)
+        if dados is None:
+            return [(None, None, None)]
+        return dados if isinstance(dados, list) else [dados]
+
+    def _inativos(self, totais: _OrderTotals, clientes, dias_inatividade: int, agora: datetime) -> ReportTable:
+        table = ReportTable(['telefone_limpo', 'ultimo_pedido', 'primeiro_nome', 'bairro_normalizado',
+                             'Qtd. Pedidos', 'dias_inativo'])
+        limite = _seconds(agora - timedelta(days=dias_inatividade))
+        for telefone in sorted(totais.posicoes):
+            if not totais.ultimo[totais.posicoes[telefone]] < limite:
+                continue
+            ultimo = totais.cliente(telefone)[0]
+            dias = (agora - ultimo).days
+            for nome, bairro, qtd in self._dados_cliente(clientes, telefone):
+                table.rows.append((telefone, ultimo, nome, bairro, qtd, dias))
+        return table
+
+    def _alto_ticket(self, totais: _OrderTotals, clientes, ticket_minimo: float) -> ReportTable:
+        table = ReportTable(['telefone_limpo', 'ticket_medio', 'valor_total', 'qtd_pedidos', 'ultimo_pedido',
+                             'primeiro_nome', 'bairro_normalizado'])
+        for telefone in sorted(totais.posicoes):
+            ultimo, soma, n = totais.cliente(telefone)
+            if not n or soma / n < ticket_minimo:
+                continue
+            for nome, bairro, _ in self._dados_cliente(clientes, telefone):
+                table.rows.append((telefone, soma / n, soma, n, ultimo, nome, bairro))
+        return table
+
+    @staticmethod
+    def _bairros_table(totais: _OrderTotals) -> ReportTable:
+        table = ReportTable(['bairro', 'valor_total', 'ticket_medio', 'qtd_pedidos', 'clientes_unicos'])
+        table.rows = [(bairro, soma, soma / n if n else None, n, len(clientes))
+                      for bairro, (soma, n, clientes) in sorted(totais.bairros.items())]
+        return table
+
+    @staticmethod
+    def _produtos(produtos, valor_col: Optional[str], n: int = TOP_PRODUTOS) -> ReportTable:
+        if valor_col is None:
+            return ReportTable([])
+        # Ordem por nome e depois por quantidade (estável), como groupby + nlargest
+        ranking = sorted(sorted(produtos.items()), key=lambda item: -item[1][0])[:n]
+        return ReportTable(['Nome Prod', 'Qtd.', valor_col],
+                           [(nome, _count(qtd), valor) for nome, (qtd, valor) in ranking])
+
+
+def _join_key(value: Any):
+    """Código do pedido comparável entre arquivos (123, 123.0 e '123' viram o inteiro 123)"""
+    if type(value) is str and value.isdigit():
+        return int(value)
+    if _is_missing(value) or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    return int(text) if text.isdigit() else text
+
+
+class PandasEngine:
+    """Relatórios pelo ZapChickenProcessor (pandas/NumPy)"""
+
+    name = 'pandas'
+
+    def run(self, sources: Dict[str, Any], dias_inatividade: Optional[int] = None,
+            ticket_minimo: Optional[float] = None, agora: Optional[datetime] = None) -> Dict[str, ReportTable]:
+        from src.zapchicken_processor import ZapChickenProcessor
+
+        processor = ZapChickenProcessor(None, None)
+        processor.load_dataframes({file_type: self._frame(source) for file_type, source in sources.items()
+                                   if source is not None})
+        if dias_inatividade is not None:
+            processor.config['dias_inatividade'] = dias_inatividade
+        if ticket_minimo is not None:
+            processor.config['ticket_medio_minimo'] = ticket_minimo
+        return self.results(processor.generate_reports(), agora)
+
+    @staticmethod
+    def results(reports: Dict[str, Any], agora: Optional[datetime] = None) -> Dict[str, ReportTable]:
+        """Análises do processador (DataFrames) como ReportTable, pela mesma lista de relatórios"""
+        results = {}
+        for key, _, _, table in REPORT_FILES:
+            data = reports.get(key)
+            if table and data:
+                data = data[table]
+            results[key] = ReportTable.from_frame(None if isinstance(data, dict) else data)
+        return results
+
+    @staticmethod
+    def _frame(source):
+        from src.zapchicken_processor import ZapChickenProcessor
+
+        if isinstance(source, ColumnarTable):
+            from src.business_reports import table_to_frame
+            return table_to_frame(source)
+        if isinstance(source, (str, Path)):
+            return ZapChickenProcessor.read_input_file(Path(source))
+        return source
+
+
+ENGINES = {'pandas': PandasEngine, 'python': PythonEngine}
+
+
+def pandas_available() -> bool:
+    return all(importlib.util.find_spec(m) is not None for m in ('pandas', 'numpy'))
+
+
+def get_engine(name: Optional[str] = None):
+    """Motor de análise configurado (ZAPCAMPANHAS_ENGINE ou o nome informado)"""
+    name = (name or ANALYSIS_ENGINE).lower()
+    if name == 'auto':
+        name = 'pandas' if pandas_available() else 'python'
+    engine = ENGINES.get(name)
+    if engine is None:
+        raise ValueError(f"Motor de análise desconhecido: {name}")
+    return engine()
+
+
+# ---------------------------------------------------------------------------
+# Conversões para o motor pandas (mesmas regras de to_number/to_datetime)
+# ---------------------------------------------------------------------------
+
+def numbers_series(series):
+    """Coluna numérica: textos ('12,50', 'R$ 1.234,56') convertidos pela regra do motor Python"""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    values = {v: to_number(v) for v in series.dropna().unique()}
+    return pd.to_numeric(series.map(values), errors='coerce')
+
+
+def dates_series(series):
+    """Coluna de datas: datetime mantido, textos dd/mm/aaaa (com ou sem hora) convertidos uma vez por valor"""
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    values = {v: to_datetime(v) for v in series.dropna().unique()}
+    return pd.to_datetime(series.map(values), errors='coerce')
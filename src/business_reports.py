@@ -0,0 +1,182 @@
+"""
+Relatórios de negócio a partir dos uploads já lidos em colunas
+As tabelas em memória vão para o motor de análise configurado
+(src/analysis_core.py) sem gravar nada em data/input: no motor pandas viram
+DataFrames (cada valor distinto da coluna é convertido uma vez só), no motor
+Python são percorridas linha a linha. As análises rodam uma vez por versão
+dos dados e cada arquivo (CSV/Excel) só é montado no primeiro download
+"""
+
+import importlib.util
+import threading
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from src.analysis_core import REPORT_FILES, ReportTable, get_engine, report_files
+from src.columnar import Column, ColumnarTable
+from src.customer_filters import parse_datetime
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Mesmos nomes procurados por ZapChickenProcessor.load_zapchicken_files
+FILE_PATTERNS = {
+    'contacts': ['*contacts*.csv', '*contacts*.xls*'],
+    'clientes': ['*lista-clientes*.xls*'],
+    'pedidos': ['*todos os pedidos*.xls*'],
+    'itens': ['*historico_itens_vendidos*.xls*']
+}
+# Arquivos com outro nome são reconhecidos pelas colunas que o processador usa
+SIGNATURE_COLUMNS = {
+    'contacts': ['Phone 1 - Value'],
+    'clientes': ['Fone Principal', 'Qtd. Pedidos'],
+    'pedidos': ['Data Fechamento', 'Valor Entrega'],
+    'itens': ['Cod. Ped.', 'Nome Prod']
+}
+# Telefones ficam como texto (convertidos em número ganhariam '.0' no fim)
+TEXT_KEYWORDS = ['fone', 'phone', 'celular']
+
+REPORT_INFO = {
+    'novos_clientes_google_contacts': {
+        'name': 'Novos Clientes Google Contacts',
+        'description': 'Lista de novos clientes para importar no Google Contacts',
+        'usage': 'Importar no Google Contacts para adicionar novos clientes'
+    },
+    'clientes_inativos': {
+        'name': 'Clientes Inativos',
+        'description': 'Análise de clientes inativos para campanhas de reativação',
+        'usage': 'Usar para campanhas de reativação de clientes'
+    },
+    'clientes_alto_ticket': {
+        'name': 'Clientes Alto Ticket',
+        'description': 'Análise de clientes premium para ofertas especiais',
+        'usage': 'Usar para ofertas premium e VIP'
+    },
+    'analise_geografica': {
+        'name': 'Análise Geográfica',
+        'description': 'Análise por bairros para campanhas Meta',
+        'usage': 'Usar para campanhas Meta Ads por bairro'
+    },
+    'produtos_mais_vendidos': {
+        'name': 'Produtos Mais Vendidos',
+        'description': 'Ranking de produtos mais vendidos',
+        'usage': 'Analisar produtos mais populares'
+    }
+}
+
+FILE_TYPES = {'csv': 'CSV', 'xlsx': 'Excel'}
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def classify_table(name: str, table: ColumnarTable) -> Optional[str]:
+    """Tipo do arquivo para o processador (contacts, clientes, pedidos ou itens)"""
+    lowered = name.lower()
+    for file_type, patterns in FILE_PATTERNS.items():
+        if any(fnmatch(lowered, pattern) for pattern in patterns):
+            return file_type
+    for file_type, columns in SIGNATURE_COLUMNS.items():
+        if all(table.has_column(c) for c in columns):
+            return file_type
+    return None
+
+
+def column_to_series(column: Column) -> 'pd.Series':
+    """Coluna em dicionário → Series (converte os valores distintos e expande pelos códigos)"""
+    import numpy as np
+    import pandas as pd
+
+    codes = np.frombuffer(column.codes, dtype=f'i{column.codes.itemsize}')
+    values = column.values
+
+    if not any(k in column.name.lower() for k in TEXT_KEYWORDS):
+        if column.is_numeric:
+            numbers = np.frombuffer(column.numeric(), dtype='d')
+            # Inteiros sem células vazias ficam int64, como no read_excel
+            if not np.isnan(numbers).any() and (numbers == np.floor(numbers)).all():
+                return pd.Series(numbers.astype('int64'), name=column.name)
+            return pd.Series(numbers.copy(), name=column.name)
+
+        if len(values) > 1 and parse_datetime(values[1]) is not None:
+            parsed = [parse_datetime(v) for v in values[1:]]
+            if all(p is not None for p in parsed):
+                lookup = np.array([np.datetime64('NaT')] + parsed, dtype='datetime64[ns]')
+                return pd.Series(lookup[codes], name=column.name)
+
+    lookup = np.array([None] + values[1:], dtype=object)
+    return pd.Series(lookup[codes], name=column.name)
+
+
+def table_to_frame(table: ColumnarTable) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.DataFrame({name: column_to_series(table.column(name)) for name in table.columns})
+
+
+def select_tables(tables: Iterable[Tuple[str, ColumnarTable]]) -> Tuple[Dict[str, ColumnarTable], Dict[str, str]]:
+    """Tabela por tipo (primeiro arquivo de cada tipo, como no carregamento do processador) e arquivos usados"""
+    selected, sources = {}, {}
+    for name, table in tables:
+        file_type = classify_table(name, table)
+        if file_type is None or file_type in selected:
+            continue
+        selected[file_type] = table
+        sources[file_type] = name
+    return selected, sources
+
+
+class BusinessReports:
+    """Relatórios de uma versão dos dados: análise e arquivos montados sob demanda"""
+
+    def __init__(self, tables: Dict[str, Any], sources: Optional[Dict[str, str]] = None, engine=None):
+        self.tables = tables
+        self.sources = sources or {}
+        self.engine = engine or get_engine()
+        # Sem openpyxl (deploys leves) as planilhas saem em CSV
+        self.format = None if importlib.util.find_spec('openpyxl') is not None else 'csv'
+        self._files = None
+        self._content = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tables(cls, tables: Iterable[Tuple[str, ColumnarTable]], engine=None) -> 'BusinessReports':
+        return cls(*select_tables(tables), engine=engine)
+
+    def files(self) -> Dict[str, ReportTable]:
+        """Tabelas dos relatórios por nome de arquivo (análises feitas uma vez)"""
+        with self._lock:
+            if self._files is None:
+                self._files = report_files(self.engine.run(self.tables), self.format)
+            return self._files
+
+    def render(self, filename: str) -> Optional[bytes]:
+        """Conteúdo do arquivo do relatório (gerado no primeiro pedido e guardado)"""
+        table = self.files().get(filename)
+        if table is None:
+            return None
+        with self._lock:
+            content = self._content.get(filename)
+            if content is None:
+                content = self._content[filename] = table.render(filename.rsplit('.', 1)[1])
+            return content
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Os 5 relatórios com quantidade de registros e tamanho (se o arquivo já foi gerado)"""
+        files = self.files()
+        reports = []
+        for _, filename, format, _ in REPORT_FILES:
+            format = self.format or format
+            name = f"{filename}.{format}"
+            table = files.get(name)
+            content = self._content.get(name)
+            reports.append(dict(
+                REPORT_INFO[filename],
+                filename=name,
+                type=FILE_TYPES[format],
+                available=table is not None,
+                records=len(table) if table is not None else 0,
+                size=len(content) if content is not None else None,
+                engine=self.engine.name
+            ))
+        return reports
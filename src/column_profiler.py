@@ -0,0 +1,195 @@
+"""
+Perfil de colunas em uma única passada (sem pandas)
+Atualiza todas as colunas a cada linha lida: contagem, vazios, distintos
+aproximados (HyperLogLog), mínimo/máximo/soma numéricos e tipo inferido.
+Os perfis de vários arquivos podem ser combinados sem reler os dados
+"""
+
+import hashlib
+import math
+import re
+from typing import Dict, Any, Iterable, Optional, Sequence
+
+from src.columnar import parse_number
+
+# HyperLogLog com 2^8 registradores por coluna (~6,5% de erro padrão)
+HLL_PRECISION = 8
+HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+_HASH_BITS = 64
+_REST_BITS = _HASH_BITS - HLL_PRECISION
+_REST_MASK = (1 << _REST_BITS) - 1
+
+MAX_SAMPLES = 5
+
+# Proporção mínima de valores para inferir o tipo da coluna
+TYPE_THRESHOLD = 0.9
+
+_DATE_PATTERN = re.compile(r'^(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})([ T]\d{1,2}:\d{2}(:\d{2})?)?$')
+
+
+def _to_number(value: str) -> Optional[float]:
+    """Tenta o float direto e só recorre ao formato brasileiro quando há vírgula ou R$"""
+    try:
+        number = float(value)
+    except ValueError:
+        if ',' in value or 'R$' in value:
+            return parse_number(value)
+        return None
+    return number if math.isfinite(number) else None
+
+
+def stable_hash(value: str) -> int:
+    """
+    Hash de 64 bits igual em todo processo (o hash() de str muda a cada execução),
+    para perfis de workers diferentes poderem ser combinados
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+
+
+def hll_estimate(registers: bytearray) -> int:
+    """Estima a cardinalidade a partir dos registradores"""
+    zeros = registers.count(0)
+    if zeros == HLL_REGISTERS:
+        return 0
+    estimate = _HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / sum(2.0 ** -r for r in registers)
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        # Correção para cardinalidades pequenas (linear counting)
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+    return int(round(estimate))
+
+
+class ColumnProfile:
+    """Estatísticas incrementais de uma coluna"""
+
+    __slots__ = ('name', 'count', 'nulls', 'registers', 'numeric_count', 'date_count',
+                 'minimum', 'maximum', 'total', 'samples')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.registers = bytearray(HLL_REGISTERS)
+        self.numeric_count = 0
+        self.date_count = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.samples = []
+
+    def update(self, value: Optional[str]):
+        """Acrescenta um valor (vazio/None conta como nulo)"""
+        if value is None:
+            value = ''
+        elif not isinstance(value, str):
+            value = str(value)
+        value = value.strip()
+        if not value:
+            self.nulls += 1
+            return
+
+        self.count += 1
+
+        h = stable_hash(value)
+        index = h >> _REST_BITS
+        rank = _REST_BITS - (h & _REST_MASK).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+        number = _to_number(value)
+        if number is not None:
+            self.numeric_count += 1
+            self.total += number
+            if self.minimum is None or number < self.minimum:
+                self.minimum = number
+            if self.maximum is None or number > self.maximum:
+                self.maximum = number
+        elif _DATE_PATTERN.match(value):
+            self.date_count += 1
+
+        if len(self.samples) < MAX_SAMPLES and value not in self.samples:
+            self.samples.append(value)
+
+    def merge(self, other: 'ColumnProfile'):
+        """Combina o perfil de outra fonte com a mesma coluna"""
+        self.count += other.count
+        self.nulls += other.nulls
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        self.numeric_count += other.numeric_count
+        self.date_count += other.date_count
+        self.total += other.total
+        if other.minimum is not None and (self.minimum is None or other.minimum < self.minimum):
+            self.minimum = other.minimum
+        if other.maximum is not None and (self.maximum is None or other.maximum > self.maximum):
+            self.maximum = other.maximum
+        for value in other.samples:
+            if len(self.samples) >= MAX_SAMPLES:
+                break
+            if value not in self.samples:
+                self.samples.append(value)
+
+    @property
+    def distinct(self) -> int:
+        """Quantidade aproximada de valores distintos (nunca maior que a contagem)"""
+        return min(hll_estimate(self.registers), self.count)
+
+    @property
+    def inferred_type(self) -> str:
+        """'numeric', 'date', 'text' ou 'empty'"""
+        if not self.count:
+            return 'empty'
+        if self.numeric_count >= TYPE_THRESHOLD * self.count:
+            return 'numeric'
+        if self.date_count >= TYPE_THRESHOLD * self.count:
+            return 'date'
+        return 'text'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumo no formato de column_analysis"""
+        result = {
+            "type": self.inferred_type,
+            "total_values": self.count,
+            "unique_values": self.distinct,
+            "empty_values": self.nulls,
+            "sample_values": list(self.samples)
+        }
+        if self.numeric_count:
+            result.update({
+                "min": self.minimum,
+                "max": self.maximum,
+                "sum": round(self.total, 2)
+            })
+        return result
+
+
+class TableProfiler:
+    """Perfil de todas as colunas, atualizado linha a linha durante a leitura"""
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self.profiles = [ColumnProfile(name) for name in self.columns]
+        self.rows = 0
+
+    def update(self, row: Sequence[Optional[str]]):
+        """Atualiza todas as colunas com uma linha (células faltantes contam como nulas)"""
+        n = len(row)
+        for i, profile in enumerate(self.profiles):
+            profile.update(row[i] if i < n else None)
+        self.rows += 1
+
+    def profile(self, name: str) -> ColumnProfile:
+        return self.profiles[self.columns.index(name)]
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {p.name: p.to_dict() for p in self.profiles}
+
+
+def merge_profiles(profilers: Iterable[TableProfiler]) -> Dict[str, ColumnProfile]:
+    """Combina os perfis de vários arquivos por nome de coluna"""
+    merged = {}
+    for profiler in profilers:
+        for profile in profiler.profiles:
+            if profile.name not in merged:
+                merged[profile.name] = ColumnProfile(profile.name)
+            merged[profile.name].merge(profile)
+    return merged
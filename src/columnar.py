@@ -0,0 +1,244 @@
+"""
+Armazenamento em colunas para uploads (sem pandas)
+Cada coluna é codificada por dicionário (códigos em array + valores distintos
+internados); colunas numéricas ganham também um array('d'). O arquivo é lido
+uma única vez no upload e todas as análises trabalham sobre essa representação
+"""
+
+import csv
+import io
+import math
+import sys
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence
+
+NAN = float('nan')
+
+# Código reservado para célula vazia
+EMPTY_CODE = 0
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Converte texto numérico (formato brasileiro ou internacional) em float"""
+    if text is None:
+        return None
+    value = text.strip().replace('R$', '').replace(' ', '').replace('\xa0', '')
+    if not value:
+        return None
+    if ',' in value:
+        # 1.234,56 -> 1234.56
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def unique_columns(columns: Sequence[Any]) -> List[str]:
+    """
+    Nomes de coluna únicos: vazios viram 'colunaN' (posição) e repetidos ganham
+    sufixo '.1', '.2'... como no pandas ('a,b,a' → a, b, a.1)
+    """
+    names = [str(c).strip() if c is not None else '' for c in columns]
+    names = [name or f"coluna{i + 1}" for i, name in enumerate(names)]
+    seen = set()
+    result = []
+    for name in names:
+        candidate, n = name, 0
+        while candidate in seen:
+            n += 1
+            candidate = f"{name}.{n}"
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+class Column:
+    """Coluna codificada por dicionário, com conversão numérica preguiçosa"""
+
+    __slots__ = ('name', 'codes', 'values', '_index', '_numeric', '_is_numeric')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.codes = array('i')
+        self.values = ['']
+        self._index = {'': EMPTY_CODE}
+        self._numeric = None
+        self._is_numeric = None
+
+    def append(self, value: Optional[str]):
+        value = (value or '').strip()
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value) if len(value) < 64 else value
+            self._index[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def __iter__(self) -> Iterator[str]:
+        values = self.values
+        return (values[c] for c in self.codes)
+
+    @property
+    def distinct_count(self) -> int:
+        """Quantidade de valores distintos não vazios"""
+        return len(self.values) - 1
+
+    @property
+    def non_empty_count(self) -> int:
+        return len(self.codes) - self.codes.count(EMPTY_CODE)
+
+    @property
+    def is_numeric(self) -> bool:
+        """Coluna numérica: todos os valores distintos não vazios são números"""
+        if self._is_numeric is None:
+            distintos = self.values[1:]
+            self._is_numeric = bool(distintos) and all(parse_number(v) is not None for v in distintos)
+        return self._is_numeric
+
+    def numeric(self) -> array:
+        """Valores como array('d') (NaN para vazio/não numérico); convertido uma vez por valor distinto"""
+        if self._numeric is None:
+            lookup = [NAN]
+            for v in self.values[1:]:
+                number = parse_number(v)
+                lookup.append(NAN if number is None else number)
+            self._numeric = array('d', (lookup[c] for c in self.codes))
+        return self._numeric
+
+    def memory_bytes(self) -> int:
+        """Memória aproximada da coluna"""
+        total = self.codes.itemsize * len(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+        if self._numeric is not None:
+            total += self._numeric.itemsize * len(self._numeric)
+        return total
+
+
+class ColumnarTable:
+    """Tabela em colunas construída em uma única passada sobre as linhas"""
+
+    def __init__(self, columns: Sequence[str], source: str = '', profile: bool = False):
+        self.source = source
+        self.columns = unique_columns(columns)
+        self._columns = {name: Column(name) for name in self.columns}
+        # Mesma ordem do cabeçalho, para append_row preencher por posição
+        self._column_list = list(self._columns.values())
+        self.n_rows = 0
+        self.profiler = None
+        if profile:
+            from src.column_profiler import TableProfiler
+            self.profiler = TableProfiler(self.columns)
+
+    @classmethod
+    def from_rows(cls, header: Sequence[str], rows: Iterable[Sequence[Any]], source: str = '',
+                  profile: bool = False) -> 'ColumnarTable':
+        """Constrói a tabela consumindo as linhas em streaming (opcionalmente já com o perfil das colunas)"""
+        table = cls(header, source, profile)
+        for row in rows:
+            table.append_row(row)
+        return table
+
+    @classmethod
+    def from_csv(cls, text_stream: Iterable[str], source: str = '', delimiter: str = None,
+                 profile: bool = False) -> 'ColumnarTable':
+        """Lê CSV a partir de um stream de texto (arquivo, StringIO ou lista de linhas)"""
+        if isinstance(text_stream, str):
+            text_stream = io.StringIO(text_stream)
+
+        if delimiter is None:
+            # Detecta ';' (exportações do Excel em português) pelo cabeçalho
+            first_line = next(iter(text_stream), '')
+            delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+            text_stream = _prepend(first_line, text_stream)
+
+        reader = csv.reader(text_stream, delimiter=delimiter)
+        header = next(reader, None)
+        if not header:
+            return cls([], source, profile)
+        if header[0].startswith('\ufeff'):
+            header[0] = header[0][1:]
+        return cls.from_rows(header, reader, source, profile)
+
+    def append_row(self, row: Sequence[Any]):
+        """Acrescenta uma linha (células extras são ignoradas, faltantes ficam vazias)"""
+        if not any(cell not in (None, '') for cell in row):
+            return
+        n = len(row)
+        for i, column in enumerate(self._column_list):
+            value = row[i] if i < n else ''
+            column.append(value if isinstance(value, str) else ('' if value is None else str(value)))
+        self.n_rows += 1
+        if self.profiler is not None:
+            self.profiler.update(row)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def column(self, name: str) -> Column:
+        return self._columns[name]
+
+    def has_column(self, name: str) -> bool:
+        return name in self._columns
+
+    def find_columns(self, keywords: Iterable[str]) -> List[str]:
+        """Colunas cujo nome contém alguma das palavras-chave"""
+        keywords = [k.lower() for k in keywords]
+        return [c for c in self.columns if any(k in c.lower() for k in keywords)]
+
+    def row(self, i: int) -> Dict[str, str]:
+        return {name: self._columns[name][i] for name in self.columns}
+
+    def head(self, n: int = 5) -> List[Dict[str, str]]:
+        return [self.row(i) for i in range(min(n, self.n_rows))]
+
+    def iter_rows(self) -> Iterator[Dict[str, str]]:
+        for i in range(self.n_rows):
+            yield self.row(i)
+
+    def memory_bytes(self) -> int:
+        return sum(col.memory_bytes() for col in self._columns.values())
+
+    def summary(self, file_type: str = 'CSV') -> Dict[str, Any]:
+        """Resumo no formato das respostas de upload"""
+        return {
+            "total_rows": self.n_rows,
+            "columns": list(self.columns),
+            "column_count": len(self.columns),
+            "sample_data": self.head(5),
+            "file_type": file_type
+        }
+
+
+def _prepend(first: str, rest: Iterable[str]) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def all_columns(tables: Iterable[ColumnarTable]) -> List[str]:
+    """União ordenada das colunas de várias tabelas"""
+    seen = {}
+    for table in tables:
+        for col in table.columns:
+            seen.setdefault(col, None)
+    return list(seen)
+
+
+def total_rows(tables: Iterable[ColumnarTable]) -> int:
+    return sum(table.n_rows for table in tables)
+
+
+def distinct_values(tables: Iterable[ColumnarTable], column: str) -> set:
+    """Valores distintos não vazios de uma coluna em todas as tabelas (sem varrer linhas)"""
+    distintos = set()
+    for table in tables:
+        if table.has_column(column):
+            distintos.update(table.column(column).values[1:])
+    return distintos
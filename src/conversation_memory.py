@@ -0,0 +1,127 @@
+"""
+Histórico de conversa com tamanho limitado para os chats de IA
+Mantém as últimas interações em um buffer circular, contabiliza a memória
+usada e compacta as interações antigas em um resumo curto
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Iterator, List
+
+# Limites padrão por instância (uma instância por sessão/chat)
+MAX_TURNS = 20
+MAX_BYTES = 64 * 1024
+MAX_RESPONSE_CHARS = 4000
+SUMMARY_MAX_CHARS = 1200
+
+
+def _text_bytes(text: str) -> int:
+    """Tamanho do texto em bytes (UTF-8)"""
+    return len(text.encode('utf-8'))
+
+
+class ConversationHistory:
+    """Buffer circular de interações (pergunta/resposta) com resumo das antigas"""
+
+    def __init__(self, max_turns: int = MAX_TURNS, max_bytes: int = MAX_BYTES,
+                 max_response_chars: int = MAX_RESPONSE_CHARS, summary_max_chars: int = SUMMARY_MAX_CHARS):
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.max_response_chars = max_response_chars
+        self.summary_max_chars = summary_max_chars
+        self._turns = deque()
+        self._bytes = 0
+        self._summary = deque()
+        self._summary_chars = 0
+        self.total_turns = 0
+        self._lock = threading.Lock()
+
+    def add(self, user: str, ai: str) -> Dict[str, Any]:
+        """Registra uma interação; compacta as mais antigas se passar dos limites"""
+        ai = ai or ''
+        if len(ai) > self.max_response_chars:
+            ai = ai[:self.max_response_chars] + '…'
+
+        turn = {'user': user or '', 'ai': ai, 'timestamp': datetime.now()}
+        size = _text_bytes(turn['user']) + _text_bytes(turn['ai'])
+
+        with self._lock:
+            self._turns.append((turn, size))
+            self._bytes += size
+            self.total_turns += 1
+
+            while self._turns and (len(self._turns) > self.max_turns or self._bytes > self.max_bytes):
+                antigo, antigo_size = self._turns.popleft()
+                self._bytes -= antigo_size
+                self._compact(antigo)
+
+        return turn
+
+    def _compact(self, turn: Dict[str, Any]):
+        """Resume uma interação antiga em uma linha e mantém o resumo limitado"""
+        pergunta = ' '.join(turn['user'].split())[:100]
+        primeira_linha = next((l.strip() for l in turn['ai'].splitlines() if l.strip()), '')[:100]
+        linha = f"- {turn['timestamp']:%d/%m %H:%M} P: {pergunta} | R: {primeira_linha}"
+
+        self._summary.append(linha)
+        self._summary_chars += len(linha) + 1
+        while self._summary and self._summary_chars > self.summary_max_chars:
+            self._summary_chars -= len(self._summary.popleft()) + 1
+
+    @property
+    def summary(self) -> str:
+        """Resumo das interações que saíram do buffer"""
+        return '\n'.join(self._summary)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Memória aproximada do conteúdo guardado (turnos + resumo)"""
+        return self._bytes + self._summary_chars
+
+    def recent(self, n: int = None) -> List[Dict[str, Any]]:
+        """Últimas n interações (todas, se n for None)"""
+        with self._lock:
+            turns = [t for t, _ in self._turns]
+        return turns if n is None else turns[-n:]
+
+    def to_prompt(self, max_chars: int = 1500, max_turns: int = 4) -> str:
+        """Texto compacto do histórico para o prompt: resumo + turnos recentes, até max_chars"""
+        linhas = []
+        usados = 0
+        for turn in reversed(self.recent(max_turns)):
+            bloco = f"Usuário: {turn['user']}\nIA: {' '.join(turn['ai'].split())[:300]}"
+            if usados + len(bloco) + 1 > max_chars:
+                break
+            linhas.insert(0, bloco)
+            usados += len(bloco) + 1
+
+        resumo = self.summary
+        if resumo and usados + len(resumo) + 20 <= max_chars:
+            linhas.insert(0, f"Resumo anterior:\n{resumo}")
+
+        return '\n'.join(linhas)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do histórico"""
+        return {
+            'turnos_recentes': len(self._turns),
+            'turnos_total': self.total_turns,
+            'linhas_resumo': len(self._summary),
+            'memoria_bytes': self.memory_bytes,
+            'limite_bytes': self.max_bytes
+        }
+
+    def clear(self):
+        """Limpa o histórico"""
+        with self._lock:
+            self._turns.clear()
+            self._summary.clear()
+            self._bytes = 0
+            self._summary_chars = 0
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.recent())
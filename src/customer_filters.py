@@ -0,0 +1,263 @@
+"""
+Filtros de clientes por recência e ticket médio (sem pandas)
+Agrega os pedidos carregados em uma tabela por cliente (último pedido,
+quantidade de pedidos e valor total) ordenada pela data do último pedido.
+Sobre essa ordem fica uma árvore de intervalos com os tickets ordenados e
+somas acumuladas em cada nó, então qualquer combinação de "dias inativos" e
+faixa de ticket é respondida com buscas binárias (bisect), sem varrer clientes
+"""
+
+import csv
+import io
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.columnar import ColumnarTable, parse_number
+
+# Colunas procuradas nos arquivos de pedidos (em ordem de preferência)
+CUSTOMER_KEYWORDS = ['telefone', 'fone', 'celular', 'cliente', 'nome', 'email', 'cpf']
+DATE_KEYWORDS = ['data fechamento', 'data']
+VALUE_KEYWORDS = ['total', 'valor']
+# Colunas de produto/item não identificam cliente (ex.: 'Nome Prod' nos itens)
+CUSTOMER_EXCLUDE = ['prod', 'item']
+# Atributos do cliente (valor do pedido mais recente), usados na segmentação
+ATTRIBUTE_KEYWORDS = {'bairro': ['bairro'], 'origem': ['origem', 'canal']}
+
+_DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%y',
+                 '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+EXPORT_HEADER = ['cliente', 'ultimo_pedido', 'dias_inativo', 'pedidos', 'valor_total', 'ticket_medio']
+
+
+def parse_datetime(text: str) -> Optional[datetime]:
+    """Data/hora nos formatos mais comuns das exportações (brasileiro e ISO)"""
+    text = text.strip()
+    if not text:
+        return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(text: str) -> Optional[date]:
+    parsed = parse_datetime(text)
+    return parsed.date() if parsed else None
+
+
+def _pick_column(table: ColumnarTable, keywords: Sequence[str], exclude: Sequence[str] = ()) -> Optional[str]:
+    """Primeira coluna que contém a palavra-chave de maior preferência"""
+    for keyword in keywords:
+        matches = [c for c in table.find_columns([keyword]) if not any(x in c.lower() for x in exclude)]
+        if matches:
+            return matches[0]
+    return None
+
+
+def _customer_key(column: str, value: str) -> str:
+    """Telefones são comparados só pelos dígitos; os demais campos sem caixa e espaços extras"""
+    if any(k in column.lower() for k in ('telefone', 'fone', 'celular')):
+        return re.sub(r'\D', '', value)
+    return ' '.join(value.split()).lower()
+
+
+class _RangeTree:
+    """Árvore de intervalos sobre a ordem por recência: cada nó guarda os tickets
+    ordenados e as somas acumuladas (valor e pedidos) na mesma ordem"""
+
+    def __init__(self, tickets: Sequence[float], totals: Sequence[float], orders: Sequence[int]):
+        self.size = 1
+        while self.size < len(tickets):
+            self.size *= 2
+        self.keys = [array('d') for _ in range(2 * self.size)]
+        self.value_sums = [array('d', [0.0]) for _ in range(2 * self.size)]
+        self.order_sums = [array('d', [0.0]) for _ in range(2 * self.size)]
+
+        for i in range(len(tickets)):
+            self._fill(self.size + i, [(tickets[i], totals[i], orders[i])])
+        for node in range(self.size - 1, 0, -1):
+            left, right = 2 * node, 2 * node + 1
+            merged = sorted(self._entries(left) + self._entries(right))
+            self._fill(node, merged)
+
+    def _entries(self, node: int) -> List[Tuple[float, float, float]]:
+        keys, values, orders = self.keys[node], self.value_sums[node], self.order_sums[node]
+        return [(keys[i], values[i + 1] - values[i], orders[i + 1] - orders[i]) for i in range(len(keys))]
+
+    def _fill(self, node: int, entries: List[Tuple[float, float, float]]):
+        keys, values, orders = self.keys[node], self.value_sums[node], self.order_sums[node]
+        for ticket, total, count in entries:
+            keys.append(ticket)
+            values.append(values[-1] + total)
+            orders.append(orders[-1] + count)
+
+    def query(self, end: int, low: float, high: float) -> Tuple[int, float, float]:
+        """(clientes, valor, pedidos) das posições [0, end) com ticket em [low, high]"""
+        count, value, orders = 0, 0.0, 0.0
+        lo, hi = self.size, self.size + end
+        while lo < hi:
+            if lo & 1:
+                c, v, o = self._node(lo, low, high)
+                count, value, orders = count + c, value + v, orders + o
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                c, v, o = self._node(hi, low, high)
+                count, value, orders = count + c, value + v, orders + o
+            lo //= 2
+            hi //= 2
+        return count, value, orders
+
+    def _node(self, node: int, low: float, high: float) -> Tuple[int, float, float]:
+        keys = self.keys[node]
+        start, stop = bisect_left(keys, low), bisect_right(keys, high)
+        if start >= stop:
+            return 0, 0.0, 0.0
+        values, orders = self.value_sums[node], self.order_sums[node]
+        return stop - start, values[stop] - values[start], orders[stop] - orders[start]
+
+
+class CustomerIndex:
+    """Tabela por cliente ordenada pelo último pedido, com consultas por recência e ticket"""
+
+    def __init__(self, customers: Dict[str, List]):
+        # Ordem por recência: do último pedido mais antigo para o mais recente
+        ordered = sorted(customers.items(), key=lambda item: item[1][0])
+        self.keys = [key for key, _ in ordered]
+        self.labels = [data[3] for _, data in ordered]
+        self.last_order = array('l', (data[0] for _, data in ordered))
+        self.orders = array('l', (data[1] for _, data in ordered))
+        self.totals = array('d', (data[2] for _, data in ordered))
+        self.tickets = array('d', (t / n if n else 0.0 for t, n in zip(self.totals, self.orders)))
+        self.attributes = {attr: [data[4].get(attr, '') for _, data in ordered] for attr in ATTRIBUTE_KEYWORDS}
+        self._tree = _RangeTree(self.tickets, self.totals, self.orders)
+
+    @classmethod
+    def from_tables(cls, tables: Iterable[ColumnarTable]) -> 'CustomerIndex':
+        """Agrega os pedidos de todas as tabelas que têm cliente e data"""
+        customers = {}
+        for table in tables:
+            customer_col = _pick_column(table, CUSTOMER_KEYWORDS, CUSTOMER_EXCLUDE)
+            date_col = _pick_column(table, DATE_KEYWORDS)
+            if customer_col is None or date_col is None:
+                continue
+            value_col = _pick_column(table, VALUE_KEYWORDS)
+
+            customer = table.column(customer_col)
+            dates = table.column(date_col)
+            values = table.column(value_col).numeric() if value_col else None
+            attribute_cols = {attr: table.column(col) for attr, col in
+                              ((attr, _pick_column(table, kw)) for attr, kw in ATTRIBUTE_KEYWORDS.items()) if col}
+
+            # Colunas em dicionário: cada data e cada cliente distinto é convertido uma vez só
+            ordinals = [None] * len(dates.values)
+            for code, text in enumerate(dates.values):
+                parsed = parse_date(text) if text else None
+                ordinals[code] = parsed.toordinal() if parsed else None
+            keys = [_customer_key(customer_col, text) if text else '' for text in customer.values]
+
+            for i in range(table.n_rows):
+                key = keys[customer.codes[i]]
+                ordinal = ordinals[dates.codes[i]]
+                if not key or ordinal is None:
+                    continue
+                value = values[i] if values is not None else 0.0
+                if value != value:  # NaN (célula sem número)
+                    value = 0.0
+
+                data = customers.get(key)
+                if data is None:
+                    data = customers[key] = [ordinal, 0, 0.0, customer.values[customer.codes[i]], {}]
+                if ordinal >= data[0]:
+                    data[0] = ordinal
+                    for attr, col in attribute_cols.items():
+                        if col[i]:
+                            data[4][attr] = col[i]
+                data[1] += 1
+                data[2] += value
+        return cls(customers)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _recency_end(self, dias_inativos: Optional[int], today: Optional[date]) -> int:
+        """Quantidade de clientes (prefixo da ordem) sem pedido há pelo menos dias_inativos"""
+        if not dias_inativos:
+            return len(self.keys)
+        limit = (today or date.today()).toordinal() - int(dias_inativos)
+        return bisect_right(self.last_order, limit)
+
+    def query(self, dias_inativos: Optional[int] = None, ticket_min: Optional[float] = None,
+              ticket_max: Optional[float] = None, today: Optional[date] = None) -> Dict[str, float]:
+        """Totais dos clientes que passam nos filtros (sem percorrer os clientes)"""
+        end = self._recency_end(dias_inativos, today)
+        low = float('-inf') if ticket_min is None else float(ticket_min)
+        high = float('inf') if ticket_max is None else float(ticket_max)
+        count, value, orders = self._tree.query(end, low, high)
+        return {
+            'total_clients': count,
+            'total_value': value,
+            'total_orders': int(orders),
+            'average_ticket': value / orders if orders else 0.0
+        }
+
+    def iter_matches(self, dias_inativos: Optional[int] = None, ticket_min: Optional[float] = None,
+                     ticket_max: Optional[float] = None, today: Optional[date] = None) -> Iterator[int]:
+        """Posições dos clientes que passam nos filtros (na ordem por recência)"""
+        end = self._recency_end(dias_inativos, today)
+        low = float('-inf') if ticket_min is None else float(ticket_min)
+        high = float('inf') if ticket_max is None else float(ticket_max)
+        tickets = self.tickets
+        for i in range(end):
+            if low <= tickets[i] <= high:
+                yield i
+
+    def iter_csv(self, dias_inativos: Optional[int] = None, ticket_min: Optional[float] = None,
+                 ticket_max: Optional[float] = None, today: Optional[date] = None,
+                 batch_size: int = 500) -> Iterator[str]:
+        """CSV dos clientes filtrados, gerado em blocos de linhas"""
+        today = today or date.today()
+        return self.write_csv(self.iter_matches(dias_inativos, ticket_min, ticket_max, today), today, batch_size)
+
+    def write_csv(self, positions: Iterable[int], today: Optional[date] = None,
+                  batch_size: int = 500) -> Iterator[str]:
+        """CSV dos clientes nas posições informadas, gerado em blocos de linhas"""
+        today = today or date.today()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        writer.writerow(EXPORT_HEADER + list(ATTRIBUTE_KEYWORDS))
+
+        rows = 0
+        for i in positions:
+            last = date.fromordinal(self.last_order[i])
+            writer.writerow([
+                self.labels[i],
+                last.strftime('%d/%m/%Y'),
+                today.toordinal() - self.last_order[i],
+                self.orders[i],
+                f"{self.totals[i]:.2f}".replace('.', ','),
+                f"{self.tickets[i]:.2f}".replace('.', ',')
+            ] + [self.attributes[attr][i] for attr in ATTRIBUTE_KEYWORDS])
+            rows += 1
+            if rows % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+
+def ticket_range(ticket_medio, open_ended_from: float = 1000) -> Tuple[Optional[float], Optional[float]]:
+    """Converte a opção de ticket da tela ("Até R$ X" ou "R$ 1000+") em faixa (mínimo, máximo)"""
+    if ticket_medio in (None, ''):
+        return None, None
+    value = parse_number(str(ticket_medio))
+    if value is None:
+        raise ValueError(f"Ticket médio inválido: {ticket_medio}")
+    if value >= open_ended_from:
+        return value, None
+    return None, value
@@ -0,0 +1,171 @@
+"""
+Gráficos do dashboard a partir de séries pré-agregadas
+Nenhum pedido individual vai para o navegador: as figuras são montadas sobre o
+cubo de vendas (faturamento por dia/hora e por bairro) e sobre a soma diária
+dos itens por produto. Séries temporais usam Scattergl (WebGL) para continuar
+fluidas com anos de histórico, e cada figura fica em cache no processador por
+versão dos dados e filtro
+"""
+
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from .analysis_core import dates_series, numbers_series
+
+# Períodos do filtro do dashboard (dias contados a partir da última venda)
+PERIODOS = {'30d': 30, '90d': 90, '365d': 365, 'tudo': None}
+GRANULARIDADES = {'dia': 'Faturamento diário', 'hora': 'Faturamento por hora'}
+TOP_N = 10
+
+COLUNAS_VALOR_ITEM = ['Valor Tot. Item', 'Valor. Tot. Item', 'Valor Tot Item', 'Valor Total Item', 'Valor']
+
+
+def figura_vazia(titulo: str, mensagem: str = "Processe os dados para ver o gráfico") -> Dict[str, Any]:
+    fig = go.Figure()
+    fig.update_layout(
+        title=titulo,
+        xaxis={'visible': False},
+        yaxis={'visible': False},
+        annotations=[{'text': mensagem, 'showarrow': False, 'font': {'size': 14}}]
+    )
+    return fig.to_dict()
+
+
+def _datas_periodo(datas: pd.Series, periodo: str) -> Optional[list]:
+    """Datas do período (None = todas); a referência é a última venda, não a data de hoje"""
+    dias = PERIODOS.get(periodo)
+    if dias is None or datas.empty:
+        return None
+    limite = datas.max() - pd.Timedelta(days=dias - 1)
+    return list(datas[datas >= limite].unique())
+
+
+def serie_faturamento(processor, granularidade: str = 'dia', periodo: str = 'tudo') -> pd.Series:
+    """Faturamento por dia (com dias sem venda = 0) ou por hora, somado a partir do cubo"""
+    cubo = processor.get_sales_cube()
+    if cubo is None or cubo.celulas.empty:
+        return pd.Series(dtype=float)
+
+    datas = pd.to_datetime(cubo.celulas['Data'])
+    filtros = {}
+    periodo_datas = _datas_periodo(datas, periodo)
+    if periodo_datas is not None:
+        filtros['Data'] = periodo_datas
+
+    if granularidade == 'hora':
+        consolidado = cubo.rollup(['Data', 'Hora'], filtros)
+        momentos = pd.to_datetime(consolidado['Data']) + pd.to_timedelta(consolidado['Hora'], unit='h')
+        return pd.Series(consolidado['total'].to_numpy(), index=momentos).sort_index()
+
+    consolidado = cubo.rollup(['Data'], filtros)
+    serie = pd.Series(consolidado['total'].to_numpy(), index=pd.to_datetime(consolidado['Data'])).sort_index()
+    return serie.asfreq('D', fill_value=0.0)
+
+
+def totais_bairros(processor, periodo: str = 'tudo', n: int = TOP_N) -> pd.DataFrame:
+    """Top N bairros por faturamento (com pedidos) no período"""
+    cubo = processor.get_sales_cube()
+    if cubo is None or cubo.celulas.empty:
+        return pd.DataFrame(columns=['Bairro', 'total', 'pedidos'])
+
+    filtros = {}
+    periodo_datas = _datas_periodo(pd.to_datetime(cubo.celulas['Data']), periodo)
+    if periodo_datas is not None:
+        filtros['Data'] = periodo_datas
+
+    consolidado = cubo.rollup(['Bairro'], filtros)
+    consolidado = consolidado[consolidado['Bairro'] != '']
+    return consolidado.nlargest(n, 'total')[['Bairro', 'total', 'pedidos']]
+
+
+def produtos_diario(processor) -> pd.DataFrame:
+    """Quantidade e valor por dia × produto (pré-agregação dos itens, uma vez por carga)"""
+    def construir():
+        itens = processor.dataframes.get('itens')
+        if itens is None or 'Nome Prod' not in itens.columns or 'Qtd.' not in itens.columns:
+            return pd.DataFrame(columns=['Data', 'Nome Prod', 'qtd', 'valor'])
+
+        valor_col = next((c for c in COLUNAS_VALOR_ITEM if c in itens.columns), None)
+        datas = itens['Data Fec. Ped.'] if 'Data Fec. Ped.' in itens.columns else pd.Series(pd.NaT, index=itens.index)
+        datas = dates_series(datas)
+
+        base = pd.DataFrame({
+            'Data': datas.dt.normalize(),
+            'Nome Prod': itens['Nome Prod'],
+            # Valores do CSV chegam como texto com vírgula ('39,80')
+            'qtd': numbers_series(itens['Qtd.']).fillna(0),
+            'valor': numbers_series(itens[valor_col]).fillna(0.0) if valor_col else 0.0
+        })
+        return base.groupby(['Data', 'Nome Prod'], dropna=False)[['qtd', 'valor']].sum().reset_index()
+
+    return processor.get_cached('produtos_diario', construir)
+
+
+def top_produtos(processor, periodo: str = 'tudo', n: int = TOP_N) -> pd.DataFrame:
+    diario = produtos_diario(processor)
+    if diario.empty:
+        return diario
+
+    periodo_datas = _datas_periodo(diario['Data'].dropna(), periodo)
+    if periodo_datas is not None:
+        diario = diario[diario['Data'].isin(periodo_datas)]
+    return diario.groupby('Nome Prod')[['qtd', 'valor']].sum().nlargest(n, 'qtd').reset_index()
+
+
+def figura_evolucao(processor, granularidade: str = 'dia', periodo: str = 'tudo') -> Dict[str, Any]:
+    def construir():
+        titulo = GRANULARIDADES.get(granularidade, GRANULARIDADES['dia'])
+        serie = serie_faturamento(processor, granularidade, periodo)
+        if serie.empty:
+            return figura_vazia(titulo)
+
+        fig = go.Figure(go.Scattergl(
+            x=serie.index, y=serie.to_numpy(), mode='lines', name='Faturamento',
+            hovertemplate='%{x}<br>R$ %{y:,.2f}<extra></extra>'
+        ))
+        if granularidade == 'dia' and len(serie) >= 14:
+            media = serie.rolling(7, min_periods=1).mean()
+            fig.add_trace(go.Scattergl(x=media.index, y=media.to_numpy(), mode='lines', name='Média 7 dias'))
+        fig.update_layout(title=titulo, xaxis={'rangeslider': {'visible': True}},
+                          yaxis={'title': 'R$'}, hovermode='x unified')
+        return fig.to_dict()
+
+    return processor.get_cached(f"grafico:evolucao:{granularidade}:{periodo}", construir)
+
+
+def figura_bairros(processor, periodo: str = 'tudo') -> Dict[str, Any]:
+    def construir():
+        bairros = totais_bairros(processor, periodo)
+        if bairros.empty:
+            return figura_vazia(f"Top {TOP_N} bairros")
+
+        bairros = bairros.iloc[::-1]
+        fig = go.Figure(go.Bar(
+            x=bairros['total'], y=bairros['Bairro'], orientation='h',
+            customdata=bairros['pedidos'],
+            hovertemplate='%{y}<br>R$ %{x:,.2f}<br>%{customdata} pedidos<extra></extra>'
+        ))
+        fig.update_layout(title=f"Top {TOP_N} bairros por faturamento", xaxis={'title': 'R$'})
+        return fig.to_dict()
+
+    return processor.get_cached(f"grafico:bairros:{periodo}", construir)
+
+
+def figura_produtos(processor, periodo: str = 'tudo') -> Dict[str, Any]:
+    def construir():
+        produtos = top_produtos(processor, periodo)
+        if produtos.empty:
+            return figura_vazia(f"Top {TOP_N} produtos")
+
+        produtos = produtos.iloc[::-1]
+        fig = go.Figure(go.Bar(
+            x=produtos['qtd'], y=produtos['Nome Prod'], orientation='h',
+            customdata=produtos['valor'],
+            hovertemplate='%{y}<br>%{x} unidades<br>R$ %{customdata:,.2f}<extra></extra>'
+        ))
+        fig.update_layout(title=f"Top {TOP_N} produtos mais vendidos", xaxis={'title': 'Quantidade'})
+        return fig.to_dict()
+
+    return processor.get_cached(f"grafico:produtos:{periodo}", construir)
@@ -0,0 +1,134 @@
+"""
+Barramento de eventos em memória com canal SSE (Server-Sent Events)
+Upload, etapas do processamento e relatórios prontos são publicados uma vez
+por tópico (a sessão do navegador ou um tópico global); cada aba conectada
+recebe o evento na hora, sem polling. Conexões ociosas só trocam um
+comentário de keep-alive, e cada stream encerra depois de alguns minutos:
+o EventSource reconecta sozinho com Last-Event-ID e recebe o que perdeu
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import Response, stream_with_context
+
+# Keep-alive (proxies derrubam conexões sem tráfego) e duração máxima de cada stream
+HEARTBEAT_SECONDS = 25
+STREAM_MAX_SECONDS = 300
+# Intervalo de reconexão sugerido ao navegador (ms)
+RETRY_MS = 3000
+HISTORY_SIZE = 50
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Mensagem no formato text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    lines.extend(f"data: {line}" for line in payload.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventBus:
+    """Publica eventos por tópico e os entrega às filas dos assinantes"""
+
+    def __init__(self, history_size: int = HISTORY_SIZE, max_topics: int = 1000):
+        self.history_size = history_size
+        self.max_topics = max_topics
+        self._next_id = 1
+        self._history = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str, event: str, data: Any = None) -> int:
+        """Publica um evento (guardado no histórico curto do tópico para reconexões)"""
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            history = self._history.get(topic)
+            if history is None:
+                if len(self._history) >= self.max_topics:
+                    # Tópicos sem assinantes são descartados primeiro
+                    idle = next((t for t in self._history if t not in self._subscribers), None)
+                    self._history.pop(idle if idle is not None else next(iter(self._history)))
+                history = self._history[topic] = deque(maxlen=self.history_size)
+            message = (event_id, event, data)
+            history.append(message)
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+        return event_id
+
+    def subscribe(self, topic: str) -> 'queue.Queue':
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, topic: str, subscriber: 'queue.Queue'):
+        with self._lock:
+            subscribers = self._subscribers.get(topic, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(topic, None)
+
+    def replay(self, topic: str, last_event_id: int) -> List[Tuple[int, str, Any]]:
+        """Eventos do tópico publicados depois de last_event_id"""
+        with self._lock:
+            return [m for m in self._history.get(topic, ()) if m[0] > last_event_id]
+
+    def stream(self, topic: str, last_event_id: Optional[str] = None, snapshot: Optional[Dict[str, Any]] = None,
+               heartbeat: float = HEARTBEAT_SECONDS, max_seconds: float = STREAM_MAX_SECONDS) -> Iterator[str]:
+        """
+        Gerador do corpo text/event-stream de uma conexão.
+
+        Na reconexão (Last-Event-ID) reenvia o que foi perdido; numa conexão nova
+        envia o `snapshot` (estado atual) como evento 'estado'.
+        """
+        subscriber = self.subscribe(topic)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if last_event_id and str(last_event_id).isdigit():
+                for event_id, event, data in self.replay(topic, int(last_event_id)):
+                    yield format_sse(event, data, event_id)
+            elif snapshot is not None:
+                with self._lock:
+                    current_id = self._next_id - 1
+                yield format_sse('estado', snapshot, current_id)
+
+            deadline = time.time() + max_seconds
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event_id, event, data = subscriber.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data, event_id)
+        finally:
+            self.unsubscribe(topic, subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'topicos': len(self._history),
+                'conexoes': sum(len(s) for s in self._subscribers.values()),
+                'ultimo_evento': self._next_id - 1
+            }
+
+
+def sse_response(stream: Iterator[str]):
+    """Resposta Flask para um stream SSE (sem buffer em proxies)"""
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
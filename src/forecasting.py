@@ -0,0 +1,103 @@
+"""
+Previsão de vendas da ZapChicken usando apenas NumPy
+Modelo sazonal-ingênuo com tendência: faturamento diário = nível + tendência × dia
++ efeito do dia da semana, ajustado por mínimos quadrados (sem scikit-learn)
+"""
+
+import numpy as np
+from typing import Dict, Any
+
+PERIODO_SEMANAL = 7
+
+
+def _matriz_desenho(inicio: int, fim: int, dia_semana_inicial: int, n_parametros: int) -> np.ndarray:
+    """Monta a matriz [1, t, dummies do dia da semana] para os dias inicio..fim-1"""
+    t = np.arange(inicio, fim, dtype=np.float64)
+    colunas = [np.ones_like(t)]
+
+    if n_parametros >= 2:
+        colunas.append(t)
+
+    if n_parametros > 2:
+        # Segunda-feira (0) é a referência; uma dummy para cada outro dia
+        dia_semana = (dia_semana_inicial + np.arange(inicio, fim)) % PERIODO_SEMANAL
+        dummies = dia_semana[:, None] == np.arange(1, PERIODO_SEMANAL)[None, :]
+        colunas.extend(dummies.T.astype(np.float64))
+
+    return np.column_stack(colunas)
+
+
+def fit_seasonal_trend(valores: np.ndarray, dia_semana_inicial: int = 0) -> Dict[str, Any]:
+    """
+    Ajusta o modelo de tendência + sazonalidade semanal.
+
+    Aceita uma série (n_dias,) ou várias séries lado a lado (n_dias, n_series),
+    que são ajustadas de uma só vez (um único lstsq com múltiplos alvos).
+    dia_semana_inicial segue a convenção do pandas (0 = segunda-feira).
+    """
+    y = np.asarray(valores, dtype=np.float64)
+    serie_unica = y.ndim == 1
+    if serie_unica:
+        y = y[:, None]
+
+    n_dias = y.shape[0]
+    if n_dias == 0:
+        raise ValueError("Série vazia: não há dias para ajustar o modelo")
+
+    # Com pouco histórico reduz o modelo (nível + tendência, ou só nível)
+    if n_dias > PERIODO_SEMANAL + 1:
+        n_parametros = PERIODO_SEMANAL + 1
+    elif n_dias >= 3:
+        n_parametros = 2
+    else:
+        n_parametros = 1
+
+    X = _matriz_desenho(0, n_dias, dia_semana_inicial, n_parametros)
+    coeficientes, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
+
+    ajustado = X @ coeficientes
+    residuos = y - ajustado
+    soma_residuos = (residuos ** 2).sum(axis=0)
+    soma_total = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(soma_total > 0, 1 - soma_residuos / soma_total, 0.0)
+
+    graus_liberdade = max(n_dias - n_parametros, 1)
+
+    return {
+        'coeficientes': coeficientes,
+        'n_parametros': n_parametros,
+        'n_dias': n_dias,
+        'dia_semana_inicial': dia_semana_inicial,
+        'r2': np.clip(r2, 0.0, 1.0),
+        'erro_padrao': np.sqrt(soma_residuos / graus_liberdade),
+        'serie_unica': serie_unica
+    }
+
+
+def forecast(modelo: Dict[str, Any], horizonte: int = 30) -> np.ndarray:
+    """Projeta os próximos `horizonte` dias; valores negativos viram zero"""
+    n_dias = modelo['n_dias']
+    X = _matriz_desenho(n_dias, n_dias + horizonte, modelo['dia_semana_inicial'], modelo['n_parametros'])
+    previsoes = np.clip(X @ modelo['coeficientes'], 0.0, None)
+    return previsoes[:, 0] if modelo['serie_unica'] else previsoes
+
+
+def trend_per_day(modelo: Dict[str, Any]) -> np.ndarray:
+    """Inclinação da tendência (R$ por dia) de cada série"""
+    coeficientes = modelo['coeficientes']
+    if modelo['n_parametros'] < 2:
+        tendencia = np.zeros(coeficientes.shape[1])
+    else:
+        tendencia = coeficientes[1]
+    return tendencia[0] if modelo['serie_unica'] else tendencia
+
+
+def weekly_effects(modelo: Dict[str, Any]) -> np.ndarray:
+    """Efeito médio de cada dia da semana (0 = segunda), centrado em zero"""
+    coeficientes = modelo['coeficientes']
+    efeitos = np.zeros((PERIODO_SEMANAL, coeficientes.shape[1]))
+    if modelo['n_parametros'] > 2:
+        efeitos[1:] = coeficientes[2:]
+    efeitos -= efeitos.mean(axis=0)
+    return efeitos[:, 0] if modelo['serie_unica'] else efeitos
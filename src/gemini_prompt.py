@@ -0,0 +1,142 @@
+"""
+Construtor de prompts para o Gemini
+Seleciona apenas as seções de dados relevantes para a pergunta, codifica
+tabelas em formato compacto (CSV) e respeita um orçamento de tokens
+"""
+
+from typing import List, Dict, Iterable, Sequence
+
+# Preâmbulo fixo: idêntico em todas as chamadas (reaproveitável pela API)
+SYSTEM_PREAMBLE = """Você é especialista em Business Intelligence para delivery de comida, analisando dados da ZapChicken.
+REGRAS:
+- Use APENAS os dados fornecidos; sem estimativas ou suposições. Se faltar algo, diga "Dados não disponíveis".
+- Tabelas de dados vêm em CSV (primeira linha = cabeçalho; valores em R$ sem formatação).
+- Responda em português com títulos ###, emojis (🛒 Pedidos, 🛍️ Produtos, 👥 Clientes, 💰 Financeiro), tabelas markdown e **negrito** nos valores-chave.
+- Formate valores como R$ 1.234,56.
+- Após cada tabela, um **💡 Insight** curto; feche com 🎯 Oportunidades, 📈 Tendências, 💡 Recomendações e ⚠️ Alertas baseados nos dados."""
+
+# Orçamento padrão (tokens estimados) para dados + histórico, sem contar o preâmbulo
+DEFAULT_TOKEN_BUDGET = 1500
+
+# Aproximação de ~4 caracteres por token para texto em português
+CHARS_PER_TOKEN = 4
+
+# Seções por intenção, em ordem de prioridade
+INTENT_SECTIONS = {
+    'vendas': ['geral', 'mensal', 'origem', 'diario'],
+    'produtos': ['geral', 'produtos', 'produtos_valor', 'categorias'],
+    'clientes': ['geral', 'clientes', 'frequencia', 'top_clientes'],
+    'geografia': ['geral', 'bairros', 'bairros_clientes'],
+    'temporal': ['geral', 'mensal', 'semana', 'hora'],
+    'previsao': ['geral', 'mensal', 'diario', 'semana'],
+}
+
+INTENT_KEYWORDS = {
+    'vendas': ['venda', 'vendeu', 'faturamento', 'receita', 'ticket', 'origem', 'canal', 'pedido'],
+    'produtos': ['produto', 'item', 'itens', 'cardápio', 'cardapio', 'categoria', 'mais vendido', 'combo'],
+    'clientes': ['cliente', 'fiel', 'frequên', 'frequen', 'inativ', 'recorr', 'comprou'],
+    'geografia': ['bairro', 'região', 'regiao', 'geográf', 'geograf', 'entrega', 'local'],
+    'temporal': ['mês', 'mes', 'mensal', 'sazonal', 'semana', 'hora', 'horário', 'horario', 'pico', 'dia da semana', 'diári', 'diario'],
+    'previsao': ['previs', 'tendên', 'tenden', 'futuro', 'próximo', 'proximo', 'crescimento'],
+}
+
+# Ordem usada quando nenhuma intenção é detectada
+DEFAULT_SECTIONS = ['geral', 'mensal', 'origem', 'produtos', 'clientes', 'bairros', 'semana', 'hora',
+                    'frequencia', 'produtos_valor', 'categorias', 'top_clientes', 'diario', 'bairros_clientes']
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa rápida de tokens (sem tokenizador)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_table(headers: Sequence[str], rows: Iterable[Sequence], decimals: int = 2) -> str:
+    """Codifica uma tabela em CSV compacto (floats arredondados, sem separadores de milhar)"""
+    def fmt(value) -> str:
+        if isinstance(value, float):
+            text = f"{value:.{decimals}f}".rstrip('0').rstrip('.')
+            return text or '0'
+        text = str(value)
+        if ',' in text or '"' in text:
+            text = '"' + text.replace('"', '""') + '"'
+        return text
+
+    lines = [','.join(headers)]
+    lines.extend(','.join(fmt(v) for v in row) for row in rows)
+    return '\n'.join(lines)
+
+
+def detect_intents(question: str) -> List[str]:
+    """Identifica as intenções da pergunta pelas palavras-chave"""
+    question_lower = question.lower()
+    return [intent for intent, words in INTENT_KEYWORDS.items()
+            if any(word in question_lower for word in words)]
+
+
+def select_sections(question: str) -> List[str]:
+    """Lista ordenada (sem repetição) das seções relevantes para a pergunta"""
+    intents = detect_intents(question)
+    if not intents:
+        return list(DEFAULT_SECTIONS)
+
+    selected = []
+    for intent in intents:
+        for section in INTENT_SECTIONS[intent]:
+            if section not in selected:
+                selected.append(section)
+    return selected
+
+
+def _truncate_lines(text: str, max_chars: int) -> str:
+    """Corta um bloco por linhas inteiras para caber em max_chars"""
+    if len(text) <= max_chars:
+        return text
+    kept, used = [], 0
+    for line in text.split('\n'):
+        if used + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    return '\n'.join(kept)
+
+
+def build_prompt(question: str, sections: Dict[str, str], history: str = '',
+                 token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Monta o prompt: preâmbulo fixo + seções relevantes + histórico + pergunta.
+
+    As seções entram por prioridade até esgotar o orçamento; a última que não
+    couber inteira é cortada por linhas (tabelas mantêm o cabeçalho).
+    O histórico usa no máximo um quarto do orçamento.
+    """
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    question_block = f"PERGUNTA: {question.strip()}"
+    budget_chars -= len(question_block)
+
+    history_block = ''
+    if history:
+        history_block = _truncate_lines(f"CONVERSA ANTERIOR:\n{history}", budget_chars // 4)
+        budget_chars -= len(history_block)
+
+    data_blocks = []
+    for name in select_sections(question):
+        content = sections.get(name)
+        if not content:
+            continue
+        block = f"[{name}]\n{content}"
+        if len(block) > budget_chars:
+            block = _truncate_lines(block, budget_chars)
+            if block.count('\n') >= 2:
+                data_blocks.append(block)
+            break
+        data_blocks.append(block)
+        budget_chars -= len(block) + 1
+
+    if not data_blocks:
+        data_blocks.append("Dados não disponíveis.")
+
+    parts = [SYSTEM_PREAMBLE, "DADOS:\n" + '\n'.join(data_blocks)]
+    if history_block:
+        parts.append(history_block)
+    parts.append(question_block)
+    return '\n\n'.join(parts)
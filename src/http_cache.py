@@ -0,0 +1,209 @@
+"""
+Compressão das respostas (Brotli ou gzip) e cache HTTP com ETag forte
+As rotas que sabem a versão dos dados calculam o ETag antes de montar a
+resposta e devolvem 304 sem trabalho nenhum; as demais respostas JSON ganham
+um ETag pelo hash do corpo. Downloads usam o hash do conteúdo do relatório
+(calculado uma vez por data de modificação). Brotli é opcional: sem o pacote
+`brotli` instalado a compressão usa gzip
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from flask import Response, jsonify, request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'text/html', 'text/csv', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript'
+}
+MIN_COMPRESS_SIZE = 1024
+# Arquivos maiores que isso são enviados sem compressão (precisariam ser lidos inteiros)
+MAX_COMPRESS_SIZE = 20 * 1024 * 1024
+# Corpos comprimidos guardados por ETag (polling repetido não comprime de novo)
+COMPRESSED_CACHE_BYTES = 32 * 1024 * 1024
+
+_ENCODINGS = ('br', 'gzip')
+
+_file_hashes = OrderedDict()
+_compressed = OrderedDict()
+_compressed_bytes = 0
+_lock = threading.Lock()
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag a partir de uma versão dos dados (qualquer valor serializável em JSON)"""
+    payload = json.dumps(parts, default=str, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def file_etag(path: Union[str, Path]) -> str:
+    """Hash do conteúdo do arquivo (recalculado só quando muda a data de modificação ou o tamanho)"""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        etag = _file_hashes.get(key)
+        if etag is not None:
+            _file_hashes.move_to_end(key)
+            return etag
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+
+    with _lock:
+        _file_hashes[key] = etag
+        while len(_file_hashes) > 256:
+            _file_hashes.popitem(last=False)
+    return etag
+
+
+def _etag_matches(etag: str) -> bool:
+    """If-None-Match com o ETag (também nas variantes comprimidas, ex.: 'abc-gzip')"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains(candidate) for candidate in
+               [etag] + [f"{etag}-{encoding}" for encoding in _ENCODINGS]) or if_none_match.star_tag
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """Resposta 304 se o cliente já tem esta versão (None caso contrário)"""
+    if not _etag_matches(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_json(etag: str, build: Callable[[], Any]) -> Response:
+    """JSON com ETag da versão dos dados: build() só roda se o cliente não tiver a versão atual"""
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    response = jsonify(build())
+    response.set_etag(etag)
+    return response
+
+
+def send_report(path: Union[str, Path], **kwargs) -> Response:
+    """send_file com ETag forte do conteúdo e 304 para downloads repetidos"""
+    etag = file_etag(path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    kwargs.setdefault('as_attachment', True)
+    return send_file(path, etag=etag, conditional=True, max_age=0, **kwargs)
+
+
+def _accepted_encoding() -> Optional[str]:
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _read_body(response: Response) -> Optional[bytes]:
+    """Corpo da resposta em bytes (arquivos de send_file são lidos e fechados; streams ficam de fora)"""
+    if response.direct_passthrough:
+        if response.content_length is None or response.content_length > MAX_COMPRESS_SIZE:
+            return None
+        source = response.response
+        try:
+            data = b''.join(source)
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+        response.direct_passthrough = False
+        response.set_data(data)
+        return data
+    if response.is_streamed:
+        return None
+    return response.get_data()
+
+
+def _compressed_body(etag: Optional[str], encoding: str, data: bytes) -> bytes:
+    global _compressed_bytes
+    if etag is None:
+        return _compress(data, encoding)
+
+    key = (etag, encoding)
+    with _lock:
+        body = _compressed.get(key)
+        if body is not None:
+            _compressed.move_to_end(key)
+            return body
+
+    body = _compress(data, encoding)
+    with _lock:
+        if key not in _compressed and len(body) <= COMPRESSED_CACHE_BYTES // 8:
+            _compressed[key] = body
+            _compressed_bytes += len(body)
+            while _compressed_bytes > COMPRESSED_CACHE_BYTES:
+                _, old = _compressed.popitem(last=False)
+                _compressed_bytes -= len(old)
+    return body
+
+
+def _after_request(response: Response) -> Response:
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers:
+        return response
+
+    etag, _ = response.get_etag()
+
+    # JSON sem ETag da rota: hash do corpo (economiza banda no polling, não o processamento)
+    if etag is None and response.mimetype == 'application/json' and not response.is_streamed:
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+        response.set_etag(etag)
+        if _etag_matches(etag):
+            return not_modified(etag)
+
+    if etag is not None:
+        response.headers.setdefault('Cache-Control', 'no-cache')
+
+    response.vary.add('Accept-Encoding')
+    encoding = _accepted_encoding()
+    if encoding is None:
+        return response
+
+    data = _read_body(response)
+    if data is None or len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    response.set_data(_compressed_body(etag, encoding, data))
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        # Cada codificação é uma representação diferente: ETag próprio (aceito de volta em not_modified)
+        response.set_etag(f"{etag}-{encoding}")
+    # Faixas (Range) não valem para o corpo comprimido
+    response.accept_ranges = None
+    return response
+
+
+def init_http_cache(app):
+    """Liga compressão e ETag em todas as respostas do app Flask"""
+    app.after_request(_after_request)
+    return app
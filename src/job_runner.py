@@ -0,0 +1,183 @@
+"""
+Execução de tarefas em segundo plano (sem dependências externas)
+Cada tarefa recebe um id na hora, roda em um pool de threads e informa o
+progresso por etapa; status e resultado ficam guardados para consulta posterior
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Etapas do processamento completo dos dados da ZapChicken
+PROCESS_STAGES = [
+    ('load', 'Carregando arquivos'),
+    ('clean', 'Preparando dados'),
+    ('analyze', 'Analisando'),
+    ('save', 'Salvando relatórios'),
+]
+
+STATUS_PENDING = 'pendente'
+STATUS_RUNNING = 'executando'
+STATUS_DONE = 'concluido'
+STATUS_ERROR = 'erro'
+
+
+class Job:
+    """Estado de uma tarefa: etapas, progresso, resultado e erro"""
+
+    def __init__(self, name: str, stages: Sequence[Tuple[str, str]],
+                 on_update: Optional[Callable[['Job'], None]] = None,
+                 params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.params = dict(params or {})
+        self.status = STATUS_PENDING
+        self.stages = [{'id': sid, 'label': label, 'status': STATUS_PENDING, 'inicio': None, 'fim': None}
+                       for sid, label in stages]
+        self.current_stage = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.on_update = on_update
+        self._lock = threading.Lock()
+
+    def stage(self, stage_id: str):
+        """Marca o início de uma etapa (e a conclusão da anterior)"""
+        now = time.time()
+        with self._lock:
+            for stage in self.stages:
+                if stage['status'] == STATUS_RUNNING:
+                    stage['status'] = STATUS_DONE
+                    stage['fim'] = now
+            for stage in self.stages:
+                if stage['id'] == stage_id:
+                    stage['status'] = STATUS_RUNNING
+                    stage['inicio'] = now
+            self.current_stage = stage_id
+        self._notify()
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            for stage in self.stages:
+                if stage['status'] == STATUS_RUNNING:
+                    stage['status'] = STATUS_DONE if status == STATUS_DONE else STATUS_ERROR
+                    stage['fim'] = now
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = now
+            self.current_stage = None
+        self._notify()
+
+    def _notify(self):
+        """Avisa o ouvinte da tarefa (ex.: barramento de eventos) sobre uma mudança de estado"""
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(self)
+        except Exception:
+            traceback.print_exc()
+
+    @property
+    def progress(self) -> int:
+        """Percentual de etapas concluídas"""
+        if self.status == STATUS_DONE:
+            return 100
+        done = sum(1 for s in self.stages if s['status'] == STATUS_DONE)
+        return int(100 * done / len(self.stages)) if self.stages else 0
+
+    @property
+    def finished_ok(self) -> bool:
+        return self.status == STATUS_DONE
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status serializável em JSON (sem o resultado)"""
+        with self._lock:
+            stages = [dict(s) for s in self.stages]
+        current = next((s['label'] for s in stages if s['id'] == self.current_stage), None)
+        end = self.finished or time.time()
+        return {
+            'job_id': self.id,
+            'name': self.name,
+            'params': dict(self.params),
+            'status': self.status,
+            'progress': self.progress,
+            'current_stage': self.current_stage,
+            'current_label': current,
+            'stages': stages,
+            'error': self.error,
+            'elapsed': round(end - self.started, 2) if self.started else 0.0
+        }
+
+
+class JobRunner:
+    """Registro de tarefas + pool de threads; guarda as últimas tarefas concluídas"""
+
+    def __init__(self, max_workers: int = 1, max_jobs: int = 20, ttl: int = 3600):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='zapjob')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[[Job], Any], name: str = 'processamento',
+               stages: Sequence[Tuple[str, str]] = PROCESS_STAGES,
+               on_update: Optional[Callable[[Job], None]] = None,
+               params: Optional[Dict[str, Any]] = None) -> Job:
+        """Agenda func(job) e retorna a tarefa imediatamente (on_update(job) a cada mudança de etapa/estado)
+
+        params guarda os parâmetros da tarefa, para comparar com um novo pedido do mesmo tipo
+        """
+        job = Job(name, stages, on_update, params)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], Any]):
+        job.started = time.time()
+        job.status = STATUS_RUNNING
+        job._notify()
+        try:
+            result = func(job)
+        except Exception as e:
+            traceback.print_exc()
+            job._finish(STATUS_ERROR, error=str(e))
+        else:
+            job._finish(STATUS_DONE, result=result)
+
+    def _prune(self):
+        """Remove tarefas finalizadas antigas (por idade e por quantidade)"""
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished > self.ttl]:
+            del self._jobs[job_id]
+        finished = [j.id for j in self._jobs.values() if j.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self, name: Optional[str] = None) -> Optional[Job]:
+        """Tarefa mais recente (opcionalmente de um tipo)"""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if name is None or j.name == name]
+        return jobs[-1] if jobs else None
+
+    def active(self, name: Optional[str] = None) -> Optional[Job]:
+        """Tarefa pendente ou em execução (evita disparar o mesmo processamento duas vezes)"""
+        job = self.latest(name)
+        return job if job is not None and job.finished is None else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [j.to_dict() for j in self._jobs.values()]
@@ -9,6 +9,7 @@ from rich.console import Console
 from rich.table import Table
 
 from .utils import setup_logging, display_dataframe_info, show_progress, save_dataframe
+from .segments import SegmentIndex, bitmap_positions
 
 console = Console()
 logger = setup_logging()
@@ -137,21 +138,30 @@ class LeadGenerator:
         
         return ""
     
-    def generate_segments(self, df: pd.DataFrame, segment_by: str = None) -> Dict[str, pd.DataFrame]:
-        """Gera segmentos de leads baseado em critérios"""
+    def generate_segments(self, df: pd.DataFrame, segment_by: str = None,
+                          combine: Optional[Dict[str, Any]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Gera segmentos de leads baseado em critérios.
+        Os segmentos viram bitmaps sobre as linhas; `combine` cria segmentos extras
+        a partir de expressões (ex.: {'sp_ou_rj': 'sao_paulo | rio_de_janeiro'})
+        """
         segments = {}
         
         if not segment_by or segment_by not in df.columns:
             # Segmento único
             segments['todos'] = df
-        else:
-            # Segmenta por valores únicos na coluna especificada
-            unique_values = df[segment_by].dropna().unique()
-            
-            for value in unique_values:
-                segment_name = str(value).lower().replace(' ', '_')
-                segment_df = df[df[segment_by] == value]
-                segments[segment_name] = segment_df
+            return segments
+        
+        # Um bitmap por valor único na coluna especificada (calculado em uma passada);
+        # os bitmaps são lidos direto, sem passar o valor pelo parser de expressões
+        index = SegmentIndex.from_labels(df[segment_by].tolist())
+        for segment_name, bitmap in index.bitmaps.items():
+            if segment_name == 'todos':
+                continue
+            segments[segment_name] = df.iloc[list(bitmap_positions(bitmap))]
+        
+        for segment_name, expression in (combine or {}).items():
+            segments[segment_name] = df.iloc[list(index.members(expression))]
         
         return segments
     
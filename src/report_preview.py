@@ -0,0 +1,99 @@
+"""
+Visualização paginada dos relatórios salvos
+O relatório é lido uma vez e fica em cache enquanto o arquivo não mudar
+(chave = caminho + mtime); cada página é só um recorte do DataFrame em cache.
+A contagem de linhas vem dos metadados gravados junto com o relatório
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.utils import read_report_metadata
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def read_report(path: Path) -> 'pd.DataFrame':
+    """Lê o relatório completo (CSV ou Excel); pandas só é carregado aqui"""
+    import pandas as pd
+    if path.suffix == '.csv':
+        return pd.read_csv(path, encoding='utf-8')
+    if path.suffix in ('.xlsx', '.xls'):
+        return pd.read_excel(path)
+    raise ValueError('Tipo de arquivo não suportado')
+
+
+class ReportPreviewCache:
+    """Cache LRU de relatórios lidos, invalidado pela data de modificação do arquivo"""
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_frame(self, path: Path) -> 'pd.DataFrame':
+        """DataFrame do relatório (relido só se o arquivo mudou)"""
+        key = (str(path.resolve()), path.stat().st_mtime_ns)
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None:
+                self._frames.move_to_end(key)
+                return df
+
+        df = read_report(path)
+
+        with self._lock:
+            # Versões antigas do mesmo arquivo não servem mais
+            for old_key in [k for k in self._frames if k[0] == key[0]]:
+                del self._frames[old_key]
+            self._frames[key] = df
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+        return df
+
+    def page(self, path: Path, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+             columns: Optional[List[str]] = None) -> Tuple['pd.DataFrame', Dict[str, Any]]:
+        """Recorte [offset, offset + limit) com as colunas pedidas, mais as informações do arquivo"""
+        offset = max(0, int(offset))
+        limit = min(max(1, int(limit)), MAX_PAGE_SIZE)
+
+        df = self.get_frame(path)
+        all_columns = [str(c) for c in df.columns]
+
+        # Linhas/colunas gravadas junto com o relatório (válidas se o arquivo não mudou)
+        meta = read_report_metadata(path.parent).get(path.name)
+        if meta and meta.get('mtime_ns') == path.stat().st_mtime_ns:
+            total_rows = meta['rows']
+        else:
+            total_rows = len(df)
+
+        selected = [c for c in (columns or []) if c in all_columns] or all_columns
+        page = df.iloc[offset:offset + limit]
+        if selected != all_columns:
+            page = page[selected]
+
+        info = {
+            'total_rows': total_rows,
+            'total_columns': len(all_columns),
+            'columns': all_columns,
+            'selected_columns': selected,
+            'offset': offset,
+            'limit': limit,
+            'preview_rows': len(page),
+            'has_more': offset + len(page) < total_rows
+        }
+        return page, info
+
+
+def report_info(path: Path) -> Optional[Dict[str, Any]]:
+    """Linhas e colunas do relatório pelos metadados (sem abrir o arquivo)"""
+    meta = read_report_metadata(path.parent).get(path.name)
+    if meta and path.exists() and meta.get('mtime_ns') == path.stat().st_mtime_ns:
+        return meta
+    return None
@@ -0,0 +1,216 @@
+"""
+Cubo de pré-agregação de vendas da ZapChicken
+Agrega os pedidos por dia × hora × origem × bairro para que perguntas por
+período (mês, dia da semana, hora de pico, sazonalidade) sejam respondidas
+somando células do cubo em vez de varrer todos os pedidos.
+
+Os clientes únicos usam HyperLogLog esparso: cada célula guarda só os pares
+(registrador, rank) que recebeu, então o cubo nunca passa de um par por pedido
+(em vez de 256 registradores por célula)
+"""
+
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+# HyperLogLog com 2^8 registradores por célula (~6,5% de erro padrão)
+HLL_PRECISION = 8
+HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+DIMENSOES_BASE = ['Data', 'Hora', 'Origem', 'Bairro']
+METRICAS = ['total', 'pedidos']
+
+# Nomes equivalentes das métricas nas análises feitas sobre os pedidos
+COLUNAS_CUBO = {'total': 'Total', 'clientes': 'Cliente', 'pedidos': 'Código'}
+
+
+def _hll_posicoes(valores: pd.Series):
+    """Calcula registrador e rank do HyperLogLog para cada valor"""
+    hashes = pd.util.hash_pandas_object(valores.astype(str), index=False).to_numpy(dtype=np.uint64)
+    indices = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    restante = hashes & np.uint64((1 << (64 - HLL_PRECISION)) - 1)
+    # frexp devolve o expoente = número de bits significativos (0 para zero)
+    _, bits = np.frexp(restante.astype(np.float64))
+    ranks = ((64 - HLL_PRECISION) - bits + 1).astype(np.uint8)
+    return indices, ranks
+
+
+def _hll_vazio():
+    """Registradores esparsos: (célula, registrador, rank), um par por (célula, registrador)"""
+    return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+
+
+def _hll_unir(celulas: np.ndarray, indices: np.ndarray, ranks: np.ndarray):
+    """Mantém só o maior rank de cada (célula, registrador)"""
+    if len(celulas) == 0:
+        return _hll_vazio()
+    chaves = celulas * HLL_REGISTERS + indices
+    ordem = np.lexsort((ranks, chaves))
+    chaves = chaves[ordem]
+    ultimos = np.flatnonzero(np.r_[chaves[1:] != chaves[:-1], True])
+    return celulas[ordem][ultimos], indices[ordem][ultimos], ranks[ordem][ultimos]
+
+
+def _hll_estimativa(registros, n_grupos: int) -> np.ndarray:
+    """Estima a cardinalidade de cada grupo a partir dos registradores esparsos"""
+    grupos, _, ranks = registros
+    # Registradores ausentes valem 0 (contribuem 2^0 = 1 na soma harmônica)
+    preenchidos = np.bincount(grupos, minlength=n_grupos)
+    zeros = HLL_REGISTERS - preenchidos
+    soma = zeros + np.bincount(grupos, weights=np.power(2.0, -ranks.astype(np.float64)), minlength=n_grupos)
+    estimativa = _HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / soma
+
+    # Correção para cardinalidades pequenas (linear counting)
+    pequenas = (estimativa <= 2.5 * HLL_REGISTERS) & (zeros > 0)
+    estimativa[pequenas] = HLL_REGISTERS * np.log(HLL_REGISTERS / zeros[pequenas])
+
+    return np.rint(estimativa).astype(np.int64)
+
+
+def _agrupar(celulas: pd.DataFrame, registros, por: List[str]):
+    """Soma métricas e une os registradores HLL (esparsos) das células de cada grupo"""
+    if por:
+        agrupado = celulas.groupby(por, sort=True, dropna=False)
+        grupos = agrupado.ngroup().to_numpy()
+        resultado = agrupado[METRICAS].sum().reset_index()
+    else:
+        grupos = np.zeros(len(celulas), dtype=np.int64)
+        resultado = pd.DataFrame({m: [celulas[m].sum()] for m in METRICAS})
+
+    linhas, indices, ranks = registros
+    return resultado, _hll_unir(grupos[linhas], indices, ranks)
+
+
+class SalesCube:
+    """Cubo de vendas por dia × hora × origem × bairro com métricas aditivas"""
+
+    def __init__(self):
+        self.celulas = pd.DataFrame(columns=DIMENSOES_BASE + METRICAS)
+        self.registros = _hll_vazio()
+        self._dimensoes_derivadas = {}
+
+    @classmethod
+    def from_pedidos(cls, pedidos_df: pd.DataFrame) -> 'SalesCube':
+        """Constrói o cubo a partir dos pedidos com colunas derivadas do processador"""
+        cubo = cls()
+        cubo.add_pedidos(pedidos_df)
+        return cubo
+
+    def add_pedidos(self, pedidos_df: pd.DataFrame):
+        """
+        Acrescenta pedidos às células atuais (as métricas são aditivas).
+
+        O processador reconstrói o cubo a cada carga de dados via from_pedidos;
+        este método é o passo de agregação usado por ele.
+        """
+        celulas, registros = self._construir_celulas(pedidos_df)
+        if celulas.empty:
+            return
+
+        if not self.celulas.empty:
+            # As células novas vêm depois das atuais: desloca os índices dos registradores delas
+            deslocamento = len(self.celulas)
+            registros = tuple(np.concatenate([atual, novo]) for atual, novo in zip(
+                self.registros, (registros[0] + deslocamento, registros[1], registros[2])))
+            celulas = pd.concat([self.celulas, celulas], ignore_index=True)
+            celulas, registros = _agrupar(celulas, registros, DIMENSOES_BASE)
+
+        self.celulas = celulas
+        self.registros = registros
+        self._dimensoes_derivadas = {}
+
+    def _construir_celulas(self, pedidos_df: pd.DataFrame):
+        """Agrega pedidos em células (uma por combinação de dimensões)"""
+        if pedidos_df is None or pedidos_df.empty or 'Data' not in pedidos_df.columns:
+            return pd.DataFrame(columns=DIMENSOES_BASE + METRICAS), _hll_vazio()
+
+        validos = pedidos_df[pedidos_df['Data'].notna()]
+
+        base = pd.DataFrame({
+            'Data': validos['Data'],
+            'Hora': validos['Hora'].astype(int),
+            'Origem': validos['Origem'].fillna('').astype(str) if 'Origem' in validos.columns else '',
+            'Bairro': validos['Bairro'].fillna('').astype(str) if 'Bairro' in validos.columns else '',
+            'total': validos['Total'].fillna(0.0) if 'Total' in validos.columns else 0.0,
+            'pedidos': 1
+        })
+
+        # Um par (registrador, rank) por pedido, unido depois por célula (sem matriz densa por pedido)
+        registros = _hll_vazio()
+        cliente_col = next((c for c in ['Cliente', 'Telefone'] if c in validos.columns), None)
+        if cliente_col is not None and len(base):
+            indices, ranks = _hll_posicoes(validos[cliente_col].fillna(''))
+            registros = (np.arange(len(base), dtype=np.int64), indices, ranks)
+
+        return _agrupar(base, registros, DIMENSOES_BASE)
+
+    def _dimensao(self, nome: str) -> pd.Series:
+        """Retorna uma dimensão (base ou derivada da data) alinhada às células"""
+        if nome in DIMENSOES_BASE:
+            return self.celulas[nome]
+
+        if nome not in self._dimensoes_derivadas:
+            datas = pd.to_datetime(self.celulas['Data'])
+            derivadas = {
+                'Ano': lambda: datas.dt.year,
+                'Mes': lambda: datas.dt.month,
+                'Mes_Nome': lambda: datas.dt.strftime('%B'),
+                'Periodo': lambda: datas.dt.to_period('M'),
+                'Dia Semana': lambda: datas.dt.day_name(),
+                'dia_semana': lambda: datas.dt.dayofweek,
+            }
+            if nome not in derivadas:
+                raise KeyError(f"Dimensão desconhecida no cubo: {nome}")
+            self._dimensoes_derivadas[nome] = derivadas[nome]()
+
+        return self._dimensoes_derivadas[nome]
+
+    def rollup(self, por: List[str], filtros: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Consolida o cubo pelas dimensões informadas.
+
+        Dimensões: Data, Hora, Origem, Bairro, Ano, Mes, Mes_Nome, Periodo,
+        Dia Semana e dia_semana. Os filtros aceitam um valor ou uma lista.
+        Retorna as colunas das dimensões + total, pedidos, clientes e ticket_medio.
+        """
+        mascara = np.ones(len(self.celulas), dtype=bool)
+        for nome, valor in (filtros or {}).items():
+            valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+            mascara &= self._dimensao(nome).isin(valores).to_numpy()
+
+        chaves = pd.DataFrame({nome: self._dimensao(nome).to_numpy()[mascara] for nome in por})
+        for metrica in METRICAS:
+            chaves[metrica] = self.celulas[metrica].to_numpy()[mascara]
+
+        # Registradores das células filtradas, renumeradas na ordem de `chaves`
+        linhas, indices, ranks = self.registros
+        selecionados = mascara[linhas]
+        nova_posicao = np.cumsum(mascara) - 1
+        registros = (nova_posicao[linhas[selecionados]], indices[selecionados], ranks[selecionados])
+
+        resultado, registros = _agrupar(chaves, registros, por)
+        resultado['clientes'] = _hll_estimativa(registros, len(resultado))
+        resultado['ticket_medio'] = np.where(
+            resultado['pedidos'] > 0,
+            resultado['total'] / resultado['pedidos'].clip(lower=1),
+            0.0
+        )
+        return resultado
+
+    def resumo(self, filtros: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Totais (valor, pedidos, clientes únicos estimados) para um recorte"""
+        linha = self.rollup([], filtros).iloc[0]
+        return {
+            'total': float(linha['total']),
+            'pedidos': int(linha['pedidos']),
+            'clientes': int(linha['clientes']),
+            'ticket_medio': float(linha['ticket_medio'])
+        }
+
+    def top(self, dimensao: str, filtros: Optional[Dict[str, Any]] = None,
+            n: int = 5, metrica: str = 'pedidos') -> pd.Series:
+        """Maiores valores de uma métrica por dimensão (equivalente a value_counts)"""
+        consolidado = self.rollup([dimensao], filtros)
+        consolidado = consolidado[consolidado[dimensao] != '']
+        return consolidado.set_index(dimensao)[metrica].nlargest(n)
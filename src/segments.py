@@ -0,0 +1,245 @@
+"""
+Segmentação de clientes com bitmaps
+Cada segmento é um bitmap (int do Python, bit i = cliente i) calculado uma vez
+por versão dos dados. Combinações com E/OU/NÃO viram operações bit a bit entre
+inteiros; contagem, soma de valores e exportação dos membros percorrem só os
+bytes do resultado
+"""
+
+import re
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+# Posições dos bits ligados em cada byte (little-endian: bit 0 = primeiro cliente do byte)
+_BYTE_BITS = [tuple(b for b in range(8) if value >> b & 1) for value in range(256)]
+
+# Segmentos de recência sem número de dias usam este padrão
+DEFAULT_INACTIVE_DAYS = 30
+
+# VIP = clientes entre os 10% que mais gastaram
+VIP_SHARE = 0.10
+
+# Nomes com espaços ou com ( ) & | ! vão entre aspas: "bairro:centro (norte)" & vip
+_TOKEN = re.compile(r'\s*("[^"]*"|\'[^\']*\'|\(|\)|&|\||!|[^\s()&|!]+)')
+_OPERATORS = {'and': '&', 'e': '&', 'or': '|', 'ou': '|', 'not': '!', 'nao': '!', 'não': '!'}
+
+Expression = Union[str, Dict[str, Any], List[Any]]
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """Monta o bitmap a partir das posições (custo linear, sem recriar o inteiro a cada bit)"""
+    buffer = bytearray((size + 7) // 8)
+    for i in positions:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bitmap_count(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+
+def bitmap_positions(bitmap: int) -> Iterator[int]:
+    """Posições dos bits ligados em ordem crescente"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for offset, byte in enumerate(data):
+        if byte:
+            base = offset << 3
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+def segment_key(value: Any) -> str:
+    """Nome do segmento para um valor (minúsculo, espaços viram '_')"""
+    return str(value).strip().lower().replace(' ', '_')
+
+
+class SegmentIndex:
+    """Bitmaps nomeados sobre posições 0..size-1 e avaliação de expressões"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.all = (1 << size) - 1
+        self.bitmaps = {'todos': self.all}
+
+    @classmethod
+    def from_labels(cls, labels: Sequence[Any], prefix: str = '') -> 'SegmentIndex':
+        """Um segmento por valor distinto (valores vazios/nulos ficam de fora)"""
+        index = cls(len(labels))
+        index.add_labels(labels, prefix)
+        return index
+
+    def add(self, name: str, bitmap: int):
+        self.bitmaps[name] = bitmap & self.all
+
+    def add_labels(self, labels: Sequence[Any], prefix: str = ''):
+        positions = defaultdict(list)
+        for i, label in enumerate(labels):
+            if label is None or label != label or str(label).strip() == '':
+                continue
+            positions[label].append(i)
+        for label, members in positions.items():
+            self.add(f"{prefix}{segment_key(label)}", bitmap_from_positions(members, self.size))
+
+    def resolve(self, name: str) -> int:
+        """Bitmap de um segmento pelo nome (subclasses calculam segmentos dinâmicos)"""
+        key = segment_key(name)
+        if key not in self.bitmaps:
+            raise KeyError(f"Segmento desconhecido: {name}")
+        return self.bitmaps[key]
+
+    def evaluate(self, expression: Expression) -> int:
+        """Avalia 'vip & !inativos:60', {'and': [...]}, {'or': [...]}, {'not': ...} ou um nome"""
+        if isinstance(expression, dict):
+            if len(expression) != 1:
+                raise ValueError("Use uma única operação por nível: and, or ou not")
+            op, args = next(iter(expression.items()))
+            op = _OPERATORS.get(op.lower(), op)
+            if op == '!':
+                return self.all & ~self.evaluate(args)
+            bitmaps = [self.evaluate(arg) for arg in (args if isinstance(args, list) else [args])]
+            if op == '&':
+                result = self.all
+                for bitmap in bitmaps:
+                    result &= bitmap
+                return result
+            if op == '|':
+                result = 0
+                for bitmap in bitmaps:
+                    result |= bitmap
+                return result
+            raise ValueError(f"Operação desconhecida: {op}")
+        if isinstance(expression, list):
+            return self.evaluate({'or': expression})
+        # Nome exato de um segmento dispensa o parser (valores como 'Rock & Roll')
+        if segment_key(expression) in self.bitmaps:
+            return self.bitmaps[segment_key(expression)]
+        return self._parse(str(expression))
+
+    def _parse(self, text: str) -> int:
+        """Expressão em texto: ! (não) > & (e) > | (ou), com parênteses"""
+        tokens = [_OPERATORS.get(t.lower(), t) for t in _TOKEN.findall(text)]
+        if not tokens:
+            raise ValueError("Expressão de segmento vazia")
+        position = 0
+
+        def peek():
+            return tokens[position] if position < len(tokens) else None
+
+        def take():
+            nonlocal position
+            token = tokens[position]
+            position += 1
+            return token
+
+        def parse_or():
+            result = parse_and()
+            while peek() == '|':
+                take()
+                result |= parse_and()
+            return result
+
+        def parse_and():
+            result = parse_not()
+            while peek() == '&':
+                take()
+                result &= parse_not()
+            return result
+
+        def parse_not():
+            if peek() == '!':
+                take()
+                return self.all & ~parse_not()
+            if peek() == '(':
+                take()
+                result = parse_or()
+                if peek() != ')':
+                    raise ValueError("Parêntese não fechado na expressão de segmento")
+                take()
+                return result
+            if peek() is None or peek() in ('&', '|', ')'):
+                raise ValueError("Expressão de segmento incompleta")
+            name = take()
+            if len(name) >= 2 and name[0] == name[-1] and name[0] in '"\'':
+                name = name[1:-1]
+            return self.resolve(name)
+
+        result = parse_or()
+        if peek() is not None:
+            raise ValueError(f"Trecho inesperado na expressão de segmento: {peek()}")
+        return result
+
+    def count(self, expression: Expression) -> int:
+        return bitmap_count(self.evaluate(expression))
+
+    def members(self, expression: Expression) -> Iterator[int]:
+        return bitmap_positions(self.evaluate(expression))
+
+    def names(self) -> List[str]:
+        return sorted(self.bitmaps)
+
+
+class CustomerSegments(SegmentIndex):
+    """Segmentos sobre a tabela de clientes (ordem por recência do CustomerIndex)
+
+    Fixos: todos, vip, bairro:<nome>, origem:<nome>.
+    Dinâmicos (calculados pela data de hoje): ativos[:dias] e inativos[:dias]
+    """
+
+    def __init__(self, customers, vip_share: float = VIP_SHARE):
+        super().__init__(len(customers))
+        self.customers = customers
+
+        # VIP pelo valor total gasto (limite do percentil)
+        if len(customers):
+            ranked = sorted(customers.totals, reverse=True)
+            threshold = ranked[max(0, int(len(ranked) * vip_share) - 1)]
+            self.vip_threshold = threshold
+            self.add('vip', bitmap_from_positions(
+                (i for i, total in enumerate(customers.totals) if total >= threshold), self.size))
+        else:
+            self.vip_threshold = 0.0
+            self.add('vip', 0)
+
+        for attr, labels in customers.attributes.items():
+            self.add_labels(labels, f"{attr}:")
+
+    def inactive(self, dias: int = DEFAULT_INACTIVE_DAYS, today: Optional[date] = None) -> int:
+        """Sem pedido há pelo menos `dias`: prefixo da ordem por recência"""
+        end = self.customers._recency_end(dias, today)
+        return (1 << end) - 1
+
+    def resolve(self, name: str) -> int:
+        key = segment_key(name)
+        kind, _, days = key.partition(':')
+        if kind in ('inativos', 'ativos') and (not days or days.isdigit()):
+            inactive = self.inactive(int(days) if days else DEFAULT_INACTIVE_DAYS)
+            return inactive if kind == 'inativos' else self.all & ~inactive
+        return super().resolve(key)
+
+    def names(self) -> List[str]:
+        return sorted(set(self.bitmaps) | {'ativos', 'inativos'})
+
+    def summary(self, expression: Expression) -> Dict[str, Any]:
+        """Clientes, valor total, ticket médio e última compra do segmento"""
+        bitmap = self.evaluate(expression)
+        customers = self.customers
+        count, value, orders = 0, 0.0, 0
+        for i in bitmap_positions(bitmap):
+            count += 1
+            value += customers.totals[i]
+            orders += customers.orders[i]
+
+        # Ordem por recência: o bit mais alto é o cliente com a compra mais recente
+        last = date.fromordinal(customers.last_order[bitmap.bit_length() - 1]) if bitmap else None
+        return {
+            'total_clients': count,
+            'total_value': value,
+            'total_orders': orders,
+            'average_ticket': value / orders if orders else 0.0,
+            'last_purchase': last.strftime('%d/%m/%Y') if last else None
+        }
+
+    def export_csv(self, expression: Expression, today: Optional[date] = None) -> Iterator[str]:
+        """CSV dos membros do segmento (mesmo formato da exportação de filtros)"""
+        return self.customers.write_csv(self.members(expression), today)
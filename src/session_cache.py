@@ -0,0 +1,185 @@
+"""
+Cache de processadores por sessão (vários restaurantes na mesma instância)
+Cada sessão guarda seu processador e sua IA; as entradas expiram por TTL e
+são removidas em ordem LRU quando a memória estimada (DataFrames com
+memory_usage(deep=True), arrays numpy, cubo de vendas e previsões em cache)
+passa do orçamento configurado. Quando uma sessão expira, on_expire recebe o
+id para apagar os arquivos dela
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Orçamento padrão de memória para todos os processadores em cache
+DEFAULT_MAX_BYTES = int(os.environ.get('SESSION_CACHE_MB', 512)) * 1024 * 1024
+DEFAULT_TTL = int(os.environ.get('SESSION_TTL_SECONDS', 1800))
+
+
+def object_memory_bytes(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Memória estimada de um valor em cache: DataFrame/Series pelo memory_usage(deep=True),
+    arrays pelo nbytes e, recursivamente, dicionários, listas e objetos
+    (SalesCube com as células e os registradores HLL, dicionários de previsão)
+    """
+    if value is None:
+        return 0
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if hasattr(value, 'memory_usage'):
+        try:
+            usage = value.memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except Exception:
+            return 0
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(object_memory_bytes(v, _seen) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(object_memory_bytes(v, _seen) for v in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return sys.getsizeof(value) + object_memory_bytes(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+def processor_memory_bytes(processor) -> int:
+    """Memória de um processador: DataFrames carregados e tudo o que está em _features_cache"""
+    if processor is None:
+        return 0
+    seen = set()
+    return (object_memory_bytes(getattr(processor, 'dataframes', {}), seen)
+            + object_memory_bytes(getattr(processor, '_features_cache', {}), seen))
+
+
+class SessionEntry:
+    """Dados de uma sessão: processador, IA configurada e contabilidade de memória"""
+
+    def __init__(self, session_id: str, processor=None):
+        self.session_id = session_id
+        self.processor = processor
+        self.ai_gemini = None
+        self.data_loaded = False
+        self.size_bytes = 0
+        self.created = time.time()
+        self.last_access = self.created
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'session': self.session_id[:8],
+            'data_loaded': self.data_loaded,
+            'memoria_mb': round(self.size_bytes / (1024 * 1024), 2),
+            'ociosa_segundos': round(time.time() - self.last_access, 1),
+            'gemini': self.ai_gemini is not None
+        }
+
+
+class SessionCache:
+    """
+    Cache LRU de sessões com TTL por entrada e orçamento de memória.
+
+    Sessões removidas só pelo orçamento continuam lembradas (id → último acesso)
+    até o TTL vencer, para on_expire também apagar os arquivos delas
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: int = DEFAULT_TTL,
+                 on_expire: Optional[Callable[[str], None]] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self._entries = OrderedDict()
+        self._idle = {}
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def _expire(self, session_id: str):
+        self._idle.pop(session_id, None)
+        if self.on_expire is not None:
+            try:
+                self.on_expire(session_id)
+            except Exception:
+                pass
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        """Entrada da sessão (None se não existir ou tiver expirado); marca como usada"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if time.time() - entry.last_access > self.ttl:
+                del self._entries[session_id]
+                self.evictions += 1
+                self._expire(session_id)
+                return None
+            entry.last_access = time.time()
+            self._entries.move_to_end(session_id)
+            return entry
+
+    def get_or_create(self, session_id: str, factory: Callable[[], Any]) -> SessionEntry:
+        """Entrada da sessão, criando o processador com factory() se necessário"""
+        with self._lock:
+            entry = self.get(session_id)
+            if entry is None:
+                self._idle.pop(session_id, None)
+                entry = SessionEntry(session_id, factory())
+                self._entries[session_id] = entry
+                self._evict(keep=session_id)
+            return entry
+
+    def update_size(self, session_id: str) -> int:
+        """Recalcula a memória da sessão (após carregar dados) e aplica o orçamento"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return 0
+            entry.size_bytes = processor_memory_bytes(entry.processor)
+            self._evict(keep=session_id)
+            return entry.size_bytes
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def _evict(self, keep: Optional[str] = None):
+        """Remove expiradas e, se passar do orçamento, as menos usadas (nunca a sessão atual)"""
+        now = time.time()
+        for session_id in [s for s, e in self._entries.items() if now - e.last_access > self.ttl and s != keep]:
+            del self._entries[session_id]
+            self.evictions += 1
+            self._expire(session_id)
+        for session_id in [s for s, last in self._idle.items() if now - last > self.ttl]:
+            self._expire(session_id)
+
+        while self.total_bytes > self.max_bytes:
+            victim = next((s for s in self._entries if s != keep), None)
+            if victim is None:
+                break
+            # Só libera a memória; os arquivos ficam até o TTL da sessão vencer
+            self._idle[victim] = self._entries.pop(victim).last_access
+            self.evictions += 1
+
+    def cleanup(self):
+        """Remove sessões expiradas"""
+        with self._lock:
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessoes': len(self._entries),
+                'memoria_mb': round(self.total_bytes / (1024 * 1024), 2),
+                'limite_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'ttl_segundos': self.ttl,
+                'remocoes': self.evictions,
+                'entradas': [e.to_dict() for e in self._entries.values()]
+            }
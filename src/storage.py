@@ -0,0 +1,420 @@
+"""
+Armazenamento persistente de uploads e relatórios
+Os arquivos enviados ficam em disco endereçados pelo SHA-256 do conteúdo (um
+blob por conteúdo, mesmo que o arquivo seja enviado várias vezes) e os
+metadados (nome, tamanho, análise, relatórios) ficam em um índice SQLite.
+Vários workers do gunicorn compartilham o mesmo diretório e o estado
+sobrevive a reinícios: gravar, apagar e despejar blobs acontece sob uma trava
+de arquivo (fcntl), então um worker nunca apaga um blob que outro acabou de
+registrar. O índice é escolhido por ZAPCAMPANHAS_STORAGE
+('sqlite' ou 'memory'); os arquivos mais antigos são removidos quando o
+espaço ocupado passa de ZAPCAMPANHAS_STORAGE_MB
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: só a trava entre threads
+    fcntl = None
+
+STORAGE_BACKEND = os.environ.get('ZAPCAMPANHAS_STORAGE', 'sqlite')
+STORAGE_DIR = Path(os.environ.get('ZAPCAMPANHAS_STORAGE_DIR', Path(tempfile.gettempdir()) / 'zapcampanhas_storage'))
+DEFAULT_MAX_BYTES = int(os.environ.get('ZAPCAMPANHAS_STORAGE_MB', 500)) * 1024 * 1024
+DEFAULT_MAX_REPORTS = int(os.environ.get('ZAPCAMPANHAS_MAX_REPORTS', 100))
+
+
+class BlobStore:
+    """Blobs em disco nomeados pelo hash do conteúdo (gravação atômica)"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, sha256: str, ext: str = '') -> Path:
+        return self.root / sha256[:2] / f"{sha256}{ext}"
+
+    def exists(self, sha256: str, ext: str = '') -> bool:
+        return self.path(sha256, ext).exists()
+
+    def put(self, source: Union[str, Path], sha256: str, ext: str = '') -> Path:
+        """Move o arquivo para o blob (se o conteúdo já existir, só descarta a origem)"""
+        destination = self.path(sha256, ext)
+        if destination.exists():
+            os.unlink(source)
+            return destination
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=destination.parent, suffix='.part')
+        os.close(fd)
+        try:
+            shutil.move(str(source), tmp_path)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return destination
+
+    def delete(self, sha256: str, ext: str = ''):
+        try:
+            self.path(sha256, ext).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class MemoryIndex:
+    """Índice de metadados em memória (um processo só; útil em testes e serverless)"""
+
+    def __init__(self):
+        self._files = {}
+        self._reports = {}
+        self._lock = threading.RLock()
+
+    def put_file(self, record: Dict[str, Any]):
+        with self._lock:
+            self._files[record['id']] = dict(record, last_access=time.time())
+
+    def get_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._files.get(file_id)
+            return dict(record) if record else None
+
+    def touch_file(self, file_id: str):
+        with self._lock:
+            if file_id in self._files:
+                self._files[file_id]['last_access'] = time.time()
+
+    def delete_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._files.pop(file_id, None)
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted((dict(r) for r in self._files.values()), key=lambda r: r['uploaded'])
+
+    def files_by_hash(self, sha256: str) -> List[Dict[str, Any]]:
+        return [r for r in self.list_files() if r['sha256'] == sha256]
+
+    def put_report(self, report_id: str, generated: str, data: Dict[str, Any]):
+        with self._lock:
+            self._reports[report_id] = {'id': report_id, 'generated': generated, 'data': data}
+
+    def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            report = self._reports.get(report_id)
+            return report['data'] if report else None
+
+    def delete_report(self, report_id: str):
+        with self._lock:
+            self._reports.pop(report_id, None)
+
+    def list_reports(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            reports = sorted(self._reports.values(), key=lambda r: r['generated'])
+            return [(r['id'], r['data']) for r in reports]
+
+
+class SQLiteIndex:
+    """Índice de metadados em SQLite (compartilhado entre processos, modo WAL)"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS files (
+                id TEXT PRIMARY KEY, name TEXT, size INTEGER, sha256 TEXT, ext TEXT,
+                uploaded TEXT, last_access REAL, analysis TEXT)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)')
+            conn.execute('CREATE INDEX IF NOT EXISTS files_last_access ON files (last_access)')
+            conn.execute('''CREATE TABLE IF NOT EXISTS reports (
+                id TEXT PRIMARY KEY, generated TEXT, data TEXT)''')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _file_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record['analysis'] = json.loads(record['analysis'] or '{}')
+        return record
+
+    def put_file(self, record: Dict[str, Any]):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (record['id'], record['name'], record['size'], record['sha256'], record.get('ext', ''),
+                          record['uploaded'], time.time(), json.dumps(record.get('analysis', {}), default=str)))
+
+    def get_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM files WHERE id = ?', (file_id,)).fetchone()
+        return self._file_record(row) if row else None
+
+    def touch_file(self, file_id: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('UPDATE files SET last_access = ? WHERE id = ?', (time.time(), file_id))
+
+    def delete_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute('SELECT * FROM files WHERE id = ?', (file_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        return self._file_record(row)
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT * FROM files ORDER BY uploaded, id').fetchall()
+        return [self._file_record(row) for row in rows]
+
+    def files_by_hash(self, sha256: str) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT * FROM files WHERE sha256 = ? ORDER BY uploaded', (sha256,)).fetchall()
+        return [self._file_record(row) for row in rows]
+
+    def put_report(self, report_id: str, generated: str, data: Dict[str, Any]):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO reports VALUES (?, ?, ?)',
+                         (report_id, generated, json.dumps(data, default=str)))
+
+    def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT data FROM reports WHERE id = ?', (report_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def delete_report(self, report_id: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM reports WHERE id = ?', (report_id,))
+
+    def list_reports(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT id, data FROM reports ORDER BY generated, id').fetchall()
+        return [(row['id'], json.loads(row['data'])) for row in rows]
+
+
+class FileCollection:
+    """Visão dos arquivos no formato do antigo dicionário file_storage"""
+
+    def __init__(self, storage: 'Storage'):
+        self._storage = storage
+
+    def __len__(self) -> int:
+        return len(self._storage.index.list_files())
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, file_id: str) -> bool:
+        return self._storage.index.get_file(file_id) is not None
+
+    def __getitem__(self, file_id: str) -> Dict[str, Any]:
+        record = self._storage.index.get_file(file_id)
+        if record is None:
+            raise KeyError(file_id)
+        return record
+
+    def __delitem__(self, file_id: str):
+        if not self._storage.delete_file(file_id):
+            raise KeyError(file_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, file_id: str, default=None):
+        return self._storage.index.get_file(file_id) or default
+
+    def keys(self) -> List[str]:
+        return [r['id'] for r in self._storage.index.list_files()]
+
+    def values(self) -> List[Dict[str, Any]]:
+        return self._storage.index.list_files()
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(r['id'], r) for r in self._storage.index.list_files()]
+
+    def clear(self):
+        for file_id in self.keys():
+            self._storage.delete_file(file_id)
+
+
+class ReportCollection:
+    """Visão dos relatórios no formato do antigo dicionário reports_storage"""
+
+    def __init__(self, storage: 'Storage'):
+        self._storage = storage
+
+    def __len__(self) -> int:
+        return len(self._storage.index.list_reports())
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, report_id: str) -> bool:
+        return self._storage.index.get_report(report_id) is not None
+
+    def __getitem__(self, report_id: str) -> Dict[str, Any]:
+        report = self._storage.index.get_report(report_id)
+        if report is None:
+            raise KeyError(report_id)
+        return report
+
+    def __setitem__(self, report_id: str, data: Dict[str, Any]):
+        self._storage.add_report(report_id, data)
+
+    def __delitem__(self, report_id: str):
+        self._storage.index.delete_report(report_id)
+
+    def get(self, report_id: str, default=None):
+        report = self._storage.index.get_report(report_id)
+        return report if report is not None else default
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return self._storage.index.list_reports()
+
+    def values(self) -> List[Dict[str, Any]]:
+        return [data for _, data in self._storage.index.list_reports()]
+
+
+class Storage:
+    """Blobs endereçados por conteúdo + índice de metadados, com limite de espaço"""
+
+    def __init__(self, blobs: BlobStore, index, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_reports: int = DEFAULT_MAX_REPORTS, lock_path: Optional[Union[str, Path]] = None):
+        self.blobs = blobs
+        self.index = index
+        self.max_bytes = max_bytes
+        self.max_reports = max_reports
+        self.files = FileCollection(self)
+        self.reports = ReportCollection(self)
+        self._lock = threading.RLock()
+        self._lock_path = Path(lock_path) if lock_path else None
+        self._lock_depth = 0
+
+    @contextmanager
+    def _exclusive(self):
+        """Trava entre threads e, com lock_path, entre processos (reentrante no mesmo processo)"""
+        with self._lock:
+            if self._lock_depth or self._lock_path is None or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add_file(self, upload, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Guarda o upload do spool como blob e registra os metadados (id, name, uploaded, analysis)"""
+        with self._exclusive():
+            record = dict(record, size=upload.size, sha256=upload.sha256, ext=upload.extension)
+            previous = self.index.get_file(record['id'])
+            self.blobs.put(upload.path, upload.sha256, upload.extension)
+            self.index.put_file(record)
+            if previous is not None:
+                self._release_blob(previous)
+            self._evict(keep=record['id'])
+            return record
+
+    def blob_path(self, record: Dict[str, Any]) -> Path:
+        """Caminho do conteúdo do arquivo no disco"""
+        return self.blobs.path(record['sha256'], record.get('ext', ''))
+
+    def read_bytes(self, record: Dict[str, Any]) -> bytes:
+        return self.blob_path(record).read_bytes()
+
+    def touch(self, file_id: str):
+        """Marca o arquivo como usado (o despejo remove os menos usados primeiro)"""
+        self.index.touch_file(file_id)
+
+    def find_by_hash(self, sha256: str, ext: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Arquivo já armazenado com o mesmo conteúdo (e a mesma extensão, se informada)"""
+        for record in self.index.files_by_hash(sha256):
+            if ext is not None and record.get('ext') != ext:
+                continue
+            if self.blob_path(record).exists():
+                return record
+        return None
+
+    def delete_file(self, file_id: str) -> bool:
+        with self._exclusive():
+            record = self.index.delete_file(file_id)
+            if record is None:
+                return False
+            self._release_blob(record)
+            return True
+
+    def _release_blob(self, record: Dict[str, Any]):
+        """Apaga o blob se nenhum outro arquivo apontar para o mesmo conteúdo (chamado sob _exclusive)"""
+        if not any(r.get('ext', '') == record.get('ext', '') for r in self.index.files_by_hash(record['sha256'])):
+            self.blobs.delete(record['sha256'], record.get('ext', ''))
+
+    def add_report(self, report_id: str, data: Dict[str, Any]):
+        with self._exclusive():
+            self.index.put_report(report_id, data.get('generated', datetime.now().isoformat()), data)
+            reports = self.index.list_reports()
+            for old_id, _ in reports[:max(0, len(reports) - self.max_reports)]:
+                self.index.delete_report(old_id)
+
+    def used_bytes(self, files: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Espaço ocupado pelos blobs (cada conteúdo conta uma vez)"""
+        files = self.index.list_files() if files is None else files
+        return sum({(r['sha256'], r.get('ext', '')): r['size'] for r in files}.values())
+
+    def _evict(self, keep: Optional[str] = None):
+        """Remove os arquivos menos usados até caber no limite (nunca o que acabou de entrar; chamado sob _exclusive)"""
+        files = self.index.list_files()
+        if self.used_bytes(files) <= self.max_bytes:
+            return
+        for record in sorted(files, key=lambda r: r['last_access']):
+            if record['id'] == keep:
+                continue
+            self.delete_file(record['id'])
+            if self.used_bytes() <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        files = self.index.list_files()
+        return {
+            'backend': type(self.index).__name__,
+            'files': len(files),
+            'reports': len(self.index.list_reports()),
+            'used_mb': round(self.used_bytes(files) / (1024 * 1024), 2),
+            'limit_mb': round(self.max_bytes / (1024 * 1024), 2)
+        }
+
+
+def get_storage(namespace: str = 'default', backend: Optional[str] = None,
+                root: Optional[Union[str, Path]] = None) -> Storage:
+    """Cria o armazenamento configurado (cada aplicação usa o próprio namespace)"""
+    backend = (backend or STORAGE_BACKEND).lower()
+    root = (Path(root) if root else STORAGE_DIR) / namespace
+    blobs = BlobStore(root / 'blobs')
+
+    if backend == 'memory':
+        index = MemoryIndex()
+    elif backend == 'sqlite':
+        index = SQLiteIndex(root / 'index.db')
+    else:
+        raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+
+    return Storage(blobs, index, lock_path=root / 'storage.lock')
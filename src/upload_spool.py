@@ -0,0 +1,144 @@
+"""
+Spool de uploads em disco
+Copia o corpo do upload em blocos para um diretório temporário, calculando o
+hash SHA-256 durante a cópia; os parsers recebem o caminho (ou um mmap) em vez
+dos bytes em memória, então o pico de memória não depende do tamanho do arquivo.
+Cada upload tem o seu próprio arquivo (o hash vai só como metadado): o
+endereçamento por conteúdo, com contagem de referências, fica no src/storage.py
+"""
+
+import base64
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+SPOOL_DIR = Path(os.environ.get('ZAPCAMPANHAS_SPOOL_DIR', Path(tempfile.gettempdir()) / 'zapcampanhas_uploads'))
+
+
+class UploadTooLarge(ValueError):
+    """Upload maior que o limite configurado"""
+
+
+class SpooledUpload:
+    """Arquivo enviado já gravado no spool (caminho exclusivo do upload, com o hash do conteúdo)"""
+
+    def __init__(self, path: Path, filename: str, size: int, sha256: str):
+        self.path = Path(path)
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+
+    @property
+    def extension(self) -> str:
+        return Path(self.filename).suffix.lower()
+
+    def open(self, mode: str = 'rb', **kwargs):
+        return open(self.path, mode, **kwargs)
+
+    @contextmanager
+    def mmap(self):
+        """Buffer somente leitura mapeado em memória (páginas carregadas sob demanda)"""
+        with open(self.path, 'rb') as f:
+            if self.size == 0:
+                yield b''
+                return
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield buffer
+            finally:
+                buffer.close()
+
+    def move_to(self, destination: Union[str, Path]) -> Path:
+        """Move o arquivo do spool para o destino final"""
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(self.path), str(destination))
+        self.path = destination
+        return destination
+
+    def delete(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def to_dict(self) -> dict:
+        return {'filename': self.filename, 'path': str(self.path), 'size': self.size, 'sha256': self.sha256}
+
+
+def _spool_dir(spool_dir: Optional[Union[str, Path]]) -> Path:
+    directory = Path(spool_dir) if spool_dir else SPOOL_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _finish(tmp_path: str, directory: Path, filename: str, size: int, digest) -> SpooledUpload:
+    """
+    Renomeia o temporário para um nome exclusivo com a extensão original.
+    Uploads simultâneos do mesmo conteúdo não compartilham o arquivo, então
+    delete()/move_to() de um nunca remove o que outro ainda está lendo
+    """
+    fd, final_path = tempfile.mkstemp(dir=directory, suffix=Path(filename).suffix.lower())
+    os.close(fd)
+    os.replace(tmp_path, final_path)
+    return SpooledUpload(Path(final_path), filename, size, digest.hexdigest())
+
+
+def spool_stream(stream: BinaryIO, filename: str = '', max_size: Optional[int] = None,
+                 spool_dir: Optional[Union[str, Path]] = None) -> SpooledUpload:
+    """Grava um stream binário no spool em blocos, com hash e limite de tamanho"""
+    directory = _spool_dir(spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(f"Arquivo muito grande. Máximo: {max_size // (1024 * 1024)}MB")
+                digest.update(chunk)
+                out.write(chunk)
+        return _finish(tmp_path, directory, filename, size, digest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def spool_data_url(content: str, filename: str = '', max_size: Optional[int] = None,
+                   spool_dir: Optional[Union[str, Path]] = None) -> SpooledUpload:
+    """Decodifica um data URL base64 (dcc.Upload) em blocos direto para o spool"""
+    _, _, encoded = content.partition(',')
+    directory = _spool_dir(spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    # Blocos múltiplos de 4 caracteres decodificam de forma independente
+    step = (CHUNK_SIZE // 3) * 4
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for start in range(0, len(encoded), step):
+                chunk = base64.b64decode(encoded[start:start + step])
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(f"Arquivo muito grande. Máximo: {max_size // (1024 * 1024)}MB")
+                digest.update(chunk)
+                out.write(chunk)
+        return _finish(tmp_path, directory, filename, size, digest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -1,17 +1,27 @@
 """
 Utilitários para o projeto ZapCampanhas
+pandas e rich são importados na primeira função que os usa: quem só precisa
+dos metadados dos relatórios (ex.: rotas leves da API) não paga esse custo
 """
 
+import os
 import re
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import tempfile
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from pathlib import Path
-import pandas as pd
-from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-console = Console()
+if TYPE_CHECKING:
+    import pandas as pd
+
+@lru_cache(maxsize=None)
+def get_console():
+    """Console do rich (criado no primeiro uso)"""
+    from rich.console import Console
+    return Console()
 
 def setup_logging(level: str = "INFO") -> logging.Logger:
     """Configura o sistema de logging"""
@@ -23,6 +33,7 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
 
 def validate_phone(phone: str) -> bool:
     """Valida se um número de telefone está no formato correto"""
+    import pandas as pd
     if not phone or pd.isna(phone):
         return False
     
@@ -34,6 +45,7 @@ def validate_phone(phone: str) -> bool:
 
 def clean_phone(phone: str) -> str:
     """Limpa e formata um número de telefone"""
+    import pandas as pd
     if not phone or pd.isna(phone):
         return ""
     
@@ -48,8 +60,9 @@ def clean_phone(phone: str) -> str:
     
     return clean_phone
 
-def display_dataframe_info(df: pd.DataFrame, title: str = "Informações do DataFrame"):
+def display_dataframe_info(df: 'pd.DataFrame', title: str = "Informações do DataFrame"):
     """Exibe informações sobre um DataFrame de forma formatada"""
+    from rich.table import Table
     table = Table(title=title)
     table.add_column("Coluna", style="cyan")
     table.add_column("Tipo", style="magenta")
@@ -64,17 +77,18 @@ def display_dataframe_info(df: pd.DataFrame, title: str = "Informações do Data
             str(df[col].nunique())
         )
     
-    console.print(table)
+    get_console().print(table)
 
 def show_progress(description: str = "Processando..."):
     """Context manager para mostrar progresso"""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
     return Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
-        console=console
+        console=get_console()
     )
 
-def save_dataframe(df: pd.DataFrame, output_path: Path, filename: str, format: str = "xlsx"):
+def save_dataframe(df: 'pd.DataFrame', output_path: Path, filename: str, format: str = "xlsx"):
     """Salva um DataFrame no formato especificado"""
     output_file = output_path / f"{filename}.{format}"
     
@@ -85,11 +99,52 @@ def save_dataframe(df: pd.DataFrame, output_path: Path, filename: str, format: s
     else:
         raise ValueError(f"Formato não suportado: {format}")
     
-    console.print(f"[green]Arquivo salvo: {output_file}")
+    write_report_metadata(output_path, output_file, df)
+    
+    get_console().print(f"[green]Arquivo salvo: {output_file}")
     return output_file
 
-def load_excel_file(file_path: Path, sheet_name: Optional[str] = None) -> pd.DataFrame:
+REPORTS_METADATA_FILE = "relatorios_meta.json"
+# Trava do read-modify-write do arquivo de metadados (salvamentos em threads paralelas)
+_metadata_lock = threading.RLock()
+
+def read_report_metadata(output_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Metadados dos relatórios salvos (linhas, colunas e mtime de cada arquivo)"""
+    meta_file = Path(output_path) / REPORTS_METADATA_FILE
+    try:
+        with open(meta_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_report_metadata(output_path: Path, output_file: Path, df: 'pd.DataFrame'):
+    """Registra linhas/colunas do relatório na hora de salvar (a visualização não precisa reler o arquivo)"""
+    entry = {
+        "rows": int(len(df)),
+        "columns": [str(c) for c in df.columns],
+        "mtime_ns": output_file.stat().st_mtime_ns
+    }
+    meta_file = Path(output_path) / REPORTS_METADATA_FILE
+    
+    # Lê, altera e grava sob a trava: salvamentos simultâneos não perdem entradas
+    with _metadata_lock:
+        metadata = read_report_metadata(output_path)
+        metadata[output_file.name] = entry
+        
+        # Grava em arquivo temporário único e renomeia (leitores nunca veem o JSON pela metade)
+        fd, tmp_name = tempfile.mkstemp(dir=meta_file.parent, prefix=meta_file.stem, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+            os.replace(tmp_name, meta_file)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+def load_excel_file(file_path: Path, sheet_name: Optional[str] = None) -> 'pd.DataFrame':
     """Carrega um arquivo Excel"""
+    import pandas as pd
+    console = get_console()
     try:
         if sheet_name:
             df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
@@ -0,0 +1,238 @@
+"""
+Leitor de planilhas .xlsx em streaming (somente biblioteca padrão)
+Percorre o XML da planilha dentro do zip com iterparse, resolvendo strings
+compartilhadas e datas, sem carregar a planilha inteira em memória.
+Usado nas APIs leves (sem pandas/openpyxl) para manter o bundle pequeno
+"""
+
+import io
+import re
+import zipfile
+import posixpath
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import iterparse
+from typing import List, Iterator, Optional, Union, BinaryIO
+
+from src.columnar import ColumnarTable
+
+# Formatos numéricos nativos do Excel que representam datas/horas
+DATE_FORMAT_IDS = set(range(14, 23)) | {27, 30, 36, 45, 46, 47, 50, 57}
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+_CELL_REF = re.compile(r'([A-Z]+)')
+_DATE_TOKENS = re.compile(r'[dmyhs]')
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.')
+
+
+class XlsxError(ValueError):
+    """Arquivo não é uma planilha .xlsx válida"""
+
+
+def _local(tag: str) -> str:
+    """Nome da tag sem o namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _column_index(ref: str) -> int:
+    """Converte a referência da célula (ex.: 'AB12') no índice da coluna (0 = A)"""
+    letters = _CELL_REF.match(ref)
+    index = 0
+    for char in letters.group(1) if letters else '':
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def _excel_date(value: str) -> str:
+    """Converte o número serial do Excel em data no formato brasileiro"""
+    seconds = round(float(value) * 86400)
+    moment = EXCEL_EPOCH + timedelta(seconds=seconds)
+    if seconds % 86400 == 0:
+        return moment.strftime('%d/%m/%Y')
+    return moment.strftime('%d/%m/%Y %H:%M:%S')
+
+
+def _format_number(value: str) -> str:
+    """Remove o '.0' de inteiros gravados como float"""
+    if value.endswith('.0'):
+        return value[:-2]
+    return value
+
+
+class XlsxReader:
+    """Leitura em streaming da primeira planilha (ou de uma planilha pelo nome)"""
+
+    def __init__(self, source: Union[bytes, BinaryIO, str]):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        try:
+            self._zip = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            raise XlsxError("Arquivo não é um .xlsx válido (formato .xls antigo não é suportado; salve como .xlsx ou CSV)")
+        self._names = set(self._zip.namelist())
+        self.shared_strings = self._load_shared_strings()
+        self.date_styles = self._load_date_styles()
+        self.sheets = self._load_sheets()
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_shared_strings(self) -> List[str]:
+        """Tabela de strings compartilhadas (cada string fica uma vez na memória)"""
+        strings = []
+        if 'xl/sharedStrings.xml' not in self._names:
+            return strings
+
+        with self._zip.open('xl/sharedStrings.xml') as stream:
+            parts = []
+            for event, elem in iterparse(stream, events=('end',)):
+                tag = _local(elem.tag)
+                if tag == 't':
+                    parts.append(elem.text or '')
+                elif tag == 'rPh':
+                    # Guia fonético: não faz parte do texto
+                    parts = parts[:-1] if parts else parts
+                elif tag == 'si':
+                    strings.append(''.join(parts))
+                    parts = []
+                    elem.clear()
+        return strings
+
+    def _load_date_styles(self) -> set:
+        """Índices de estilo (atributo s das células) cujo formato é data"""
+        if 'xl/styles.xml' not in self._names:
+            return set()
+
+        custom_formats = {}
+        date_styles = set()
+        with self._zip.open('xl/styles.xml') as stream:
+            in_cell_xfs = False
+            xf_index = 0
+            for event, elem in iterparse(stream, events=('start', 'end')):
+                tag = _local(elem.tag)
+                if event == 'start':
+                    if tag == 'cellXfs':
+                        in_cell_xfs = True
+                    continue
+
+                if tag == 'numFmt':
+                    code = _FORMAT_LITERALS.sub('', (elem.get('formatCode') or '').lower())
+                    custom_formats[int(elem.get('numFmtId', 0))] = bool(_DATE_TOKENS.search(code))
+                elif tag == 'xf' and in_cell_xfs:
+                    fmt_id = int(elem.get('numFmtId', 0))
+                    if fmt_id in DATE_FORMAT_IDS or custom_formats.get(fmt_id):
+                        date_styles.add(xf_index)
+                    xf_index += 1
+                elif tag == 'cellXfs':
+                    in_cell_xfs = False
+        return date_styles
+
+    def _load_sheets(self) -> List[tuple]:
+        """Lista (nome, caminho no zip) das planilhas na ordem do arquivo"""
+        relations = {}
+        if 'xl/_rels/workbook.xml.rels' in self._names:
+            with self._zip.open('xl/_rels/workbook.xml.rels') as stream:
+                for event, elem in iterparse(stream, events=('end',)):
+                    if _local(elem.tag) == 'Relationship':
+                        target = elem.get('Target', '')
+                        if target.startswith('/'):
+                            target = target.lstrip('/')
+                        else:
+                            target = posixpath.normpath(posixpath.join('xl', target))
+                        relations[elem.get('Id')] = target
+
+        sheets = []
+        if 'xl/workbook.xml' in self._names:
+            with self._zip.open('xl/workbook.xml') as stream:
+                for event, elem in iterparse(stream, events=('end',)):
+                    if _local(elem.tag) == 'sheet':
+                        rel_id = next((v for k, v in elem.attrib.items() if _local(k) == 'id'), None)
+                        path = relations.get(rel_id)
+                        if path in self._names:
+                            sheets.append((elem.get('name', ''), path))
+
+        if not sheets:
+            sheets = [(posixpath.basename(n), n) for n in sorted(self._names)
+                      if n.startswith('xl/worksheets/') and n.endswith('.xml')]
+        if not sheets:
+            raise XlsxError("Nenhuma planilha encontrada no arquivo .xlsx")
+        return sheets
+
+    def iter_rows(self, sheet: Optional[str] = None) -> Iterator[List[str]]:
+        """Gera as linhas da planilha como listas de textos (células vazias = '')"""
+        path = self.sheets[0][1]
+        if sheet is not None:
+            path = next((p for name, p in self.sheets if name == sheet), None)
+            if path is None:
+                raise XlsxError(f"Planilha '{sheet}' não encontrada")
+
+        shared = self.shared_strings
+        date_styles = self.date_styles
+
+        with self._zip.open(path) as stream:
+            row = []
+            sheet_data = None
+            cell_type = cell_style = value = None
+            cell_index = 0
+            for event, elem in iterparse(stream, events=('start', 'end')):
+                tag = _local(elem.tag)
+
+                if event == 'start':
+                    if tag == 'c':
+                        ref = elem.get('r')
+                        cell_index = _column_index(ref) if ref else len(row)
+                        cell_type = elem.get('t', 'n')
+                        cell_style = elem.get('s')
+                        value = None
+                    elif tag == 'sheetData':
+                        sheet_data = elem
+                    continue
+
+                if tag == 'v':
+                    value = elem.text or ''
+                elif tag == 't' and cell_type == 'inlineStr':
+                    value = (value or '') + (elem.text or '')
+                elif tag == 'c':
+                    if value is not None:
+                        if cell_type == 's':
+                            value = shared[int(value)]
+                        elif cell_type == 'b':
+                            value = 'TRUE' if value == '1' else 'FALSE'
+                        elif cell_type == 'n' and value:
+                            if cell_style is not None and int(cell_style) in date_styles:
+                                value = _excel_date(value)
+                            else:
+                                value = _format_number(value)
+
+                        if cell_index >= len(row):
+                            row.extend([''] * (cell_index - len(row) + 1))
+                        row[cell_index] = value
+                    elem.clear()
+                elif tag == 'row':
+                    if row:
+                        yield row
+                    row = []
+                    # Descarta as linhas já lidas para manter a memória constante
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                elif tag == 'sheetData':
+                    break
+
+
+def read_xlsx_table(source: Union[bytes, BinaryIO, str], source_name: str = '',
+                    sheet: Optional[str] = None, profile: bool = False) -> ColumnarTable:
+    """Lê a planilha direto para uma tabela em colunas (primeira linha = cabeçalho)"""
+    with XlsxReader(source) as reader:
+        rows = reader.iter_rows(sheet)
+        header = next(rows, None)
+        if not header:
+            return ColumnarTable([], source_name, profile)
+
+        header = [h or f"coluna{i + 1}" for i, h in enumerate(header)]
+        return ColumnarTable.from_rows(header, rows, source_name, profile)
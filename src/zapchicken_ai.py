@@ -3,16 +3,16 @@ Sistema de IA para ZapChicken
 Chat inteligente e sugestões de marketing
 """
 
-import pandas as pd
 from typing import List, Dict, Any, Optional
 from pathlib import Path
-from datetime import datetime, timedelta
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
 from .zapchicken_processor import ZapChickenProcessor
+from .conversation_memory import ConversationHistory
+from .sales_cube import COLUNAS_CUBO
 
 console = Console()
 
@@ -21,7 +21,7 @@ class ZapChickenAI:
     
     def __init__(self, processor: ZapChickenProcessor):
         self.processor = processor
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory()
     
     def chat_interface(self):
         """Interface de chat com IA"""
@@ -49,11 +49,7 @@ class ZapChickenAI:
                 
                 # Processa a pergunta
                 response = self.process_question(user_input)
-                self.conversation_history.append({
-                    'user': user_input,
-                    'ai': response,
-                    'timestamp': datetime.now()
-                })
+                self.conversation_history.add(user_input, response)
                 
                 console.print(f"\n[bold blue]AI:[/bold blue] {response}")
                 
@@ -679,45 +675,41 @@ class ZapChickenAI:
             if not hasattr(self.processor, 'dataframes') or not self.processor.dataframes:
                 return "❌ Dados não disponíveis. Processe os dados primeiro."
             
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            # Pedidos com colunas de data derivadas (cache compartilhado, somente leitura)
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
-            # Converte coluna de data
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'], errors='coerce')
+            # Recortes temporais saem do cubo pré-agregado (dia × hora × origem × bairro)
+            cubo = self.processor.get_sales_cube()
+            filtro_mes = {'Mes': mes_encontrado}
+            resumo_mes = cubo.resumo(filtro_mes)
             
-            # Filtra por mês
-            pedidos_mes = pedidos_df[
-                pedidos_df['Data Fechamento'].dt.month == mes_encontrado
-            ]
-            
-            if pedidos_mes.empty:
+            if resumo_mes['pedidos'] == 0:
                 return f"ℹ️ Nenhum pedido encontrado para o mês {list(meses.keys())[mes_encontrado-1]}."
             
             # Estatísticas avançadas
-            total_pedidos = len(pedidos_mes)
-            total_clientes = pedidos_mes['Cliente'].nunique()
-            valor_total = pedidos_mes['Total'].sum()
+            total_pedidos = resumo_mes['pedidos']
+            total_clientes = max(resumo_mes['clientes'], 1)
+            valor_total = resumo_mes['total']
             ticket_medio = valor_total / total_pedidos
             
             # Análise de dias da semana
-            pedidos_mes['Dia Semana'] = pedidos_mes['Data Fechamento'].dt.day_name()
-            dias_populares = pedidos_mes['Dia Semana'].value_counts().head(3)
+            dias_populares = cubo.top('Dia Semana', filtro_mes, n=3)
             
-            # Análise de horários (se disponível)
-            if 'Data Fechamento' in pedidos_mes.columns:
-                pedidos_mes['Hora'] = pedidos_mes['Data Fechamento'].dt.hour
-                horarios_populares = pedidos_mes['Hora'].value_counts().head(3)
+            # Análise de horários
+            horarios_populares = cubo.top('Hora', filtro_mes, n=3)
             
             # Análise geográfica
-            if 'Bairro' in pedidos_mes.columns:
-                bairros_populares = pedidos_mes['Bairro'].value_counts().head(5)
+            if 'Bairro' in pedidos_df.columns:
+                bairros_populares = cubo.top('Bairro', filtro_mes, n=5)
             
             # Análise de origem dos pedidos
-            if 'Origem' in pedidos_mes.columns:
-                origens_populares = pedidos_mes['Origem'].value_counts().head(3)
+            if 'Origem' in pedidos_df.columns:
+                origens_populares = cubo.top('Origem', filtro_mes, n=3)
             
-            # Top clientes com análise detalhada
+            # Top clientes com análise detalhada (único recorte que precisa dos pedidos)
+            pedidos_mes = pedidos_df[pedidos_df['Mes'] == mes_encontrado]
             top_clientes = pedidos_mes.groupby('Cliente').agg({
                 'Total': 'sum',
                 'Telefone': 'first',
@@ -741,7 +733,7 @@ class ZapChickenAI:
             for dia, count in dias_populares.items():
                 response += f"• {dia}: {count} pedidos\n"
             
-            if 'Data Fechamento' in pedidos_mes.columns:
+            if not horarios_populares.empty:
                 response += f"\n[bold]Horários mais populares:[/bold]\n"
                 for hora, count in horarios_populares.items():
                     response += f"• {hora}h: {count} pedidos\n"
@@ -799,20 +791,14 @@ class ZapChickenAI:
             if not hasattr(self.processor, 'dataframes') or not self.processor.dataframes:
                 return "❌ Dados não disponíveis. Processe os dados primeiro."
             
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            # Pedidos com colunas de data derivadas (cache compartilhado, somente leitura)
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
-            # Converte coluna de data
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'], errors='coerce')
-            
-            # Análise de tendências mensais
-            pedidos_df['Mes'] = pedidos_df['Data Fechamento'].dt.to_period('M')
-            tendencia_mensal = pedidos_df.groupby('Mes').agg({
-                'Total': 'sum',
-                'Cliente': 'nunique',
-                'Código': 'count'
-            }).reset_index()
+            # Análise de tendências mensais (consolidada a partir do cubo de vendas)
+            cubo = self.processor.get_sales_cube()
+            tendencia_mensal = cubo.rollup(['Periodo']).rename(columns=COLUNAS_CUBO)
             
             if len(tendencia_mensal) < 2:
                 return "ℹ️ Dados insuficientes para análise de tendências. Precisa de pelo menos 2 meses de dados."
@@ -822,8 +808,7 @@ class ZapChickenAI:
             tendencia_mensal['Crescimento_Clientes'] = tendencia_mensal['Cliente'].pct_change() * 100
             
             # Análise de sazonalidade semanal
-            pedidos_df['Dia_Semana'] = pedidos_df['Data Fechamento'].dt.day_name()
-            sazonalidade_semanal = pedidos_df.groupby('Dia_Semana')['Total'].sum().sort_values(ascending=False)
+            sazonalidade_semanal = cubo.rollup(['Dia Semana']).set_index('Dia Semana')['total'].sort_values(ascending=False)
             
             # Previsões simples baseadas em tendência
             ultimo_mes = tendencia_mensal.iloc[-1]
@@ -832,8 +817,11 @@ class ZapChickenAI:
             crescimento_vendas = ultimo_mes['Crescimento_Vendas']
             crescimento_clientes = ultimo_mes['Crescimento_Clientes']
             
-            # Previsão para próximo mês
-            previsao_vendas = ultimo_mes['Total'] * (1 + (crescimento_vendas / 100))
+            # Previsão para os próximos 30 dias (tendência + sazonalidade semanal do faturamento diário)
+            previsao = self.processor.get_forecast(horizonte=30)
+            previsao_vendas = previsao['previsoes']['total'].sum()
+            ultimos_30_dias = previsao['historico']['total'].tail(30).sum()
+            crescimento_previsto = ((previsao_vendas / ultimos_30_dias) - 1) * 100 if ultimos_30_dias > 0 else 0.0
             previsao_clientes = ultimo_mes['Cliente'] * (1 + (crescimento_clientes / 100))
             
             response = f"""
@@ -856,7 +844,7 @@ class ZapChickenAI:
 [bold]🔮 PREVISÕES PARA PRÓXIMO MÊS:[/bold]
 • Vendas previstas: R$ {previsao_vendas:,.2f}
 • Clientes previstos: {int(previsao_clientes)}
-• Crescimento esperado: {crescimento_vendas:+.1f}%
+• Crescimento esperado: {crescimento_previsto:+.1f}% (vs. últimos 30 dias)
 
 [bold]📈 TENDÊNCIAS IDENTIFICADAS:[/bold]
 """
@@ -897,7 +885,7 @@ class ZapChickenAI:
 • Ajustar horários de funcionamento
 
 [bold]3. 💡 ESTRATÉGIAS PREDITIVAS:[/bold]
-• Preparar para {crescimento_vendas:+.0f}% de crescimento
+• Preparar para {crescimento_previsto:+.0f}% de crescimento
 • Planejar campanhas para {int(previsao_clientes)} clientes
 • Ajustar orçamento de marketing
 
@@ -925,37 +913,22 @@ class ZapChickenAI:
             if not hasattr(self.processor, 'dataframes') or not self.processor.dataframes:
                 return "❌ Dados não disponíveis. Processe os dados primeiro."
             
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            # Pedidos com colunas de data derivadas (cache compartilhado, somente leitura)
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
-            # Converte coluna de data
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'], errors='coerce')
+            # Consolidações do cubo de vendas, sem varrer os pedidos
+            cubo = self.processor.get_sales_cube()
             
             # Análise por mês
-            pedidos_df['Mes'] = pedidos_df['Data Fechamento'].dt.month
-            pedidos_df['Mes_Nome'] = pedidos_df['Data Fechamento'].dt.strftime('%B')
-            
-            sazonalidade_mensal = pedidos_df.groupby(['Mes', 'Mes_Nome']).agg({
-                'Total': 'sum',
-                'Cliente': 'nunique',
-                'Código': 'count'
-            }).reset_index().sort_values('Mes')
+            sazonalidade_mensal = cubo.rollup(['Mes', 'Mes_Nome']).rename(columns=COLUNAS_CUBO).sort_values('Mes')
             
             # Análise por dia da semana
-            pedidos_df['Dia_Semana'] = pedidos_df['Data Fechamento'].dt.day_name()
-            sazonalidade_semanal = pedidos_df.groupby('Dia_Semana').agg({
-                'Total': 'sum',
-                'Cliente': 'nunique',
-                'Código': 'count'
-            }).reset_index()
+            sazonalidade_semanal = cubo.rollup(['Dia Semana']).rename(columns=COLUNAS_CUBO)
             
-            # Análise por hora (se disponível)
-            pedidos_df['Hora'] = pedidos_df['Data Fechamento'].dt.hour
-            sazonalidade_horaria = pedidos_df.groupby('Hora').agg({
-                'Total': 'sum',
-                'Código': 'count'
-            }).reset_index()
+            # Análise por hora
+            sazonalidade_horaria = cubo.rollup(['Hora']).rename(columns=COLUNAS_CUBO)
             
             response = f"""
 [bold]📅 ANÁLISE DE SAZONALIDADE - ZAPCHICKEN[/bold]
@@ -981,7 +954,7 @@ class ZapChickenAI:
 """
             
             for _, dia in sazonalidade_semanal.iterrows():
-                response += f"• {dia['Dia_Semana']}: R$ {dia['Total']:,.2f} ({dia['Cliente']} clientes)\n"
+                response += f"• {dia['Dia Semana']}: R$ {dia['Total']:,.2f} ({dia['Cliente']} clientes)\n"
             
             # Identifica dias fortes e fracos
             dia_forte = sazonalidade_semanal.loc[sazonalidade_semanal['Total'].idxmax()]
@@ -1015,8 +988,8 @@ class ZapChickenAI:
 • Manutenção de estoque reduzido
 
 [bold]📅 ESTRATÉGIAS SEMANAIS:[/bold]
-• {dia_forte['Dia_Semana']}: Preparar para alta demanda
-• {dia_fraco['Dia_Semana']}: Campanhas especiais para aumentar vendas
+• {dia_forte['Dia Semana']}: Preparar para alta demanda
+• {dia_fraco['Dia Semana']}: Campanhas especiais para aumentar vendas
 • Otimizar horários de funcionamento
 
 [bold]⏰ ESTRATÉGIAS HORÁRIAS:[/bold]
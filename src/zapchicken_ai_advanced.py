@@ -7,7 +7,7 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
 from collections import Counter
 # Machine Learning não disponível no Vercel - usando análise estatística
@@ -16,13 +16,14 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from .zapchicken_processor import ZapChickenProcessor
+from .conversation_memory import ConversationHistory
 
 class ZapChickenAI:
     """Sistema de IA com Análise Estatística para ZapChicken (Vercel Compatible)"""
     
     def __init__(self, processor: ZapChickenProcessor):
         self.processor = processor
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory()
         self.insights_cache = {}
         
     def process_question(self, question: str) -> str:
@@ -84,18 +85,13 @@ class ZapChickenAI:
     def analyze_sales_advanced(self, question: str) -> str:
         """Análise avançada de vendas com machine learning"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            # Análise temporal avançada (colunas derivadas em cache, somente leitura)
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
-            # Análise temporal avançada
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            pedidos_df['mes'] = pedidos_df['Data Fechamento'].dt.month
-            pedidos_df['dia_semana'] = pedidos_df['Data Fechamento'].dt.dayofweek
-            pedidos_df['hora'] = pedidos_df['Data Fechamento'].dt.hour
-            
             # Análise de crescimento
-            vendas_mensais = pedidos_df.groupby(pedidos_df['Data Fechamento'].dt.to_period('M')).agg({
+            vendas_mensais = pedidos_df.groupby('Periodo').agg({
                 'Total': 'sum',
                 'Código': 'count'
             }).reset_index()
@@ -110,38 +106,16 @@ class ZapChickenAI:
             })
             
             # Análise de horários de pico
-            vendas_por_hora = pedidos_df.groupby('hora').agg({
+            vendas_por_hora = pedidos_df.groupby('Hora').agg({
                 'Total': 'sum',
                 'Código': 'count'
             })
             
-            # Previsão simples usando regressão linear (se ML disponível)
-            if len(vendas_mensais) > 3 and ML_AVAILABLE:
-                try:
-                    X = np.arange(len(vendas_mensais)).reshape(-1, 1)
-                    y = vendas_mensais['Total'].values
-                    
-                    model = LinearRegression()
-                    model.fit(X, y)
-                    
-                    # Previsão para próximos 3 meses
-                    future_months = np.arange(len(vendas_mensais), len(vendas_mensais) + 3).reshape(-1, 1)
-                    predictions = model.predict(future_months)
-                    
-                    # Cálculo de R²
-                    r2 = r2_score(y, model.predict(X))
-                    
-                    # Análise de tendência
-                    trend = "📈 Crescente" if model.coef_[0] > 0 else "📉 Decrescente"
-                except:
-                    # Fallback sem ML
-                    predictions = [vendas_mensais['Total'].mean()] * 3
-                    r2 = 0.5
-                    trend = "📊 Estável"
-            # Fallback sem ML
-            predictions = [vendas_mensais['Total'].mean()] * 3
-            r2 = 0.5
-            trend = "📊 Estável"
+            # Previsão dos próximos 3 meses (tendência + sazonalidade semanal do faturamento diário)
+            previsao = self.processor.get_forecast(horizonte=90)
+            predictions = np.array([bloco.sum() for bloco in np.array_split(previsao['previsoes']['total'].to_numpy(), 3)])
+            r2 = previsao['r2']['total']
+            trend = "📈 Crescente" if previsao['tendencia_diaria']['total'] > 0 else "📉 Decrescente"
             
             # Insights avançados
             melhor_dia = vendas_por_dia['Total'].idxmax()
@@ -179,7 +153,7 @@ class ZapChickenAI:
 4. **Monitore tendência {trend.lower()}** - Ajuste estratégias conforme necessário
 
 💰 **OPORTUNIDADES DE CRESCIMENTO:**
-• Potencial de crescimento: R$ {predictions.sum() - vendas_mensais['Total'].sum():,.2f}
+• Potencial de crescimento: R$ {predictions.sum() - vendas_mensais['Total'].tail(3).sum():,.2f}
 • Estratégia de otimização: Focar em {dias_semana[pior_dia]} e horário {pior_hora}h
 """
             
@@ -317,7 +291,7 @@ class ZapChickenAI:
     def analyze_ticket_advanced(self, question: str) -> str:
         """Análise avançada de ticket médio com clustering"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis."
             
@@ -365,8 +339,7 @@ class ZapChickenAI:
             clientes_premium = ticket_por_cliente[ticket_por_cliente['ticket_medio'] > ticket_medio_geral * 1.5]
             
             # Análise de sazonalidade do ticket
-            pedidos_df['mes'] = pd.to_datetime(pedidos_df['Data Fechamento']).dt.month
-            ticket_por_mes = pedidos_df.groupby('mes')['Total'].mean()
+            ticket_por_mes = pedidos_df.groupby('Mes')['Total'].mean()
             
             melhor_mes = ticket_por_mes.idxmax()
             pior_mes = ticket_por_mes.idxmin()
@@ -416,7 +389,7 @@ class ZapChickenAI:
         """Gera estratégias de marketing avançadas com ROI estimado"""
         try:
             # Análise de dados para estratégias
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             clientes_df = self.processor.dataframes.get('clientes')
             
             if pedidos_df is None or pedidos_df.empty:
@@ -447,8 +420,7 @@ class ZapChickenAI:
                 bairro_analysis = None
             
             # Análise de sazonalidade
-            pedidos_df['mes'] = pd.to_datetime(pedidos_df['Data Fechamento']).dt.month
-            vendas_por_mes = pedidos_df.groupby('mes')['Total'].sum()
+            vendas_por_mes = pedidos_df.groupby('Mes')['Total'].sum()
             
             melhor_mes = vendas_por_mes.idxmax()
             pior_mes = vendas_por_mes.idxmin()
@@ -466,7 +438,7 @@ class ZapChickenAI:
 📊 **ANÁLISE DE PERFORMANCE:**
 • Ticket médio atual: R$ {ticket_medio:.2f}
 • Total de clientes únicos: {total_clientes:,}
-• Faturamento médio mensal: R$ {pedidos_df.groupby(pedidos_df['Data Fechamento'].dt.to_period('M'))['Total'].sum().mean():,.2f}
+• Faturamento médio mensal: R$ {pedidos_df.groupby('Periodo')['Total'].sum().mean():,.2f}
 • Melhor mês: {meses[melhor_mes-1]} (R$ {vendas_por_mes[melhor_mes]:,.2f})
 • Mês de baixa: {meses[pior_mes-1]} (R$ {vendas_por_mes[pior_mes]:,.2f})
 
@@ -538,52 +510,30 @@ class ZapChickenAI:
     def analyze_predictions_advanced(self, question: str) -> str:
         """Análise preditiva avançada com machine learning"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados insuficientes para análise preditiva."
             
             # Preparação dos dados
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            vendas_diarias = pedidos_df.groupby(pedidos_df['Data Fechamento'].dt.date).agg({
+            vendas_diarias = pedidos_df.groupby('Data').agg({
                 'Total': 'sum',
                 'Código': 'count'
-            }).reset_index()
+            }).reset_index().rename(columns={'Data': 'Data Fechamento'})
             
-            vendas_diarias['Data Fechamento'] = pd.to_datetime(vendas_diarias['Data Fechamento'])
             vendas_diarias['dia_semana'] = vendas_diarias['Data Fechamento'].dt.dayofweek
-            vendas_diarias['mes'] = vendas_diarias['Data Fechamento'].dt.month
-            vendas_diarias['semana_ano'] = vendas_diarias['Data Fechamento'].dt.isocalendar().week
             
-            # Modelo de previsão para vendas (se ML disponível)
-            if len(vendas_diarias) > 10 and ML_AVAILABLE:
-                try:
-                    X = vendas_diarias[['dia_semana', 'mes', 'semana_ano']].values
-                    y = vendas_diarias['Total'].values
-                    
-                    model = LinearRegression()
-                    model.fit(X, y)
-                    
-                    # Previsão para próximos 30 dias
-                    ultima_data = vendas_diarias['Data Fechamento'].max()
-                    datas_futuras = pd.date_range(ultima_data + timedelta(days=1), periods=30, freq='D')
-                    
-                    X_futuro = np.column_stack([
-                        datas_futuras.dayofweek,
-                        datas_futuras.month,
-                        datas_futuras.isocalendar().week
-                    ])
-                    
-                    previsoes = model.predict(X_futuro)
-                    
-                    # Análise de tendência
-                    tendencia = "📈 Crescente" if model.coef_[1] > 0 else "📉 Decrescente"
-                except:
-                    # Fallback sem ML
-                    previsoes = [vendas_diarias['Total'].mean()] * 30
-                    tendencia = "📊 Estável"
-            # Fallback sem ML
-            previsoes = [vendas_diarias['Total'].mean()] * 30
-            tendencia = "📊 Estável"
+            # Modelo de tendência + sazonalidade semanal (NumPy, em cache por carga de dados)
+            previsao = self.processor.get_forecast(horizonte=30)
+            previsoes = previsao['previsoes']['total'].to_numpy()
+            tendencia_diaria = previsao['tendencia_diaria']['total']
+            confiabilidade = previsao['r2']['total']
+            
+            if tendencia_diaria > 0:
+                tendencia = "📈 Crescente"
+            elif tendencia_diaria < 0:
+                tendencia = "📉 Decrescente"
+            else:
+                tendencia = "📊 Estável"
             
             # Análise de sazonalidade
             vendas_por_dia = vendas_diarias.groupby('dia_semana')['Total'].mean()
@@ -592,8 +542,9 @@ class ZapChickenAI:
             
             dias_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
             
-            # Análise de crescimento
-            crescimento_medio = ((previsoes[-1] / vendas_diarias['Total'].iloc[-1]) - 1) * 100
+            # Análise de crescimento (próximos 30 dias vs. últimos 30 dias)
+            historico_30_dias = previsao['historico']['total'].tail(30).sum()
+            crescimento_medio = ((previsoes.sum() / historico_30_dias) - 1) * 100 if historico_30_dias > 0 else 0.0
             
             response = f"""
 🔮 **ANÁLISE PREDITIVA AVANÇADA - ZAPCHICKEN**
@@ -601,7 +552,7 @@ class ZapChickenAI:
 📊 **RESUMO PREDITIVO:**
 • Período analisado: {len(vendas_diarias)} dias
 • Tendência atual: {tendencia}
-• Confiabilidade do modelo: 50%
+• Confiabilidade do modelo: {confiabilidade:.0%}
 • Crescimento projetado: {crescimento_medio:.1f}%
 
 📈 **PREVISÕES PARA PRÓXIMOS 30 DIAS:**
@@ -611,7 +562,7 @@ class ZapChickenAI:
 • Pior dia previsto: {dias_semana[pior_dia]} (R$ {vendas_por_dia[pior_dia]:,.2f})
 
 🎯 **OPORTUNIDADES IDENTIFICADAS:**
-• Potencial de crescimento: R$ {previsoes.sum() - vendas_diarias['Total'].sum():,.2f}
+• Potencial de crescimento: R$ {previsoes.sum() - historico_30_dias:,.2f}
 • Dias de alta demanda: {dias_semana[melhor_dia]}, {dias_semana[(melhor_dia + 1) % 7]}
 • Dias de baixa demanda: {dias_semana[pior_dia]}, {dias_semana[(pior_dia + 1) % 7]}
 
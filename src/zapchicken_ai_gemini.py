@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
@@ -7,10 +6,15 @@ import re
 from collections import Counter
 import warnings
 import json
+import time
 import requests
 warnings.filterwarnings('ignore')
 
 from .zapchicken_processor import ZapChickenProcessor
+from .conversation_memory import ConversationHistory
+from .gemini_prompt import build_prompt, compact_table, estimate_tokens, DEFAULT_TOKEN_BUDGET
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
 
 class ZapChickenAIGemini:
     """Sistema de IA com Gemini API - Análises Avançadas e Gratuitas"""
@@ -18,8 +22,11 @@ class ZapChickenAIGemini:
     def __init__(self, processor: ZapChickenProcessor, api_key: str = None):
         self.processor = processor
         self.api_key = api_key
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory()
         self.insights_cache = {}
+        self.token_budget = DEFAULT_TOKEN_BUDGET
+        self.last_call_stats = {}
+        self._sections_cache = None
         self.base_url = "https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent"
         
     def process_question(self, question: str) -> str:
@@ -27,16 +34,25 @@ class ZapChickenAIGemini:
         try:
             # Se não tem API key, usa análise básica
             if not self.api_key:
-                return self._fallback_analysis(question)
+                response = self._fallback_analysis(question)
+                self.conversation_history.add(question, response)
+                return response
             
-            # Prepara dados para o Gemini
-            data_summary = self._prepare_data_summary()
+            # Seções de dados (em cache por versão dos dados)
+            data_sections = self._prepare_data_sections()
             
-            # Constrói prompt para o Gemini
-            prompt = self._build_gemini_prompt(question, data_summary)
+            # Constrói prompt só com as seções relevantes e o histórico recente (limitado)
+            prompt = self._build_gemini_prompt(question, data_sections, self.conversation_history.to_prompt())
             
-            # Chama Gemini API
+            # Chama Gemini API medindo tamanho do prompt e latência
+            inicio = time.perf_counter()
             response = self._call_gemini_api(prompt)
+            self.last_call_stats = {
+                'prompt_chars': len(prompt),
+                'prompt_tokens_estimados': estimate_tokens(prompt),
+                'latencia_ms': round((time.perf_counter() - inicio) * 1000, 1)
+            }
+            self.conversation_history.add(question, response)
             
             return response
             
@@ -44,204 +60,126 @@ class ZapChickenAIGemini:
             # Fallback para análise básica em caso de erro
             return self._fallback_analysis(question)
     
-    def _prepare_data_summary(self) -> str:
-        """Prepara resumo dos dados para o Gemini"""
-        try:
-            # Debug: verificar se o processador tem dados
-            if not hasattr(self.processor, 'dataframes') or self.processor.dataframes is None:
-                return "❌ Processador não tem dados carregados. Processe os dados primeiro."
-            
-            pedidos_df = self.processor.dataframes.get('pedidos')
-            itens_df = self.processor.dataframes.get('itens')
-            clientes_df = self.processor.dataframes.get('clientes')
+    def _prepare_data_sections(self) -> Dict[str, str]:
+        """
+        Prepara as seções de dados (texto compacto/CSV) usadas nos prompts.
+        Calculadas uma vez por versão dos dados do processador.
+        """
+        versao = getattr(self.processor, 'data_version', None)
+        if self._sections_cache is not None and self._sections_cache[0] == versao:
+            return self._sections_cache[1]
+        
+        sections = {}
+        pedidos_df = self.processor.get_pedidos_features()
+        itens_df = self.processor.dataframes.get('itens')
+        clientes_df = self.processor.dataframes.get('clientes')
+        
+        if pedidos_df is not None and not pedidos_df.empty:
+            try:
+                sections['geral'] = (
+                    f"pedidos={len(pedidos_df)};receita={pedidos_df['Total'].sum():.2f};"
+                    f"ticket_medio={pedidos_df['Total'].mean():.2f};clientes_unicos={pedidos_df['Cliente'].nunique()};"
+                    f"periodo={pedidos_df['Data Fechamento'].min():%d/%m/%Y}-{pedidos_df['Data Fechamento'].max():%d/%m/%Y}"
+                )
+            except Exception:
+                sections['geral'] = f"pedidos={len(pedidos_df)}"
             
-            # Debug: verificar quais dataframes estão disponíveis
-            available_dfs = []
-            if pedidos_df is not None and not pedidos_df.empty:
-                available_dfs.append(f"pedidos ({len(pedidos_df)} registros)")
-            if itens_df is not None and not itens_df.empty:
-                available_dfs.append(f"itens ({len(itens_df)} registros)")
-            if clientes_df is not None and not clientes_df.empty:
-                available_dfs.append(f"clientes ({len(clientes_df)} registros)")
+            cubo = self.processor.get_sales_cube()
+            if cubo is not None and not cubo.celulas.empty:
+                mensal = cubo.rollup(['Periodo'])
+                sections['mensal'] = compact_table(
+                    ['mes', 'receita', 'pedidos', 'clientes'],
+                    ((str(r.Periodo), float(r.total), int(r.pedidos), int(r.clientes)) for r in mensal.itertuples())
+                )
+                semana = cubo.rollup(['dia_semana'])
+                sections['semana'] = compact_table(
+                    ['dia', 'receita', 'pedidos'],
+                    ((DIAS_SEMANA[int(r.dia_semana)], float(r.total), int(r.pedidos)) for r in semana.itertuples())
+                )
+                hora = cubo.rollup(['Hora'])
+                sections['hora'] = compact_table(
+                    ['hora', 'receita', 'pedidos'],
+                    ((int(r.Hora), float(r.total), int(r.pedidos)) for r in hora.itertuples())
+                )
+                bairros = cubo.rollup(['Bairro']).nlargest(10, 'total')
+                sections['bairros'] = compact_table(
+                    ['bairro', 'receita', 'pedidos', 'clientes'],
+                    ((r.Bairro or 'N/A', float(r.total), int(r.pedidos), int(r.clientes)) for r in bairros.itertuples())
+                )
+                diario = cubo.rollup(['Data'])['total']
+                sections['diario'] = (
+                    f"media_diaria={diario.mean():.2f};maior_dia={diario.max():.2f};"
+                    f"menor_dia={diario.min():.2f};dias_com_venda={len(diario)}"
+                )
             
-            if not available_dfs:
-                return "❌ Nenhum dado encontrado. Verifique se os arquivos foram processados corretamente."
+            if 'Origem' in pedidos_df.columns:
+                origem = pedidos_df.groupby('Origem')['Total'].agg(['sum', 'count', 'mean'])
+                sections['origem'] = compact_table(
+                    ['origem', 'receita', 'pedidos', 'ticket'],
+                    ((nome, float(d['sum']), int(d['count']), float(d['mean'])) for nome, d in origem.iterrows())
+                )
             
-            summary = f"📊 RESUMO DOS DADOS DA ZAPCHICKEN:\n\n"
-            summary += f"📁 DataFrames disponíveis: {', '.join(available_dfs)}\n\n"
-            
-            if pedidos_df is not None and not pedidos_df.empty:
-                pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-                
-                summary += f"🛒 PEDIDOS:\n"
-                summary += f"• Total de pedidos: {len(pedidos_df):,}\n"
-                summary += f"• Receita total: R$ {pedidos_df['Total'].sum():,.2f}\n"
-                summary += f"• Ticket médio: R$ {pedidos_df['Total'].mean():.2f}\n"
-                summary += f"• Período: {pedidos_df['Data Fechamento'].min().strftime('%d/%m/%Y')} a {pedidos_df['Data Fechamento'].max().strftime('%d/%m/%Y')}\n"
-                summary += f"• Clientes únicos: {pedidos_df['Cliente'].nunique():,}\n"
-                
-                # Top origens
-                origem_analise = pedidos_df['Origem'].value_counts().head(3)
-                summary += f"• Principais origens: {origem_analise.to_dict()}\n\n"
+            try:
+                top_clientes = pedidos_df.groupby('Cliente')['Total'].sum().nlargest(10)
+                sections['top_clientes'] = compact_table(['cliente', 'valor'], ((c, float(v)) for c, v in top_clientes.items()))
                 
-                # Análise temporal
-                vendas_diarias = pedidos_df.groupby('Data Fechamento')['Total'].sum()
-                summary += f"• Média diária: R$ {vendas_diarias.mean():.2f}\n"
-                summary += f"• Maior dia: R$ {vendas_diarias.max():.2f}\n"
-                summary += f"• Menor dia: R$ {vendas_diarias.min():.2f}\n"
-                
-                # Análise por origem
-                vendas_por_origem = pedidos_df.groupby('Origem')['Total'].agg(['sum', 'count', 'mean']).round(2)
-                summary += f"• Vendas por origem:\n"
-                for origem, data in vendas_por_origem.iterrows():
-                    summary += f"  - {origem}: R$ {data['sum']:,.2f} ({data['count']} pedidos, ticket R$ {data['mean']:.2f})\n"
-                
-                # Análise mensal
-                pedidos_df['Mes'] = pedidos_df['Data Fechamento'].dt.to_period('M')
-                vendas_mensais = pedidos_df.groupby('Mes')['Total'].sum()
-                summary += f"• Vendas mensais: {vendas_mensais.to_dict()}\n\n"
+                freq_compra = pedidos_df['Cliente'].value_counts()
+                sections['frequencia'] = (
+                    f"1_pedido={int((freq_compra == 1).sum())};2a5_pedidos={int(((freq_compra >= 2) & (freq_compra <= 5)).sum())};"
+                    f"6mais_pedidos={int((freq_compra >= 6).sum())}"
+                )
+            except Exception:
+                pass
+        
+        if itens_df is not None and not itens_df.empty:
+            nome_prod_col = 'Nome Prod.' if 'Nome Prod.' in itens_df.columns else 'Nome Prod'
+            cat_prod_col = 'Cat. Prod.' if 'Cat. Prod.' in itens_df.columns else 'Cat. Prod'
             
-            if itens_df is not None and not itens_df.empty:
-                summary += f"🛍️ PRODUTOS:\n"
-                summary += f"• Total de itens vendidos: {itens_df['Qtd.'].sum():,}\n"
-                
-                # Verifica se as colunas existem (com tratamento para espaços)
-                nome_prod_col = 'Nome Prod.' if 'Nome Prod.' in itens_df.columns else 'Nome Prod'
-                cat_prod_col = 'Cat. Prod.' if 'Cat. Prod.' in itens_df.columns else 'Cat. Prod'
-                
+            try:
                 if nome_prod_col in itens_df.columns:
-                    summary += f"• Produtos únicos: {itens_df[nome_prod_col].nunique():,}\n"
-                else:
-                    summary += f"• Produtos únicos: {itens_df.shape[0]:,}\n"
+                    top_produtos = itens_df.groupby(nome_prod_col)['Qtd.'].sum().nlargest(10)
+                    sections['produtos'] = (
+                        f"itens_vendidos={itens_df['Qtd.'].sum()};produtos_unicos={itens_df[nome_prod_col].nunique()}\n"
+                        + compact_table(['produto', 'qtd'], top_produtos.items())
+                    )
                     
-                if cat_prod_col in itens_df.columns:
-                    summary += f"• Categorias: {itens_df[cat_prod_col].nunique():,}\n"
-                else:
-                    summary += f"• Categorias: N/A\n"
+                    valor_total_itens = itens_df['Qtd.'] * itens_df['Valor Un. Item']
+                    top_valor = valor_total_itens.groupby(itens_df[nome_prod_col]).sum().nlargest(5)
+                    sections['produtos_valor'] = compact_table(['produto', 'valor'], ((p, float(v)) for p, v in top_valor.items()))
                 
-                # Top produtos (se a coluna existir)
-                if nome_prod_col in itens_df.columns:
-                    try:
-                        top_produtos = itens_df.groupby(nome_prod_col)['Qtd.'].sum().nlargest(10)
-                        summary += f"• Top 10 produtos por quantidade:\n"
-                        for i, (produto, qtd) in enumerate(top_produtos.items(), 1):
-                            summary += f"  {i}. {produto}: {qtd} unidades\n"
-                    except:
-                        summary += f"• Top produtos: Erro ao processar\n"
-                else:
-                    summary += f"• Top produtos: Coluna não encontrada\n"
-                
-                # Top produtos por valor
-                try:
-                    itens_df['Valor Total'] = itens_df['Qtd.'] * itens_df['Valor Un. Item']
-                    top_produtos_valor = itens_df.groupby(nome_prod_col)['Valor Total'].sum().nlargest(5)
-                    summary += f"• Top 5 produtos por valor:\n"
-                    for i, (produto, valor) in enumerate(top_produtos_valor.items(), 1):
-                        summary += f"  {i}. {produto}: R$ {valor:,.2f}\n"
-                except:
-                    summary += f"• Top produtos por valor: Erro ao processar\n"
-                
-                summary += "\n"
+                if cat_prod_col in itens_df.columns:
+                    categorias = itens_df.groupby(cat_prod_col)['Qtd.'].sum().nlargest(10)
+                    sections['categorias'] = compact_table(['categoria', 'qtd'], categorias.items())
+            except Exception:
+                pass
+        
+        if clientes_df is not None and not clientes_df.empty:
+            sections['clientes'] = f"clientes_cadastrados={len(clientes_df)}"
+            if 'Bairro' in clientes_df.columns:
+                top_bairros = clientes_df['Bairro'].value_counts().head(5)
+                sections['bairros_clientes'] = compact_table(['bairro', 'clientes'], top_bairros.items())
+        
+        self._sections_cache = (versao, sections)
+        return sections
+    
+    def _prepare_data_summary(self) -> str:
+        """Resumo completo dos dados (todas as seções), usado para diagnóstico"""
+        try:
+            if not hasattr(self.processor, 'dataframes') or self.processor.dataframes is None:
+                return "❌ Processador não tem dados carregados. Processe os dados primeiro."
             
-            if clientes_df is not None and not clientes_df.empty:
-                summary += f"👥 CLIENTES:\n"
-                summary += f"• Total de clientes: {len(clientes_df):,}\n"
-                
-                # Análise de bairros
-                if 'Bairro' in clientes_df.columns:
-                    top_bairros = clientes_df['Bairro'].value_counts().head(5)
-                    summary += f"• Top 5 bairros: {top_bairros.to_dict()}\n"
-                
-                # Top clientes por valor gasto
-                try:
-                    clientes_por_valor = pedidos_df.groupby('Cliente')['Total'].sum().nlargest(10)
-                    summary += f"• Top 10 clientes por valor gasto:\n"
-                    for i, (cliente, valor) in enumerate(clientes_por_valor.items(), 1):
-                        summary += f"  {i}. {cliente}: R$ {valor:,.2f}\n"
-                except:
-                    summary += f"• Top clientes: Erro ao processar\n"
-                
-                # Análise de frequência de compra
-                try:
-                    freq_compra = pedidos_df['Cliente'].value_counts()
-                    summary += f"• Análise de frequência:\n"
-                    summary += f"  - Clientes com 1 pedido: {len(freq_compra[freq_compra == 1])}\n"
-                    summary += f"  - Clientes com 2-5 pedidos: {len(freq_compra[(freq_compra >= 2) & (freq_compra <= 5)])}\n"
-                    summary += f"  - Clientes com 6+ pedidos: {len(freq_compra[freq_compra >= 6])}\n"
-                except:
-                    summary += f"• Análise de frequência: Erro ao processar\n"
-                
-                summary += "\n"
+            sections = self._prepare_data_sections()
+            if not sections:
+                return "❌ Nenhum dado encontrado. Verifique se os arquivos foram processados corretamente."
             
-            return summary
+            return "\n".join(f"[{nome}]\n{conteudo}" for nome, conteudo in sections.items())
             
         except Exception as e:
             return f"❌ Erro ao preparar dados: {str(e)}"
     
-    def _build_gemini_prompt(self, question: str, data_summary: str) -> str:
-        """Constrói prompt otimizado para o Gemini"""
-        
-        system_prompt = f"""
-Você é um especialista em Business Intelligence e análise de dados para restaurantes/food service. 
-Você está analisando dados da ZapChicken, um negócio de delivery de comida.
-
-IMPORTANTE: Use APENAS os dados fornecidos abaixo. NÃO faça suposições ou estimativas. 
-Se os dados não estiverem disponíveis, diga claramente "Dados não disponíveis".
-
-DADOS DISPONÍVEIS:
-{data_summary}
-
-INSTRUÇÕES ESPECÍFICAS:
-1. Use EXATAMENTE os números e dados fornecidos acima
-2. NÃO faça estimativas ou suposições
-3. Se pedir dados específicos que não estão na lista, diga "Dados não disponíveis"
-4. Apresente os dados em formato de tabela quando possível
-5. Use os valores reais dos dados fornecidos
-6. Seja preciso e específico com os números
-7. Use emojis para tornar a resposta visual
-8. Estruture com títulos claros
-9. Formate valores monetários com R$ e separadores de milhares
-10. Use formatação markdown para tabelas bem estruturadas
-11. Adicione insights estratégicos baseados nos dados
-12. Use cores e formatação para destacar informações importantes
-
-PERGUNTA DO USUÁRIO: {question}
-
-FORMATAÇÃO ESPECÍFICA:
-- Use tabelas markdown bem estruturadas
-- Formate valores monetários: R$ 1.234,56
-- Use emojis para categorias: 🛒 Pedidos, 🛍️ Produtos, 👥 Clientes, 💰 Financeiro
-- Adicione insights estratégicos após cada tabela
-- Use **negrito** para destacar valores importantes
-- Estruture com títulos claros usando ###
-
-EXEMPLO DE FORMATAÇÃO:
-### 💰 Resumo Financeiro
-| Mês | Receita Total |
-|-----|---------------|
-| Fevereiro/2025 | **R$ 30.118,61** |
-| Março/2025 | **R$ 41.458,60** |
-
-**💡 Insight:** Março foi o mês com maior receita, com crescimento de 37,6% em relação a fevereiro.
-
-### 🛒 Top Produtos
-| Produto | Quantidade | Valor |
-|---------|------------|-------|
-| Produto A | 500 | **R$ 25.000,00** |
-
-**💡 Insight:** Este produto representa 15% da receita total.
-
-INSIGHTS ESTRATÉGICOS A INCLUIR:
-- 🎯 **Oportunidades:** Identifique produtos/clientes com potencial
-- 📈 **Tendências:** Analise crescimento/queda nos dados
-- 💡 **Recomendações:** Sugira ações específicas baseadas nos dados
-- ⚠️ **Alertas:** Destaque pontos de atenção
-- 🚀 **Estratégias:** Proponha melhorias baseadas nos insights
-
-IMPORTANTE: Responda usando APENAS os dados fornecidos. Se algo não estiver nos dados, diga claramente.
-"""
-        
-        return system_prompt
+    def _build_gemini_prompt(self, question: str, data_sections: Dict[str, str], history: str = '') -> str:
+        """Constrói prompt enxuto: preâmbulo fixo + seções da intenção, dentro do orçamento de tokens"""
+        return build_prompt(question, data_sections, history=history, token_budget=self.token_budget)
     
     def _call_gemini_api(self, prompt: str) -> str:
         """Chama a API do Gemini"""
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
@@ -9,13 +8,14 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from .zapchicken_processor import ZapChickenProcessor
+from .conversation_memory import ConversationHistory
 
 class ZapChickenAIVercel:
     """Sistema de IA Ultra-Leve para Vercel - Sem Machine Learning"""
     
     def __init__(self, processor: ZapChickenProcessor):
         self.processor = processor
-        self.conversation_history = []
+        self.conversation_history = ConversationHistory()
         self.insights_cache = {}
         
     def process_question(self, question: str) -> str:
@@ -65,14 +65,13 @@ class ZapChickenAIVercel:
     def analyze_sales_vercel(self, question: str) -> str:
         """Análise avançada de vendas sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
             # Análise temporal
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            vendas_diarias = pedidos_df.groupby('Data Fechamento')['Total'].sum().reset_index()
-            vendas_mensais = pedidos_df.groupby(pedidos_df['Data Fechamento'].dt.to_period('M'))['Total'].sum()
+            vendas_diarias = pedidos_df.groupby('Data')['Total'].sum().reset_index()
+            vendas_mensais = pedidos_df.groupby('Periodo')['Total'].sum()
             
             # Estatísticas básicas
             total_vendas = pedidos_df['Total'].sum()
@@ -92,7 +91,6 @@ class ZapChickenAIVercel:
             origem_principal = origem_analise.index[0] if not origem_analise.empty else "N/A"
             
             # Análise de horários
-            pedidos_df['Hora'] = pedidos_df['Data Fechamento'].dt.hour
             hora_pico = pedidos_df['Hora'].mode().iloc[0] if not pedidos_df['Hora'].mode().empty else 0
             
             response = f"""
@@ -127,13 +125,12 @@ class ZapChickenAIVercel:
     def analyze_customers_vercel(self, question: str) -> str:
         """Análise avançada de clientes sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
             # RFM Analysis (sem ML)
             hoje = datetime.now()
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
             
             client_analysis = pedidos_df.groupby('Cliente').agg({
                 'Data Fechamento': 'max',
@@ -204,7 +201,7 @@ class ZapChickenAIVercel:
     def analyze_ticket_vercel(self, question: str) -> str:
         """Análise de ticket médio sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
@@ -234,8 +231,6 @@ class ZapChickenAIVercel:
             ticket_min = pedidos_df['Total'].min()
             
             # Análise sazonal
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            pedidos_df['Mes'] = pedidos_df['Data Fechamento'].dt.month
             ticket_por_mes = pedidos_df.groupby('Mes')['Total'].mean()
             
             mes_maior_ticket = ticket_por_mes.idxmax()
@@ -272,7 +267,7 @@ class ZapChickenAIVercel:
     def analyze_geographic_vercel(self, question: str) -> str:
         """Análise geográfica sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
@@ -366,13 +361,12 @@ class ZapChickenAIVercel:
     def analyze_predictions_vercel(self, question: str) -> str:
         """Análise preditiva simples sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
             # Análise de tendência simples
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            vendas_diarias = pedidos_df.groupby('Data Fechamento')['Total'].sum().reset_index()
+            vendas_diarias = pedidos_df.groupby('Data')['Total'].sum().reset_index().rename(columns={'Data': 'Data Fechamento'})
             
             if len(vendas_diarias) < 7:
                 return "❌ Dados insuficientes para análise preditiva (mínimo 7 dias)"
@@ -419,23 +413,18 @@ class ZapChickenAIVercel:
     def analyze_seasonality_vercel(self, question: str) -> str:
         """Análise de sazonalidade sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
-            if pedidos_df is None or pedidos_df.empty:
+            cubo = self.processor.get_sales_cube()
+            if cubo is None or cubo.celulas.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
-            
-            # Análise por dia da semana
-            pedidos_df['Dia Semana'] = pedidos_df['Data Fechamento'].dt.day_name()
-            vendas_dia_semana = pedidos_df.groupby('Dia Semana')['Total'].sum()
+            # Análise por dia da semana (consolidada a partir do cubo de vendas)
+            vendas_dia_semana = cubo.rollup(['Dia Semana']).set_index('Dia Semana')['total']
             
             # Análise por mês
-            pedidos_df['Mes'] = pedidos_df['Data Fechamento'].dt.month
-            vendas_mes = pedidos_df.groupby('Mes')['Total'].sum()
+            vendas_mes = cubo.rollup(['Mes']).set_index('Mes')['total']
             
             # Análise por hora
-            pedidos_df['Hora'] = pedidos_df['Data Fechamento'].dt.hour
-            vendas_hora = pedidos_df.groupby('Hora')['Total'].sum()
+            vendas_hora = cubo.rollup(['Hora']).set_index('Hora')['total']
             
             response = f"""
 📅 **ANÁLISE DE SAZONALIDADE**
@@ -464,7 +453,7 @@ class ZapChickenAIVercel:
     def generate_marketing_strategy_vercel(self, question: str) -> str:
         """Estratégias de marketing sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
@@ -475,7 +464,6 @@ class ZapChickenAIVercel:
             
             # Clientes inativos
             hoje = datetime.now()
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
             clientes_inativos = pedidos_df.groupby('Cliente')['Data Fechamento'].max()
             clientes_inativos = clientes_inativos[(hoje - clientes_inativos).dt.days > 90]
             
@@ -526,7 +514,7 @@ class ZapChickenAIVercel:
     def generate_executive_report_vercel(self) -> str:
         """Relatório executivo completo sem ML"""
         try:
-            pedidos_df = self.processor.dataframes.get('pedidos')
+            pedidos_df = self.processor.get_pedidos_features()
             if pedidos_df is None or pedidos_df.empty:
                 return "❌ Dados de pedidos não disponíveis. Processe os dados primeiro."
             
@@ -537,7 +525,6 @@ class ZapChickenAIVercel:
             total_clientes = pedidos_df['Cliente'].nunique()
             
             # Análise temporal
-            pedidos_df['Data Fechamento'] = pd.to_datetime(pedidos_df['Data Fechamento'])
             periodo_inicio = pedidos_df['Data Fechamento'].min()
             periodo_fim = pedidos_df['Data Fechamento'].max()
             
@@ -5,15 +5,23 @@ Business Intelligence com análise preditiva e sugestões de marketing
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from pathlib import Path
 from datetime import datetime, timedelta
 import re
+import threading
 from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from .utils import setup_logging, display_dataframe_info, show_progress, save_dataframe
+from .analysis_core import (
+    REPORT_FILES, CONTACT_NAME_COLUMNS, CONTACT_PHONE_COLUMNS, CLIENT_PHONE_COLUMNS, ORDER_PHONE_COLUMNS,
+    PHONE_KEYWORDS, ITEM_VALUE_COLUMNS, clean_phone_number, extract_first_name, normalize_neighborhood,
+    find_column, numbers_series, dates_series
+)
+from .sales_cube import SalesCube
+from .forecasting import fit_seasonal_trend, forecast, trend_per_day, weekly_effects
 
 console = Console()
 logger = setup_logging()
@@ -27,6 +35,12 @@ class ZapChickenProcessor:
         self.dataframes = {}
         self.processed_data = {}
         
+        # Versão dos dados carregados (incrementa a cada carga) e cache de
+        # colunas derivadas compartilhado pelos módulos de IA
+        self.data_version = 0
+        self._features_cache = {}
+        self._features_lock = threading.RLock()
+        
         # Configurações padrão (configuráveis)
         self.config = {
             'dias_inatividade': 30,
@@ -76,11 +90,7 @@ class ZapChickenProcessor:
             
             for file_type, file_path in files_found.items():
                 try:
-                    if file_type == 'contacts':
-                        df = pd.read_csv(file_path, encoding='utf-8')
-                    else:
-                        df = pd.read_excel(file_path, engine='openpyxl')
-                    
+                    df = self.read_input_file(file_path)
                     self.dataframes[file_type] = df
                     console.print(f"[green]✓[/green] {file_type}: {file_path.name} ({len(df)} linhas)")
                     
@@ -89,87 +99,188 @@ class ZapChickenProcessor:
                 
                 progress.update(task, advance=1)
         
+        self.invalidate_cache()
+        
         return self.dataframes
     
+    @staticmethod
+    def read_input_file(file_path: Path) -> pd.DataFrame:
+        """Lê um arquivo de entrada (CSV do Google Contacts ou planilha Excel)"""
+        if Path(file_path).suffix.lower() == '.csv':
+            try:
+                return pd.read_csv(file_path, encoding='utf-8')
+            except UnicodeDecodeError:
+                # Exportações antigas em Latin-1 (mesma regra do motor Python)
+                return pd.read_csv(file_path, encoding='latin1')
+        return pd.read_excel(file_path, engine='openpyxl')
+    
+    def load_dataframes(self, dataframes: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Usa DataFrames já montados em memória (ex.: uploads da API) no lugar dos arquivos de data/input"""
+        self.dataframes = dict(dataframes)
+        self.invalidate_cache()
+        return self.dataframes
+    
+    def invalidate_cache(self):
+        """Invalida os caches derivados após uma nova carga de dados"""
+        with self._features_lock:
+            self.data_version += 1
+            self._features_cache.clear()
+    
+    def get_pedidos_features(self) -> Optional[pd.DataFrame]:
+        """
+        Retorna os pedidos com colunas de data derivadas, calculadas uma única vez.
+        
+        Colunas adicionadas: 'Data Fechamento' (datetime), 'Hora', 'Dia Semana',
+        'dia_semana' (0=segunda), 'Mes', 'Mes_Nome', 'Periodo' (mês) e 'Data'.
+        
+        O DataFrame retornado é compartilhado entre as análises e deve ser
+        tratado como somente leitura: use .copy() antes de adicionar colunas.
+        O frame original em self.dataframes['pedidos'] nunca é modificado.
+        """
+        pedidos_df = self.dataframes.get('pedidos')
+        if pedidos_df is None:
+            return None
+        
+        # A identidade do frame protege contra substituições diretas em self.dataframes
+        cache_key = ('pedidos', self.data_version, id(pedidos_df))
+        cached = self._features_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        with self._features_lock:
+            cached = self._features_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            features = self._build_pedidos_features(pedidos_df)
+            self._store_cache(cache_key, features)
+            return features
+    
+    def _build_pedidos_features(self, pedidos_df: pd.DataFrame) -> pd.DataFrame:
+        """Calcula as colunas de data derivadas (e o Total numérico) sobre uma cópia dos pedidos"""
+        features = pedidos_df.copy()
+        if 'Data Fechamento' in features.columns:
+            # Mesma regra de datas da limpeza e do motor colunar (dd/mm/aaaa, com ou sem hora)
+            datas = dates_series(features['Data Fechamento'])
+            features['Data Fechamento'] = datas
+            features['Data'] = datas.dt.normalize()
+            features['Hora'] = datas.dt.hour
+            features['Dia Semana'] = datas.dt.day_name()
+            features['dia_semana'] = datas.dt.dayofweek
+            features['Mes'] = datas.dt.month
+            features['Mes_Nome'] = datas.dt.strftime('%B')
+            features['Periodo'] = datas.dt.to_period('M')
+        if 'Total' in features.columns:
+            # Totais do CSV chegam como texto ('53,56'): converte uma vez para cubo, IA e previsão
+            features['Total'] = numbers_series(features['Total'])
+        return features
+    
+    def _store_cache(self, cache_key: tuple, value: Any):
+        """Guarda um valor no cache, descartando entradas antigas do mesmo tipo"""
+        for key in [k for k in self._features_cache if k[0] == cache_key[0]]:
+            del self._features_cache[key]
+        self._features_cache[cache_key] = value
+    
+    def get_cached(self, nome: str, factory: Callable[[], Any]) -> Any:
+        """
+        Valor derivado dos dados carregados (ex.: séries e figuras do dashboard),
+        calculado uma vez e guardado até a próxima carga de dados.
+        """
+        cache_key = (nome, self.data_version, id(self.dataframes.get('pedidos')))
+        cached = self._features_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        with self._features_lock:
+            cached = self._features_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            value = factory()
+            self._store_cache(cache_key, value)
+            return value
+    
+    def get_sales_cube(self) -> Optional[SalesCube]:
+        """
+        Retorna o cubo de vendas (dia × hora × origem × bairro), construído uma
+        vez por carga de dados.
+        """
+        pedidos_df = self.dataframes.get('pedidos')
+        if pedidos_df is None:
+            return None
+        
+        cache_key = ('cubo', self.data_version, id(pedidos_df))
+        cached = self._features_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        with self._features_lock:
+            cached = self._features_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            cubo = SalesCube.from_pedidos(self.get_pedidos_features())
+            self._store_cache(cache_key, cubo)
+            return cubo
+    
+    def get_forecast(self, horizonte: int = 30, por: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Previsão do faturamento diário (tendência + sazonalidade semanal).
+        
+        Com `por` ('Bairro' ou 'Origem') ajusta uma série por grupo, todas de uma
+        vez. O resultado fica em cache até a próxima carga de dados e contém:
+        historico, previsoes (DataFrames diários), tendencia_diaria, r2,
+        erro_padrao (Series por série) e efeito_semanal (0 = segunda).
+        """
+        pedidos_df = self.dataframes.get('pedidos')
+        if pedidos_df is None:
+            return None
+        
+        cache_key = (f"previsao:{por}:{horizonte}", self.data_version, id(pedidos_df))
+        cached = self._features_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        cubo = self.get_sales_cube()
+        if cubo is None or cubo.celulas.empty:
+            return None
+        
+        # Série diária contínua (dias sem venda = 0), uma coluna por grupo
+        if por:
+            diario = cubo.rollup(['Data', por])
+            historico = diario.pivot_table(index='Data', columns=por, values='total', aggfunc='sum', fill_value=0.0)
+        else:
+            historico = cubo.rollup(['Data']).set_index('Data')[['total']]
+        historico = historico.asfreq('D', fill_value=0.0)
+        
+        modelo = fit_seasonal_trend(historico.to_numpy(dtype=float), historico.index[0].dayofweek)
+        datas_futuras = pd.date_range(historico.index[-1] + timedelta(days=1), periods=horizonte, freq='D')
+        
+        resultado = {
+            'historico': historico,
+            'previsoes': pd.DataFrame(forecast(modelo, horizonte), index=datas_futuras, columns=historico.columns),
+            'tendencia_diaria': pd.Series(trend_per_day(modelo), index=historico.columns),
+            'efeito_semanal': pd.DataFrame(weekly_effects(modelo), columns=historico.columns),
+            'r2': pd.Series(modelo['r2'], index=historico.columns),
+            'erro_padrao': pd.Series(modelo['erro_padrao'], index=historico.columns)
+        }
+        
+        with self._features_lock:
+            self._store_cache(cache_key, resultado)
+        return resultado
+    
+    # Regras de limpeza compartilhadas com o motor Python (src/analysis_core.py)
     def clean_phone_number(self, phone: str) -> str:
         """Limpa e formata número de telefone"""
-        if pd.isna(phone) or not phone:
-            return ""
-        
-        # Remove caracteres especiais
-        clean_phone = str(phone).replace('(', '').replace(')', '').replace('-', '').replace(' ', '')
-        
-        # Remove tudo que não for número
-        clean_phone = ''.join(filter(str.isdigit, clean_phone))
-        
-        # Verifica se é válido (não é 00000000, 0000000000, etc.)
-        if (clean_phone == '00000000' or 
-            clean_phone == '0000000000' or 
-            clean_phone == '00000000000' or
-            len(clean_phone) < 10 or
-            clean_phone.startswith('000')):
-            return ""
-        
-        return clean_phone
+        return clean_phone_number(phone)
     
     def extract_first_name(self, full_name: str) -> str:
         """Extrai primeiro nome"""
-        if pd.isna(full_name) or not full_name:
-            return ""
-        
-        # Remove caracteres especiais e espaços extras
-        name = str(full_name).strip()
-        
-        # Se começa com LT_XX, extrai o nome após o espaço
-        if name.startswith('LT_'):
-            parts = name.split(' ', 1)
-            if len(parts) > 1:
-                return parts[1]
-            return ""
-        
-        # Extrai primeiro nome
-        first_name = name.split(' ')[0]
-        
-        # Filtra nomes inválidos
-        invalid_names = ['-', '???????', 'null', 'none', 'nan', '']
-        if first_name.lower() in [n.lower() for n in invalid_names]:
-            return ""
-        
-        return first_name
+        return extract_first_name(full_name)
     
     def normalize_neighborhood(self, bairro: str) -> str:
         """Normaliza nomes de bairros para corrigir variações"""
-        if pd.isna(bairro) or not bairro:
-            return ""
-        
-        bairro = str(bairro).strip().lower()
-        
-        # Mapeamento de variações conhecidas
-        variations = {
-            'fontanella': ['fontanela', 'fontanella', 'fortanella', 'fontanela'],
-            'jardim dona luiza': ['jardim dona luiza', 'jardim d. luiza', 'dona luiza'],
-            'nova jaguariuna': ['nova jaguariúna', 'nova jaguariuna'],
-            'centro': ['centro', 'centro da cidade'],
-            'zambom': ['zambom', 'jardim zambom'],
-            'capotuna': ['capotuna', 'capotuna'],
-            'triunfo': ['triunfo', 'jardim triunfo'],
-            'nassif': ['nassif', 'nucleo res. dr. joao a nassif'],
-            'capela de santo antonio': ['capela de santo antonio', 'capela santo antonio'],
-            'chácara primavera': ['chácara primavera', 'chacara primavera', 'primavera'],
-            'jardim europa': ['jardim europa', 'europa'],
-            'jardim mauá ii': ['jardim mauá ii', 'jardim maua ii', 'mauá ii'],
-            'jardim santa cruz': ['jardim santa cruz', 'santa cruz'],
-            'roseira de cima': ['roseira de cima', 'roseira'],
-            'tamboré': ['tamboré', 'tambore'],
-            'nova jaguariúna': ['nova jaguariúna', 'nova jaguariuna']
-        }
-        
-        # Procura por correspondências
-        for normalized, variants in variations.items():
-            if bairro in variants:
-                return normalized
-        
-        return bairro
+        return normalize_neighborhood(bairro)
     
     def process_contacts(self) -> pd.DataFrame:
         """Processa arquivo de contatos do Google"""
@@ -179,22 +290,14 @@ class ZapChickenProcessor:
         df = self.dataframes['contacts'].copy()
         
         # Encontra coluna de nome
-        nome_col = None
-        for col in ['First Name', 'Nome', 'nome', 'Name', 'name']:
-            if col in df.columns:
-                nome_col = col
-                break
+        nome_col = find_column(list(df.columns), CONTACT_NAME_COLUMNS)
         
         if nome_col is None:
             print(f"Colunas disponíveis no arquivo de contatos: {list(df.columns)}")
             return pd.DataFrame()
         
         # Encontra coluna de telefone
-        telefone_col = None
-        for col in ['Phone 1 - Value', 'Telefone', 'telefone', 'Phone', 'phone', 'Fone', 'fone']:
-            if col in df.columns:
-                telefone_col = col
-                break
+        telefone_col = find_column(list(df.columns), CONTACT_PHONE_COLUMNS)
         
         if telefone_col is None:
             print(f"❌ Nenhuma coluna de telefone encontrada no arquivo de contatos")
@@ -222,20 +325,8 @@ class ZapChickenProcessor:
         
         df = self.dataframes['clientes'].copy()
         
-        # Encontra coluna de telefone (pode ter nomes diferentes)
-        telefone_col = None
-        for col in ['Fone Principal', 'Telefone', 'telefone', 'Fone', 'fone', 'Celular', 'celular', 'Phone', 'phone']:
-            if col in df.columns:
-                telefone_col = col
-                break
-        
-        if telefone_col is None:
-            print(f"Colunas disponíveis no arquivo de clientes: {list(df.columns)}")
-            # Se não encontrar, tenta usar a primeira coluna que contenha 'telefone' no nome
-            for col in df.columns:
-                if 'telefone' in col.lower() or 'fone' in col.lower() or 'celular' in col.lower():
-                    telefone_col = col
-                    break
+        # Encontra coluna de telefone (pode ter nomes diferentes ou só conter 'telefone' no nome)
+        telefone_col = find_column(list(df.columns), CLIENT_PHONE_COLUMNS, PHONE_KEYWORDS)
         
         if telefone_col is None:
             print("❌ Nenhuma coluna de telefone encontrada no arquivo de clientes")
@@ -262,20 +353,8 @@ class ZapChickenProcessor:
         
         df = self.dataframes['pedidos'].copy()
         
-        # Encontra coluna de telefone (pode ter nomes diferentes)
-        telefone_col = None
-        for col in ['Telefone', 'telefone', 'Fone', 'fone', 'Celular', 'celular', 'Phone', 'phone']:
-            if col in df.columns:
-                telefone_col = col
-                break
-        
-        if telefone_col is None:
-            print(f"Colunas disponíveis no arquivo de pedidos: {list(df.columns)}")
-            # Se não encontrar, tenta usar a primeira coluna que contenha 'telefone' no nome
-            for col in df.columns:
-                if 'telefone' in col.lower() or 'fone' in col.lower() or 'celular' in col.lower():
-                    telefone_col = col
-                    break
+        # Encontra coluna de telefone (pode ter nomes diferentes ou só conter 'telefone' no nome)
+        telefone_col = find_column(list(df.columns), ORDER_PHONE_COLUMNS, PHONE_KEYWORDS)
         
         if telefone_col is None:
             print("❌ Nenhuma coluna de telefone encontrada no arquivo de pedidos")
@@ -284,8 +363,8 @@ class ZapChickenProcessor:
         # Limpa telefones
         df['telefone_limpo'] = df[telefone_col].apply(self.clean_phone_number)
         
-        # Converte data de fechamento
-        df['Data Fechamento'] = pd.to_datetime(df['Data Fechamento'], format='%d/%m/%Y', errors='coerce')
+        # Converte data de fechamento (dd/mm/aaaa, com ou sem hora)
+        df['Data Fechamento'] = dates_series(df['Data Fechamento'])
         
         # Remove pedidos sem telefone (mesa/comanda)
         df = df[df['telefone_limpo'] != ""]
@@ -294,7 +373,7 @@ class ZapChickenProcessor:
         df['bairro_normalizado'] = df['Bairro'].apply(self.normalize_neighborhood)
         
         # Calcula valor total (pedido + entrega)
-        df['valor_total'] = df['Total'] + df['Valor Entrega']
+        df['valor_total'] = numbers_series(df['Total']) + numbers_series(df['Valor Entrega'])
         
         return df
     
@@ -306,7 +385,13 @@ class ZapChickenProcessor:
         df = self.dataframes['itens'].copy()
         
         # Converte data de fechamento
-        df['Data Fec. Ped.'] = pd.to_datetime(df['Data Fec. Ped.'], format='%d/%m/%Y', errors='coerce')
+        if 'Data Fec. Ped.' in df.columns:
+            df['Data Fec. Ped.'] = dates_series(df['Data Fec. Ped.'])
+        
+        # Quantidade e valor numéricos (textos '12,50' convertidos como no motor Python)
+        for col in ['Qtd.', find_column(list(df.columns), ITEM_VALUE_COLUMNS)]:
+            if col in df.columns:
+                df[col] = numbers_series(df[col])
         
         return df
     
@@ -455,16 +540,9 @@ class ZapChickenProcessor:
         if 'Qtd.' in itens_df.columns:
             colunas_itens.append('Qtd.')
         # Tenta diferentes variações da coluna de valor
-        if 'Valor Tot. Item' in itens_df.columns:
-            colunas_itens.append('Valor Tot. Item')
-        elif 'Valor. Tot. Item' in itens_df.columns:
-            colunas_itens.append('Valor. Tot. Item')
-        elif 'Valor Tot Item' in itens_df.columns:
-            colunas_itens.append('Valor Tot Item')
-        elif 'Valor Total Item' in itens_df.columns:
-            colunas_itens.append('Valor Total Item')
-        elif 'Valor' in itens_df.columns:
-            colunas_itens.append('Valor')
+        valor_col = find_column(list(itens_df.columns), ITEM_VALUE_COLUMNS)
+        if valor_col:
+            colunas_itens.append(valor_col)
         
         if len(colunas_itens) < 4:
             print(f"Colunas insuficientes encontradas: {colunas_itens}")
@@ -479,13 +557,6 @@ class ZapChickenProcessor:
         if pedidos_itens.empty:
             return {}
         
-        # Identifica a coluna de valor
-        valor_col = None
-        for col in ['Valor Tot. Item', 'Valor. Tot. Item', 'Valor Tot Item', 'Valor Total Item', 'Valor']:
-            if col in pedidos_itens.columns:
-                valor_col = col
-                break
-        
         if not valor_col:
             print("Nenhuma coluna de valor encontrada")
             return {}
@@ -561,38 +632,61 @@ class ZapChickenProcessor:
         
         return suggestions
     
-    def save_reports(self) -> List[Path]:
-        """Salva todos os relatórios"""
+    def generate_reports(self) -> Dict[str, Any]:
+        """Executa as análises dos relatórios (sem gravar arquivos)"""
+        return {
+            'novos_clientes': self.find_new_clients(),
+            'inativos': self.analyze_inactive_clients(),
+            'alto_ticket': self.analyze_ticket_medio(),
+            'geo_data': self.analyze_geographic_data(),
+            'preferences': self.analyze_preferences()
+        }
+    
+    def report_frames(self, reports: Optional[Dict[str, Any]] = None) -> Dict[str, pd.DataFrame]:
+        """Tabelas dos relatórios por nome de arquivo (só as que têm dados)"""
+        if reports is None:
+            reports = self.generate_reports()
+        frames = {}
+        for key, filename, format, table in REPORT_FILES:
+            data = reports.get(key)
+            if table and data:
+                data = data[table]
+            if data is None or isinstance(data, dict) or data.empty:
+                continue
+            frames[f"{filename}.{format}"] = data
+        return frames
+    
+    def save_reports(self, reports: Optional[Dict[str, Any]] = None) -> List[Path]:
+        """Salva todos os relatórios (usa as análises já feitas, se informadas)"""
         saved_files = []
-        
-        # 1. Novos clientes para Google Contacts
-        novos_clientes = self.find_new_clients()
-        if not novos_clientes.empty:
-            file_path = save_dataframe(novos_clientes, self.output_dir, "novos_clientes_google_contacts", "csv")
-            saved_files.append(file_path)
-        
-        # 2. Clientes inativos
-        inativos = self.analyze_inactive_clients()
-        if not inativos.empty:
-            file_path = save_dataframe(inativos, self.output_dir, "clientes_inativos", "xlsx")
-            saved_files.append(file_path)
-        
-        # 3. Clientes alto ticket
-        alto_ticket = self.analyze_ticket_medio()
-        if not alto_ticket.empty:
-            file_path = save_dataframe(alto_ticket, self.output_dir, "clientes_alto_ticket", "xlsx")
-            saved_files.append(file_path)
-        
-        # 4. Análise geográfica
-        geo_data = self.analyze_geographic_data()
-        if geo_data:
-            file_path = save_dataframe(geo_data['bairros_analise'], self.output_dir, "analise_geografica", "xlsx")
-            saved_files.append(file_path)
-        
-        # 5. Preferências
-        preferences = self.analyze_preferences()
-        if preferences:
-            file_path = save_dataframe(preferences['produtos_mais_vendidos'], self.output_dir, "produtos_mais_vendidos", "xlsx")
+        for name, df in self.report_frames(reports).items():
+            filename, format = name.rsplit('.', 1)
+            file_path = save_dataframe(df, self.output_dir, filename, format)
             saved_files.append(file_path)
         
         return saved_files
+    
+    def run_pipeline(self, on_stage: Optional[Callable[[str], None]] = None,
+                     reload: bool = True) -> Dict[str, Any]:
+        """
+        Processamento completo em etapas: load, clean, analyze e save.
+        on_stage é chamado no início de cada etapa (progresso de tarefas em segundo plano).
+        Com reload=False usa os DataFrames já carregados (ex.: uploads guardados na sessão).
+        """
+        notify = on_stage or (lambda stage: None)
+        
+        notify('load')
+        if reload:
+            self.load_zapchicken_files()
+        
+        notify('clean')
+        self.get_pedidos_features()
+        self.get_sales_cube()
+        
+        notify('analyze')
+        reports = self.generate_reports()
+        
+        notify('save')
+        saved_files = self.save_reports(reports)
+        
+        return {'reports': reports, 'saved_files': saved_files}
@@ -11,30 +11,55 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-import base64
 import io
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
 import os
-from flask import send_file
+import shutil
+import uuid
 
 from src.zapchicken_processor import ZapChickenProcessor
 from src.utils import setup_logging
+from src.upload_spool import spool_data_url
+from src.job_runner import JobRunner
+from src.session_cache import SessionCache
+from src.http_cache import init_http_cache, send_report
+from src.dashboard_charts import figura_bairros, figura_produtos, figura_evolucao, figura_vazia
 
 # Configuração
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "ZapCampanhas - Business Intelligence"
 logger = setup_logging()
 
+# Compressão (Brotli/gzip) e ETag com 304 nas respostas do servidor Flask do Dash
+init_http_cache(app.server)
+
+# Tarefas em segundo plano (processamento fora do callback)
+job_runner = JobRunner(max_workers=1)
+
+def remove_session_output(token):
+    """Apaga os relatórios de uma sessão expirada"""
+    shutil.rmtree(OUTPUT_DIR / token, ignore_errors=True)
+
+# Uploads já lidos ficam no servidor, por token de sessão: os callbacks só recebem o token
+upload_store = SessionCache(on_expire=remove_session_output)
+UPLOAD_TYPES = ['contacts', 'clientes', 'pedidos', 'itens']
+
+def session_output_dir(token):
+    """Relatórios de cada sessão ficam em data/output/<token> (sessões não veem os arquivos umas das outras)"""
+    if not token or not all(c in '0123456789abcdef' for c in token):
+        raise ValueError("Sessão inválida")
+    return OUTPUT_DIR / token
+
 # Rota para download de arquivos
-@app.server.route('/download/<filename>')
-def download_file(filename):
-    """Rota para download de arquivos"""
+@app.server.route('/download/<token>/<filename>')
+def download_file(token, filename):
+    """Rota para download dos relatórios da sessão"""
     try:
-        file_path = OUTPUT_DIR / filename
+        file_path = session_output_dir(token) / filename
         if file_path.exists():
-            return send_file(file_path, as_attachment=True)
+            return send_report(file_path)
         else:
             return "Arquivo não encontrado", 404
     except Exception as e:
@@ -45,7 +70,7 @@ INPUT_DIR = Path("data/input")
 OUTPUT_DIR = Path("data/output")
 
 # Layout principal
-app.layout = dbc.Container([
+layout_principal = dbc.Container([
     # Header
     dbc.Row([
         dbc.Col([
@@ -152,7 +177,13 @@ app.layout = dbc.Container([
                      dbc.Button("🚀 Processar Dados", id="btn-processar", color="primary", size="lg", className="w-100 mb-4"),
                      
                      # Status
-                     html.Div(id="status-processamento", className="mt-3")
+                     html.Div(id="status-processamento", className="mt-3"),
+                     
+                     # Tarefa de processamento em segundo plano (id + consulta do progresso)
+                     dcc.Store(id="job-processamento"),
+                     # Arquivos guardados no servidor para esta sessão ({tipo: nome do arquivo})
+                     dcc.Store(id="uploads-sessao", data={}),
+                     dcc.Interval(id="intervalo-processamento", interval=1000, disabled=True)
                     
                 ], width=6),
                 
@@ -205,6 +236,26 @@ app.layout = dbc.Container([
                         ], width=3)
                     ], className="mb-4"),
                     
+                    # Filtros dos gráficos (séries pré-agregadas no servidor)
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Período:"),
+                            dcc.Dropdown(id="periodo-dashboard", value="tudo", clearable=False, options=[
+                                {'label': 'Últimos 30 dias', 'value': '30d'},
+                                {'label': 'Últimos 90 dias', 'value': '90d'},
+                                {'label': 'Último ano', 'value': '365d'},
+                                {'label': 'Todo o histórico', 'value': 'tudo'}
+                            ])
+                        ], width=4),
+                        dbc.Col([
+                            html.Label("Evolução por:"),
+                            dbc.RadioItems(id="granularidade-dashboard", value="dia", inline=True, options=[
+                                {'label': 'Dia', 'value': 'dia'},
+                                {'label': 'Hora', 'value': 'hora'}
+                            ])
+                        ], width=4)
+                    ], className="mb-4"),
+                    
                     # Gráficos
                     dbc.Row([
                         dbc.Col([
@@ -331,101 +382,96 @@ app.layout = dbc.Container([
     ])
 ], fluid=True)
 
-# Callbacks combinados para upload e limpeza
-@app.callback(
-    [Output("upload-contacts", "contents"),
-     Output("status-contacts", "children")],
-    [Input("upload-contacts", "contents"),
-     Input("btn-clear-contacts", "n_clicks")],
-    [State("upload-contacts", "filename")]
-)
-def handle_contacts(contents, clear_clicks, filename):
-    ctx = callback_context
-    if not ctx.triggered:
-        return dash.no_update, ""
-    
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    if trigger_id == "btn-clear-contacts":
-        return None, ""
-    elif trigger_id == "upload-contacts" and contents is not None:
-        return contents, dbc.Alert(f"✅ {filename} carregado com sucesso!", color="success", className="mb-0")
-    
-    return dash.no_update, ""
+def serve_layout():
+    """Layout com um token de sessão novo a cada carregamento da página"""
+    return html.Div([dcc.Store(id="upload-token", data=uuid.uuid4().hex), layout_principal])
 
-@app.callback(
-    [Output("upload-clientes", "contents"),
-     Output("status-clientes", "children")],
-    [Input("upload-clientes", "contents"),
-     Input("btn-clear-clientes", "n_clicks")],
-    [State("upload-clientes", "filename")]
-)
-def handle_clientes(contents, clear_clicks, filename):
-    ctx = callback_context
-    if not ctx.triggered:
-        return dash.no_update, ""
-    
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    if trigger_id == "btn-clear-clientes":
-        return None, ""
-    elif trigger_id == "upload-clientes" and contents is not None:
-        return contents, dbc.Alert(f"✅ {filename} carregado com sucesso!", color="success", className="mb-0")
-    
-    return dash.no_update, ""
+app.layout = serve_layout
+
+def get_session_entry(token):
+    """Entrada da sessão no servidor (processador com os DataFrames enviados)"""
+    return upload_store.get_or_create(token, lambda: ZapChickenProcessor(INPUT_DIR, session_output_dir(token)))
+
+def read_uploaded_file(content, filename):
+    """Decodifica o upload em blocos para o spool, lê o DataFrame e descarta o arquivo"""
+    upload = spool_data_url(content, filename)
+    try:
+        return ZapChickenProcessor.read_input_file(upload.path)
+    finally:
+        upload.delete()
 
+# Callback único para upload e limpeza: lê o arquivo uma vez e guarda o DataFrame no servidor.
+# O conteúdo base64 é apagado do componente, então não volta a trafegar nos outros callbacks
 @app.callback(
-    [Output("upload-pedidos", "contents"),
-     Output("status-pedidos", "children")],
-    [Input("upload-pedidos", "contents"),
-     Input("btn-clear-pedidos", "n_clicks")],
-    [State("upload-pedidos", "filename")]
+    [Output(f"upload-{tipo}", "contents") for tipo in UPLOAD_TYPES] +
+    [Output(f"status-{tipo}", "children") for tipo in UPLOAD_TYPES] +
+    [Output("uploads-sessao", "data")],
+    [Input(f"upload-{tipo}", "contents") for tipo in UPLOAD_TYPES] +
+    [Input(f"btn-clear-{tipo}", "n_clicks") for tipo in UPLOAD_TYPES],
+    [State(f"upload-{tipo}", "filename") for tipo in UPLOAD_TYPES] +
+    [State("upload-token", "data"),
+     State("uploads-sessao", "data")]
 )
-def handle_pedidos(contents, clear_clicks, filename):
+def handle_uploads(*args):
+    n = len(UPLOAD_TYPES)
+    contents, filenames = args[:n], args[2 * n:3 * n]
+    token, uploads = args[3 * n], dict(args[3 * n + 1] or {})
+    
+    sem_mudanca = [dash.no_update] * (2 * n + 1)
     ctx = callback_context
-    if not ctx.triggered:
-        return dash.no_update, ""
+    if not ctx.triggered or not token:
+        return sem_mudanca
     
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    tipo = trigger_id.replace("btn-clear-", "").replace("upload-", "")
+    if tipo not in UPLOAD_TYPES:
+        return sem_mudanca
+    i = UPLOAD_TYPES.index(tipo)
     
-    if trigger_id == "btn-clear-pedidos":
-        return None, ""
-    elif trigger_id == "upload-pedidos" and contents is not None:
-        return contents, dbc.Alert(f"✅ {filename} carregado com sucesso!", color="success", className="mb-0")
+    # O processamento em andamento usa os DataFrames da sessão: nada muda até ele terminar
+    if job_runner.active(f'processamento:{token}') is not None:
+        resultado = list(sem_mudanca)
+        resultado[i] = None
+        resultado[n + i] = dbc.Alert("⏳ Aguarde o processamento terminar para alterar os arquivos.",
+                                     color="warning", className="mb-0")
+        return resultado
     
-    return dash.no_update, ""
-
-@app.callback(
-    [Output("upload-itens", "contents"),
-     Output("status-itens", "children")],
-    [Input("upload-itens", "contents"),
-     Input("btn-clear-itens", "n_clicks")],
-    [State("upload-itens", "filename")]
-)
-def handle_itens(contents, clear_clicks, filename):
-    ctx = callback_context
-    if not ctx.triggered:
-        return dash.no_update, ""
+    entry = get_session_entry(token)
+    processor = entry.processor
     
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    if trigger_id.startswith("btn-clear-"):
+        processor.load_dataframes({k: v for k, v in processor.dataframes.items() if k != tipo})
+        uploads.pop(tipo, None)
+        status = ""
+    elif contents[i] is not None:
+        try:
+            df = read_uploaded_file(contents[i], filenames[i])
+        except Exception as e:
+            resultado = list(sem_mudanca)
+            resultado[i] = None
+            resultado[n + i] = dbc.Alert(f"❌ Erro ao ler {filenames[i]}: {str(e)}", color="danger", className="mb-0")
+            return resultado
+        processor.load_dataframes(dict(processor.dataframes, **{tipo: df}))
+        uploads[tipo] = filenames[i]
+        status = dbc.Alert(f"✅ {filenames[i]} carregado com sucesso! ({len(df)} linhas)", color="success", className="mb-0")
+    else:
+        return sem_mudanca
     
-    if trigger_id == "btn-clear-itens":
-        return None, ""
-    elif trigger_id == "upload-itens" and contents is not None:
-        return contents, dbc.Alert(f"✅ {filename} carregado com sucesso!", color="success", className="mb-0")
+    entry.data_loaded = bool(processor.dataframes)
+    upload_store.update_size(token)
     
-    return dash.no_update, ""
+    resultado = list(sem_mudanca)
+    resultado[i] = None
+    resultado[n + i] = status
+    resultado[2 * n] = uploads
+    return resultado
 
 @app.callback(
     Output("status-geral-uploads", "children"),
-    [Input("upload-contacts", "contents"),
-     Input("upload-clientes", "contents"),
-     Input("upload-pedidos", "contents"),
-     Input("upload-itens", "contents")]
+    [Input("uploads-sessao", "data")]
 )
-def update_geral_status(contacts, clientes, pedidos, itens):
-    arquivos = [contacts, clientes, pedidos, itens]
-    arquivos_carregados = sum(1 for a in arquivos if a is not None)
+def update_geral_status(uploads):
+    arquivos_carregados = len(uploads or {})
     
     if arquivos_carregados == 0:
         return dbc.Alert("⏳ Aguardando upload dos arquivos...", color="warning")
@@ -434,71 +480,102 @@ def update_geral_status(contacts, clientes, pedidos, itens):
     else:
         return dbc.Alert("✅ Todos os arquivos carregados! Pode processar.", color="success")
 
-# Callback principal para processamento
+def run_processing(job, token, dias_inatividade, ticket_minimo):
+    """Processamento completo executado em segundo plano, com progresso por etapa"""
+    processor = get_session_entry(token).processor
+    processor.config['dias_inatividade'] = dias_inatividade
+    processor.config['ticket_medio_minimo'] = ticket_minimo
+    
+    # Os DataFrames já estão na sessão: nada é regravado em data/input nem relido
+    session_output_dir(token).mkdir(parents=True, exist_ok=True)
+    resultado = processor.run_pipeline(on_stage=job.stage, reload=False)
+    upload_store.update_size(token)
+    reports = resultado['reports']
+    
+    return {
+        'novos_clientes': len(reports['novos_clientes']),
+        'inativos': len(reports['inativos']),
+        'alto_ticket': len(reports['alto_ticket']),
+        'bairros': len(reports['geo_data'].get('bairros_analise', [])) if reports['geo_data'] else 0,
+        'relatorios': len(resultado['saved_files'])
+    }
+
+def render_job_progress(job):
+    """Alerta com a barra de progresso e as etapas da tarefa"""
+    status = job.to_dict()
+    icones = {'pendente': '⏳', 'executando': '🔄', 'concluido': '✅', 'erro': '❌'}
+    return dbc.Alert([
+        html.H5(f"🔄 Processando: {status['current_label'] or 'na fila'}", className="alert-heading"),
+        dbc.Progress(value=status['progress'], label=f"{status['progress']}%", className="mb-2"),
+        html.Div([html.Span(f"{icones.get(etapa['status'], '⏳')} {etapa['label']}", className="me-3")
+                  for etapa in status['stages']])
+    ], color="info")
+
+# Callback principal para processamento (dispara a tarefa e acompanha o progresso)
 @app.callback(
     [Output("status-processamento", "children"),
      Output("resultados-container", "children"),
-     Output("status-processamento-geral", "children")],
-    [Input("btn-processar", "n_clicks")],
-    [State("upload-contacts", "contents"),
-     State("upload-clientes", "contents"),
-     State("upload-pedidos", "contents"),
-     State("upload-itens", "contents"),
+     Output("status-processamento-geral", "children"),
+     Output("job-processamento", "data"),
+     Output("intervalo-processamento", "disabled")],
+    [Input("btn-processar", "n_clicks"),
+     Input("intervalo-processamento", "n_intervals")],
+    [State("upload-token", "data"),
      State("dias-inatividade", "value"),
-     State("ticket-minimo", "value")]
+     State("ticket-minimo", "value"),
+     State("job-processamento", "data")]
 )
-def processar_dados(n_clicks, contacts_content, clientes_content, pedidos_content, itens_content, dias_inatividade, ticket_minimo):
+def processar_dados(n_clicks, n_intervals, token, dias_inatividade, ticket_minimo, job_id):
     if n_clicks is None:
-        return "", "", ""
+        return "", "", "", dash.no_update, True
+    
+    trigger_id = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ""
     
     try:
-        # Status inicial de processamento
-        status_processamento = dbc.Alert("🔄 Iniciando processamento...", color="info")
-        
-        # Salva arquivos temporários
-        if contacts_content:
-            save_uploaded_file(contacts_content, INPUT_DIR / "contacts.csv")
-        if clientes_content:
-            save_uploaded_file(clientes_content, INPUT_DIR / "Lista-Clientes.xlsx")
-        if pedidos_content:
-            save_uploaded_file(pedidos_content, INPUT_DIR / "Todos os pedidos.xlsx")
-        if itens_content:
-            save_uploaded_file(itens_content, INPUT_DIR / "Historico_Itens_Vendidos.xlsx")
+        if trigger_id == "btn-processar":
+            # Os arquivos já foram lidos no upload (sessão expirada = enviar de novo)
+            entry = upload_store.get(token) if token else None
+            if entry is None or not entry.processor.dataframes:
+                aviso = dbc.Alert("⚠️ Nenhum arquivo carregado nesta sessão. Faça o upload dos arquivos.", color="warning")
+                return aviso, "", aviso, dash.no_update, True
+            
+            # Processa em segundo plano; o intervalo acompanha o progresso
+            params = {'dias_inatividade': dias_inatividade, 'ticket_minimo': ticket_minimo}
+            job = job_runner.active(f'processamento:{token}')
+            if job is not None and job.params != params:
+                # Não reaproveita uma tarefa que roda com outros parâmetros; o intervalo segue a atual
+                aviso = dbc.Alert("⏳ Já existe um processamento em andamento com outros parâmetros. "
+                                  "Aguarde ele terminar para processar novamente.", color="warning")
+                return aviso, dash.no_update, aviso, job.id, False
+            if job is None:
+                job = job_runner.submit(lambda job: run_processing(job, token, dias_inatividade, ticket_minimo),
+                                        name=f'processamento:{token}', params=params)
+            
+            status = render_job_progress(job)
+            return status, "", status, job.id, False
         
-        # Processa dados
-        processor = ZapChickenProcessor(INPUT_DIR, OUTPUT_DIR)
-        processor.config['dias_inatividade'] = dias_inatividade
-        processor.config['ticket_medio_minimo'] = ticket_minimo
+        job = job_runner.get(job_id) if job_id else None
+        if job is None:
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update, True
         
-        # Carrega e processa
-        processor.load_zapchicken_files()
+        if job.finished is None:
+            status = render_job_progress(job)
+            return status, dash.no_update, status, dash.no_update, False
         
-        # Análises
-        novos_clientes = processor.find_new_clients()
-        inativos = processor.analyze_inactive_clients()
-        alto_ticket = processor.analyze_ticket_medio()
-        geo_data = processor.analyze_geographic_data()
-        preferences = processor.analyze_preferences()
+        if not job.finished_ok:
+            return (dbc.Alert(f"❌ Erro: {job.error}", color="danger"), "",
+                    dbc.Alert(f"❌ Erro no processamento: {job.error}", color="danger"), dash.no_update, True)
         
-        # Salva relatórios
-        saved_files = processor.save_reports()
-        
-        # Status de processamento final
-        status_processamento_final = dbc.Alert([
-            html.H4("✅ Processamento Concluído!", className="alert-heading"),
-            html.P(f"• {len(novos_clientes)} novos clientes encontrados"),
-            html.P(f"• {len(inativos)} clientes inativos"),
-            html.P(f"• {len(alto_ticket)} clientes alto ticket"),
-            html.P(f"• {len(saved_files)} relatórios gerados")
-        ], color="success")
+        resultado = job.result
         
         # Status
         status = dbc.Alert([
             html.H4("✅ Processamento Concluído!", className="alert-heading"),
-            html.P(f"• {len(novos_clientes)} novos clientes encontrados"),
-            html.P(f"• {len(inativos)} clientes inativos"),
-            html.P(f"• {len(alto_ticket)} clientes alto ticket"),
-            html.P(f"• {len(saved_files)} relatórios gerados")
+            html.P(f"• {resultado['novos_clientes']} novos clientes encontrados"),
+            html.P(f"• {resultado['inativos']} clientes inativos"),
+            html.P(f"• {resultado['alto_ticket']} clientes alto ticket"),
+            html.P(f"• {resultado['relatorios']} relatórios gerados"),
+            html.P(f"⏱️ {job.to_dict()['elapsed']}s", className="mb-0 small")
         ], color="success")
         
         # Resultados
@@ -508,48 +585,67 @@ def processar_dados(n_clicks, contacts_content, clientes_content, pedidos_conten
                 dbc.Row([
                     dbc.Col([
                         html.H6("Novos Clientes"),
-                        html.P(f"{len(novos_clientes)}", className="h3 text-primary")
+                        html.P(f"{resultado['novos_clientes']}", className="h3 text-primary")
                     ], width=3),
                     dbc.Col([
                         html.H6("Inativos"),
-                        html.P(f"{len(inativos)}", className="h3 text-warning")
+                        html.P(f"{resultado['inativos']}", className="h3 text-warning")
                     ], width=3),
                     dbc.Col([
                         html.H6("Alto Ticket"),
-                        html.P(f"{len(alto_ticket)}", className="h3 text-success")
+                        html.P(f"{resultado['alto_ticket']}", className="h3 text-success")
                     ], width=3),
                     dbc.Col([
                         html.H6("Bairros"),
-                        html.P(f"{len(geo_data.get('bairros_analise', []))}", className="h3 text-info")
+                        html.P(f"{resultado['bairros']}", className="h3 text-info")
                     ], width=3)
                 ])
             ])
         ])
         
-        return status, resultados, status_processamento_final
+        return status, resultados, status, dash.no_update, True
         
     except Exception as e:
-        return dbc.Alert(f"❌ Erro: {str(e)}", color="danger"), "", dbc.Alert(f"❌ Erro no processamento: {str(e)}", color="danger")
+        return (dbc.Alert(f"❌ Erro: {str(e)}", color="danger"), "",
+                dbc.Alert(f"❌ Erro no processamento: {str(e)}", color="danger"), dash.no_update, True)
 
-def save_uploaded_file(content, filepath):
-    """Salva arquivo enviado"""
-    content_type, content_string = content.split(',')
-    decoded = base64.b64decode(content_string)
+# Gráficos do dashboard: só séries agregadas chegam ao navegador (figuras em cache por versão e filtro)
+@app.callback(
+    [Output("grafico-bairros", "figure"),
+     Output("grafico-produtos", "figure"),
+     Output("grafico-evolucao", "figure")],
+    [Input("periodo-dashboard", "value"),
+     Input("granularidade-dashboard", "value"),
+     Input("intervalo-processamento", "disabled"),
+     Input("uploads-sessao", "data")],
+    [State("upload-token", "data")]
+)
+def atualizar_graficos(periodo, granularidade, processamento_parado, uploads, token):
+    entry = upload_store.get(token) if token else None
+    if entry is None or 'pedidos' not in entry.processor.dataframes:
+        return (figura_vazia("Bairros"), figura_vazia("Produtos"), figura_vazia("Evolução do faturamento"))
     
-    with open(filepath, 'wb') as f:
-        f.write(decoded)
+    try:
+        processor = entry.processor
+        return (figura_bairros(processor, periodo),
+                figura_produtos(processor, periodo),
+                figura_evolucao(processor, granularidade, periodo))
+    except Exception as e:
+        erro = f"Erro ao montar o gráfico: {str(e)}"
+        return (figura_vazia("Bairros", erro), figura_vazia("Produtos", erro), figura_vazia("Evolução do faturamento", erro))
 
 # Callbacks para downloads dos relatórios
 @app.callback(
     Output("status-download-novos", "children"),
-    [Input("btn-download-novos", "n_clicks")]
+    [Input("btn-download-novos", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def download_novos_clientes(n_clicks):
+def download_novos_clientes(n_clicks, token):
     if n_clicks is None:
         return ""
     
     try:
-        file_path = OUTPUT_DIR / "novos_clientes_google_contacts.csv"
+        file_path = session_output_dir(token) / "novos_clientes_google_contacts.csv"
         if file_path.exists():
             # Lê o arquivo e cria um link de download
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -571,20 +667,21 @@ def download_novos_clientes(n_clicks):
 
 @app.callback(
     Output("status-download-inativos", "children"),
-    [Input("btn-download-inativos", "n_clicks")]
+    [Input("btn-download-inativos", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def download_inativos(n_clicks):
+def download_inativos(n_clicks, token):
     if n_clicks is None:
         return ""
     
     try:
-        file_path = OUTPUT_DIR / "clientes_inativos.xlsx"
+        file_path = session_output_dir(token) / "clientes_inativos.xlsx"
         if file_path.exists():
             return html.Div([
                 dbc.Alert("✅ Arquivo encontrado!", color="success", className="mb-2"),
                 html.A(
                     "📥 Baixar Excel",
-                    href=f"/download/{file_path.name}",
+                    href=f"/download/{token}/{file_path.name}",
                     className="btn btn-warning btn-sm"
                 )
             ])
@@ -595,20 +692,21 @@ def download_inativos(n_clicks):
 
 @app.callback(
     Output("status-download-alto-ticket", "children"),
-    [Input("btn-download-alto-ticket", "n_clicks")]
+    [Input("btn-download-alto-ticket", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def download_alto_ticket(n_clicks):
+def download_alto_ticket(n_clicks, token):
     if n_clicks is None:
         return ""
     
     try:
-        file_path = OUTPUT_DIR / "clientes_alto_ticket.xlsx"
+        file_path = session_output_dir(token) / "clientes_alto_ticket.xlsx"
         if file_path.exists():
             return html.Div([
                 dbc.Alert("✅ Arquivo encontrado!", color="success", className="mb-2"),
                 html.A(
                     "📥 Baixar Excel",
-                    href=f"/download/{file_path.name}",
+                    href=f"/download/{token}/{file_path.name}",
                     className="btn btn-success btn-sm"
                 )
             ])
@@ -619,20 +717,21 @@ def download_alto_ticket(n_clicks):
 
 @app.callback(
     Output("status-download-geo", "children"),
-    [Input("btn-download-geo", "n_clicks")]
+    [Input("btn-download-geo", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def download_geo(n_clicks):
+def download_geo(n_clicks, token):
     if n_clicks is None:
         return ""
     
     try:
-        file_path = OUTPUT_DIR / "analise_geografica.xlsx"
+        file_path = session_output_dir(token) / "analise_geografica.xlsx"
         if file_path.exists():
             return html.Div([
                 dbc.Alert("✅ Arquivo encontrado!", color="success", className="mb-2"),
                 html.A(
                     "📥 Baixar Excel",
-                    href=f"/download/{file_path.name}",
+                    href=f"/download/{token}/{file_path.name}",
                     className="btn btn-info btn-sm"
                 )
             ])
@@ -643,20 +742,21 @@ def download_geo(n_clicks):
 
 @app.callback(
     Output("status-download-produtos", "children"),
-    [Input("btn-download-produtos", "n_clicks")]
+    [Input("btn-download-produtos", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def download_produtos(n_clicks):
+def download_produtos(n_clicks, token):
     if n_clicks is None:
         return ""
     
     try:
-        file_path = OUTPUT_DIR / "produtos_mais_vendidos.xlsx"
+        file_path = session_output_dir(token) / "produtos_mais_vendidos.xlsx"
         if file_path.exists():
             return html.Div([
                 dbc.Alert("✅ Arquivo encontrado!", color="success", className="mb-2"),
                 html.A(
                     "📥 Baixar Excel",
-                    href=f"/download/{file_path.name}",
+                    href=f"/download/{token}/{file_path.name}",
                     className="btn btn-danger btn-sm"
                 )
             ])
@@ -671,9 +771,10 @@ def download_produtos(n_clicks):
      Input("btn-download-inativos", "n_clicks"),
      Input("btn-download-alto-ticket", "n_clicks"),
      Input("btn-download-geo", "n_clicks"),
-     Input("btn-download-produtos", "n_clicks")]
+     Input("btn-download-produtos", "n_clicks")],
+    [State("upload-token", "data")]
 )
-def update_relatorios_status(n1, n2, n3, n4, n5):
+def update_relatorios_status(n1, n2, n3, n4, n5, token):
     """Atualiza status geral dos relatórios"""
     try:
         relatorios = [
@@ -688,7 +789,7 @@ def update_relatorios_status(n1, n2, n3, n4, n5):
         nao_encontrados = []
         
         for filename, nome in relatorios:
-            file_path = OUTPUT_DIR / filename
+            file_path = session_output_dir(token) / filename
             if file_path.exists():
                 disponiveis.append(nome)
             else: